@@ -0,0 +1,131 @@
+"""
+Compares single-pass tree compiler with the previous recursive one on long OR chains of IOC values,
+both on raw deep trees of parser and on optimized flat trees.
+
+    python -m benchmarks.parse_tree
+"""
+import sys
+import time
+
+from django.conf import settings
+
+if not settings.configured:
+    settings.configure()
+
+from django.db.models import Q as DjangoQ  # noqa: E402
+from elasticsearch_dsl import Q as ElasticQ  # noqa: E402
+from lucyparser import parse  # noqa: E402
+from lucyparser.tree import ExpressionNode, AndNode, OrNode, NotNode  # noqa: E402
+
+from lucyfer.parser.base import LucyferParser  # noqa: E402
+from lucyfer.searchset import DjangoSearchSet, ElasticSearchSet  # noqa: E402
+from lucyfer.searchset.fields import DjangoCharField, ElasticSearchField  # noqa: E402
+
+
+class Model:
+    class _meta:
+        fields = []
+
+
+class BenchmarkDjangoSearchSet(DjangoSearchSet):
+    ip = DjangoCharField()
+
+    class Meta:
+        model = Model
+
+
+class BenchmarkElasticSearchSet(ElasticSearchSet):
+    ip = ElasticSearchField()
+
+    @classmethod
+    def _get_raw_mapping(cls):
+        return {}
+
+    class Meta:
+        model = Model
+
+
+def recursive_django_parse_tree(cls, tree):
+    """
+    Previous implementation of `LuceneToDjangoParserMixin._parse_tree`
+    """
+    if isinstance(tree, ExpressionNode):
+        return cls.get_query_for_field(tree)
+
+    query = DjangoQ()
+    queries = [recursive_django_parse_tree(cls, child) for child in tree.children]
+    queries = [q for q in queries if q is not None]
+
+    if isinstance(tree, AndNode):
+        for q in queries:
+            query = query & q
+    elif isinstance(tree, OrNode):
+        for q in queries:
+            query = query | q
+    elif isinstance(tree, NotNode):
+        for q in queries:
+            query = query & q
+        query = ~DjangoQ(query)
+
+    return query
+
+
+def recursive_elastic_parse_tree(cls, tree):
+    """
+    Previous implementation of `LuceneToElasticParserMixin._parse_tree`
+    """
+    if isinstance(tree, ExpressionNode):
+        return cls.get_query_for_field(tree) or ~ElasticQ()
+
+    queries = [recursive_elastic_parse_tree(cls, child) for child in tree.children]
+    query = queries[0]
+
+    if isinstance(tree, AndNode):
+        for q in queries[1:]:
+            query = query & q
+    elif isinstance(tree, OrNode):
+        for q in queries[1:]:
+            query = query | q
+    elif isinstance(tree, NotNode):
+        for q in queries[1:]:
+            query = query & q
+        query = ~ElasticQ(query)
+
+    return query
+
+
+# previous django compiler is quadratic, so it takes minutes on bigger expressions
+RECURSIVE_MAX_SIZE = 20000
+
+
+def measure(func, *args):
+    start = time.perf_counter()
+    try:
+        func(*args)
+    except RecursionError:
+        return "RecursionError"
+    return f"{time.perf_counter() - start:.3f}s"
+
+
+def main(sizes):
+    for size in sizes:
+        expression = " OR ".join(f"ip: 10.{i // 65536}.{i // 256 % 256}.{i % 256}" for i in range(size))
+
+        # raw tree of parser is left-leaning chain as deep as the expression is long, optimized tree is flat.
+        # The same trees are used for both compilers, so only compilation time is measured
+        raw_tree = parse(expression, parser_class=LucyferParser)
+        trees = (("raw", raw_tree), ("optimized", BenchmarkDjangoSearchSet._optimize_tree(raw_tree)))
+
+        for name, searchset_class, recursive in (
+                ("django", BenchmarkDjangoSearchSet, recursive_django_parse_tree),
+                ("elastic", BenchmarkElasticSearchSet, recursive_elastic_parse_tree),
+        ):
+            for tree_name, tree in trees:
+                recursive_time = measure(recursive, searchset_class, tree) if size <= RECURSIVE_MAX_SIZE else "skipped"
+                print(f"{name:8} {tree_name:9} {size:>7} leaves: "
+                      f"recursive {recursive_time:>14}, "
+                      f"single-pass {measure(searchset_class._parse_tree, tree):>8}")
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or [1000, 10000, 100000])
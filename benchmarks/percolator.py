@@ -0,0 +1,88 @@
+"""
+Compares matching one document against all stored expressions with percolator index and with a plain loop.
+
+    python -m benchmarks.percolator
+"""
+import random
+import sys
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+
+if not settings.configured:
+    settings.configure()
+
+from lucyfer.searchset import PythonSearchSet  # noqa: E402
+from lucyfer.searchset.percolator import PercolatorIndex  # noqa: E402
+
+
+@dataclass
+class Event:
+    user: str
+    ip: str
+    severity: int
+    message: str
+
+
+class EventSearchSet(PythonSearchSet):
+    class Meta:
+        model = Event
+
+
+DOCUMENTS_COUNT = 1000
+
+
+def get_expression(i):
+    kind = i % 100
+
+    if kind < 60:
+        return f"user: user{i} AND severity > {i % 5}"
+    if kind < 99:
+        return f"ip: 10.0.{i // 256 % 256}.{i % 256} OR ip: 10.1.{i // 256 % 256}.{i % 256}"
+
+    # some expressions have no required terms, so they are evaluated for every document
+    return f"severity > 3 AND message: *error{i}*"
+
+
+def get_document(rng, size):
+    i = rng.randrange(size)
+    return Event(user=f"user{i}", ip=f"10.0.{i // 256 % 256}.{i % 256}", severity=rng.randrange(5),
+                 message=f"error{i} occurred")
+
+
+def main(sizes):
+    for size in sizes:
+        rng = random.Random(size)
+        expressions = {i: get_expression(i) for i in range(size)}
+        documents = [get_document(rng, size) for _ in range(DOCUMENTS_COUNT)]
+
+        start = time.perf_counter()
+        index = PercolatorIndex(EventSearchSet)
+        for expression_id, raw_expression in expressions.items():
+            index.add(expression_id, raw_expression)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index_matches = [index.match(document) for document in documents]
+        index_time = (time.perf_counter() - start) / DOCUMENTS_COUNT
+
+        predicates = {expression_id: EventSearchSet.parse(raw_expression)
+                      for expression_id, raw_expression in expressions.items()}
+
+        # plain loop is too slow to check every document on big sizes
+        loop_documents = documents[:max(1, DOCUMENTS_COUNT * 10000 // size // 10)]
+
+        start = time.perf_counter()
+        loop_matches = [{expression_id for expression_id, predicate in predicates.items() if predicate(document)}
+                        for document in loop_documents]
+        loop_time = (time.perf_counter() - start) / len(loop_documents)
+
+        assert loop_matches == index_matches[:len(loop_documents)]
+
+        print(f"{size:>7} expressions: build {build_time:.2f}s, "
+              f"per document: index {index_time * 1000:.3f}ms, loop {loop_time * 1000:.3f}ms")
+
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or [10000, 100000])
@@ -0,0 +1,114 @@
+"""
+Measures memory of searchset storage for synthetic elasticsearch mapping with many fields.
+
+    python -m benchmarks.storage_memory
+"""
+import gc
+import sys
+import time
+import tracemalloc
+
+from django.conf import settings
+
+if not settings.configured:
+    settings.configure()
+
+from lucyfer.searchset import ElasticSearchSet  # noqa: E402
+
+
+TENANTS_COUNT = 10
+
+ELASTIC_TYPES = ("keyword", "text", "long", "integer", "double", "boolean", "date")
+
+
+def get_mapping(fields_count, group_size=100):
+    """
+    Returns ECS-like mapping: objects with nested objects of leaf fields
+    """
+    properties = {}
+
+    for i in range(fields_count):
+        group = properties.setdefault(f"group{i // group_size // 10}", {"properties": {}})["properties"]
+        subgroup = group.setdefault(f"subgroup{i // group_size % 10}", {"properties": {}})["properties"]
+        subgroup[f"field{i}"] = {"type": ELASTIC_TYPES[i % len(ELASTIC_TYPES)]}
+
+    return {"index": {"mappings": {"doc": {"properties": properties}}}}
+
+
+class Model:
+    class _doc_type:
+        name = "doc"
+
+    @staticmethod
+    def _get_index():
+        return "index"
+
+
+def get_searchset_class(mapping):
+    class Indices:
+        @staticmethod
+        def get_mapping(**kwargs):
+            return mapping
+
+    class Client:
+        indices = Indices
+
+    class SearchSet(ElasticSearchSet):
+        @classmethod
+        def get_es_client(cls, **kwargs):
+            return Client
+
+        class Meta:
+            model = Model
+
+    return SearchSet
+
+
+def measure(function):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    result = function()
+
+    duration = time.perf_counter() - start
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return result, size, duration
+
+
+def main(fields_count):
+    mapping = get_mapping(fields_count)
+
+    searchset_class = get_searchset_class(mapping)
+    storage = searchset_class.storage
+
+    _, size, duration = measure(lambda: storage.state)
+    print(f"storage of {len(storage.raw_mapping)} fields: {size / 2 ** 20:.1f} MB, {duration * 1000:.1f} ms")
+
+    sources = list(storage.raw_mapping)
+
+    _, size, duration = measure(lambda: [searchset_class.get_field(source) for source in sources[::100]])
+    print(f"1% of fields used: +{size / 2 ** 20:.1f} MB, {duration * 1000:.1f} ms")
+
+    _, size, duration = measure(lambda: [searchset_class.get_field(source) for source in sources])
+    print(f"all fields used: +{size / 2 ** 20:.1f} MB, {duration * 1000:.1f} ms")
+
+    # for ex. searchsets of tenants with indices of one template
+    tenant_searchset_classes = [get_searchset_class(get_mapping(fields_count)) for _ in range(TENANTS_COUNT)]
+
+    def use_tenant_searchsets():
+        for tenant_searchset_class in tenant_searchset_classes:
+            for source in sources:
+                tenant_searchset_class.get_field(source)
+        return [tenant_searchset_class.storage.state for tenant_searchset_class in tenant_searchset_classes]
+
+    _, size, duration = measure(use_tenant_searchsets)
+    print(f"{TENANTS_COUNT} searchsets with the same mapping, all fields used: +{size / 2 ** 20:.1f} MB, "
+          f"{duration * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class LucyferConfig(AppConfig):
+    name = "lucyfer"
+    verbose_name = "Lucyfer"
+
+    def ready(self):
+        # searchsets are registered on class creation, so modules with them have to be imported.
+        # Storages aren't built here: app is ready in every process (migrate, shell, ...), so mapping requests are
+        # made by serving processes only, see `lucyfer.searchset.registry.warm_up`
+        autodiscover_modules("searchsets")
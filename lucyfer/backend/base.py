@@ -1,3 +1,14 @@
+import logging
+
+from rest_framework.exceptions import ValidationError
+
+from lucyfer.parser.cost import QueryCost
+from lucyfer.utils import LuceneSearchQueryTooExpensiveException
+
+
+logger = logging.getLogger("lucyfer")
+
+
 class LuceneSearchFilter:
     def get_base_search_terms(self, request) -> str:
         """
@@ -11,3 +22,22 @@ class LuceneSearchFilter:
         Returns searchset class if it presented in view
         """
         return getattr(view, 'search_class', None)
+
+    def get_search_timeout(self, view):
+        """
+        Returns query timeout in seconds if it presented in view. Settings are used otherwise
+        """
+        return getattr(view, 'search_timeout', None)
+
+    def handle_too_expensive_query(self, exc: LuceneSearchQueryTooExpensiveException):
+        """
+        Too expensive queries are not given a second chance with common search, user gets validation error
+        """
+        raise ValidationError({self.search_param: [str(exc)]})
+
+    def on_query_cost(self, cost: QueryCost, view):
+        """
+        Called with estimated cost of every applied lucene query. Logs it by default,
+        override it to throttle expensive searches (for ex. raise `rest_framework.exceptions.Throttled`)
+        """
+        logger.debug("Lucene search query cost %s in %s", cost.score, view.__class__.__name__)
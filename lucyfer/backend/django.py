@@ -1,7 +1,7 @@
 from rest_framework.compat import distinct
 from rest_framework.filters import SearchFilter
 
-from lucyfer.utils import LuceneSearchException
+from lucyfer.utils import LuceneSearchException, LuceneSearchQueryTooExpensiveException
 
 
 class DjangoLuceneSearchFilterMixin(SearchFilter):
@@ -15,7 +15,8 @@ class DjangoLuceneSearchFilterMixin(SearchFilter):
         # first try to search in lucene way
         searchset_class = self.get_searchset_class(view, request)
         filtered_queryset = self.lucene_filter_queyset(searchset_class=searchset_class, search_terms=search_terms,
-                                                       queryset=queryset)
+                                                       queryset=queryset, timeout=self.get_search_timeout(view),
+                                                       view=view)
 
         # if there is nothing to present
         # we give a second chance to common search
@@ -27,12 +28,18 @@ class DjangoLuceneSearchFilterMixin(SearchFilter):
 
         return queryset
 
-    def lucene_filter_queyset(self, searchset_class, search_terms, queryset):
+    def lucene_filter_queyset(self, searchset_class, search_terms, queryset, timeout=None, view=None):
         if searchset_class is not None:
             try:
-                return searchset_class.filter(queryset, search_terms)
+                filtered_queryset, cost = searchset_class.filter_with_cost(queryset, search_terms, timeout=timeout)
+            except LuceneSearchQueryTooExpensiveException as e:
+                self.handle_too_expensive_query(e)
+                return None
             except LuceneSearchException:
                 return None
+
+            self.on_query_cost(cost, view)
+            return filtered_queryset
         return None
 
     def custom_filter_queryset(self, request, queryset, view):
@@ -1,4 +1,4 @@
-from lucyfer.utils import LuceneSearchException
+from lucyfer.utils import LuceneSearchException, LuceneSearchQueryTooExpensiveException
 
 class ElasticLuceneSearchFilterMixin:
     def get_schema_fields(self, view):
@@ -15,19 +15,27 @@ class ElasticLuceneSearchFilterMixin:
 
         searchset_class = self.get_searchset_class(view, request)
         filtered_search = self.lucene_filter_search(searchset_class=searchset_class, search_terms=search_terms,
-                                                    search=search)
+                                                    search=search, timeout=self.get_search_timeout(view),
+                                                    view=view)
 
         if filtered_search is None:
             return self.custom_filter_search(request=request, search=search, view=view, search_terms=search_terms)
 
         return filtered_search
 
-    def lucene_filter_search(self, searchset_class, search_terms, search):
+    def lucene_filter_search(self, searchset_class, search_terms, search, timeout=None, view=None):
         if searchset_class is not None:
             try:
-                return searchset_class.filter(search, search_terms)
+                filtered_search, cost = searchset_class.filter_with_cost(search, search_terms, timeout=timeout)
+            except LuceneSearchQueryTooExpensiveException as e:
+                self.handle_too_expensive_query(e)
+                return None
             except LuceneSearchException:
                 return None
+
+            if filtered_search is not None:
+                self.on_query_cost(cost, view)
+            return filtered_search
         return None
 
     def custom_filter_search(self, request, search, view, search_terms):
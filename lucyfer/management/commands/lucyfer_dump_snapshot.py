@@ -0,0 +1,29 @@
+from django.core.management import BaseCommand, CommandError
+from django.utils.module_loading import autodiscover_modules, import_string
+
+from lucyfer.searchset.snapshot import dump_snapshot
+from lucyfer.settings import lucyfer_settings
+
+
+class Command(BaseCommand):
+    help = "Dumps mappings of searchsets to snapshot file, all registered searchsets are used by default"
+
+    def add_arguments(self, parser):
+        parser.add_argument("searchsets", nargs="*", help="dotted paths to searchset classes")
+        parser.add_argument("--path", default=None, help="snapshot file, MAPPING_SNAPSHOT_PATH setting by default")
+
+    def handle(self, *args, **options):
+        path = options["path"] or lucyfer_settings.MAPPING_SNAPSHOT_PATH
+        if not path:
+            raise CommandError("Snapshot path is not set")
+
+        if options["searchsets"]:
+            searchset_classes = [import_string(searchset_path) for searchset_path in options["searchsets"]]
+        else:
+            autodiscover_modules("searchsets")
+            searchset_classes = None
+
+        snapshot = dump_snapshot(path=path, searchset_classes=searchset_classes)
+
+        for key, entry in sorted(snapshot["searchsets"].items()):
+            self.stdout.write(f"{key}: {len(entry['raw_mapping'])} mapping fields")
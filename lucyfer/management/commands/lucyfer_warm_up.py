@@ -0,0 +1,38 @@
+from django.core.management import BaseCommand, CommandError
+from django.utils.module_loading import autodiscover_modules, import_string
+
+from lucyfer.searchset.registry import searchset_registry
+from lucyfer.settings import lucyfer_settings
+
+
+class Command(BaseCommand):
+    help = "Checks that mappings and fields of searchsets can be built, " \
+           "all registered searchsets are used by default. Storages are built in this process only, " \
+           "mappings are shared with serving processes through django cache if MAPPING_CACHE_TIME is set"
+
+    def add_arguments(self, parser):
+        parser.add_argument("searchsets", nargs="*", help="dotted paths to searchset classes")
+        parser.add_argument("--workers", type=int, default=lucyfer_settings.WARM_UP_MAX_WORKERS,
+                            help="threads count")
+
+    def handle(self, *args, **options):
+        if options["searchsets"]:
+            searchset_classes = [import_string(searchset_path) for searchset_path in options["searchsets"]]
+        else:
+            autodiscover_modules("searchsets")
+            searchset_classes = None
+
+        results = searchset_registry.warm_up(searchset_classes=searchset_classes, max_workers=options["workers"])
+
+        failed = 0
+        for searchset_class, exception in results.items():
+            name = f"{searchset_class.__module__}.{searchset_class.__qualname__}"
+
+            if exception is None:
+                self.stdout.write(f"{name}: {len(searchset_class.storage.field_source_to_field)} fields")
+            else:
+                failed += 1
+                self.stderr.write(f"{name}: {exception!r}")
+
+        if failed:
+            raise CommandError(f"Warm up failed for {failed} of {len(results)} searchsets")
@@ -1,2 +1,4 @@
 from .django import LuceneToDjangoParserMixin
 from .elastic import LuceneToElasticParserMixin
+from .python import LuceneToPythonParserMixin
+from .saved_searches import SavedSearchResolver
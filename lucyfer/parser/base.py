@@ -1,43 +1,454 @@
+from typing import Optional, List, Any, Tuple, Dict, Callable, NamedTuple, Iterable
+
 from lucyparser import parse
+from lucyparser.cursor import Cursor
 from lucyparser.exceptions import BaseLucyException
-from lucyparser.tree import BaseNode
+from lucyparser.parsing import Parser
+from lucyparser.tree import BaseNode, ExpressionNode, LogicalNode, AndNode, OrNode, NotNode
 
-from lucyfer.utils import LuceneSearchException
+from lucyfer.parser.batch import CompileResult, get_trees_from_raw_expressions
+from lucyfer.parser.cache import ParsedQueryCache
+from lucyfer.parser.cost import QueryCost, QueryCostModel
+from lucyfer.parser.optimizer import optimize_tree, flatten_children
+from lucyfer.parser.ranges import merge_bounds
+from lucyfer.parser.saved_searches import SavedSearchResolver
+from lucyfer.settings import lucyfer_settings
+from lucyfer.utils import LuceneSearchException, LuceneSearchQueryTooExpensiveException
 
 
 __all__ = [
-    'BaseLuceneParserMixin'
+    'BaseLuceneParserMixin',
+    'CompiledQuery',
+    'LucyferParser',
 ]
 
 
+class CompiledQuery(NamedTuple):
+    query: Any
+    cost: QueryCost
+
+
+class LucyferParser(Parser):
+    """
+    lucyparsers Parser without tree simplification.
+    Original simplification is recursive and quadratic for long chains like `a OR b OR c ...`,
+    so we flatten tree by ourselves while optimization and compilation
+    """
+
+    def read_tree(self, cur: Cursor) -> BaseNode:
+        return self.read_expressions(cur)
+
+
 class BaseLuceneParserMixin:
+    _parser_class = LucyferParser
+
+    # weights for query cost estimation
+    query_cost_model = QueryCostModel()
+
+    # resolves saved search conditions if saved searches are enabled in settings
+    saved_search_resolver: Optional[SavedSearchResolver] = None
+
     @classmethod
     def parse(cls, raw_expression: str):
         """
         Parses raw expression to query tree
         """
-        tree = cls._get_tree_from_raw_expression(raw_expression=raw_expression)
+        return cls.compile(raw_expression=raw_expression).query
+
+    @classmethod
+    def compile(cls, raw_expression: str) -> CompiledQuery:
+        """
+        Parses raw expression to query tree and estimates its cost.
+        Raises LuceneSearchQueryTooExpensiveException if cost exceeds the limit
+        """
+        compiled_query = cls._get_cached_compiled_query(raw_expression=raw_expression)
+
+        if compiled_query is None:
+            tree = cls._get_tree_from_raw_expression(raw_expression=raw_expression)
+            compiled_query = cls._compile_tree(raw_expression=raw_expression, tree=tree)
+
+        return compiled_query
+
+    @classmethod
+    def parse_many(cls, raw_expressions: Iterable[str], max_workers: Optional[int] = None) -> List[Any]:
+        """
+        Parses several raw expressions to query trees. Query is None for expressions which can't be parsed
+        """
+        return [result.query for result in cls.compile_many(raw_expressions=raw_expressions, max_workers=max_workers)]
+
+    @classmethod
+    def compile_many(cls, raw_expressions: Iterable[str], max_workers: Optional[int] = None) -> List[CompileResult]:
+        """
+        Compiles several raw expressions. Errors are reported for each expression instead of raising.
+        Equal expressions are compiled once, too deep expressions are reported as errors too.
+
+        :param max_workers: tokenize expressions in process pool with this number of processes
+        """
+        raw_expressions = list(raw_expressions)
+        raw_expression_to_result = {}
+        not_cached = []
+
+        for raw_expression in dict.fromkeys(raw_expressions):
+            try:
+                compiled_query = cls._get_cached_compiled_query(raw_expression=raw_expression)
+            except LuceneSearchException as e:
+                raw_expression_to_result[raw_expression] = CompileResult(raw_expression=raw_expression, error=e)
+                continue
+
+            if compiled_query is None:
+                not_cached.append(raw_expression)
+            else:
+                raw_expression_to_result[raw_expression] = CompileResult.from_compiled_query(
+                    raw_expression=raw_expression, compiled_query=compiled_query,
+                )
+
+        trees = get_trees_from_raw_expressions(searchset_class=cls, raw_expressions=not_cached,
+                                               max_workers=max_workers)
+
+        for raw_expression, tree in zip(not_cached, trees):
+            try:
+                if isinstance(tree, LuceneSearchException):
+                    raise tree
+                compiled_query = cls._compile_tree(raw_expression=raw_expression, tree=tree)
+            except LuceneSearchException as e:
+                raw_expression_to_result[raw_expression] = CompileResult(raw_expression=raw_expression, error=e)
+            except RecursionError:
+                raw_expression_to_result[raw_expression] = CompileResult(
+                    raw_expression=raw_expression, error=LuceneSearchException("Expression is too deep"),
+                )
+            else:
+                raw_expression_to_result[raw_expression] = CompileResult.from_compiled_query(
+                    raw_expression=raw_expression, compiled_query=compiled_query,
+                )
+
+        return [raw_expression_to_result[raw_expression] for raw_expression in raw_expressions]
+
+    @classmethod
+    def _get_cached_compiled_query(cls, raw_expression: str) -> Optional[CompiledQuery]:
+        cache = cls.get_parsed_query_cache()
+        if cache is None:
+            return None
+
+        compiled_query = cache.get(raw_expression)
+        if compiled_query is not None:
+            cls._check_query_cost(cost=compiled_query.cost)
+
+        return compiled_query
+
+    @classmethod
+    def _compile_tree(cls, raw_expression: str, tree: BaseNode) -> CompiledQuery:
+        """
+        Compiles lucyparsers tree of raw expression and caches the result
+        """
+        return cls._compile_optimized_tree(raw_expression=raw_expression, tree=cls._optimize_tree(tree=tree))
+
+    @classmethod
+    def _compile_optimized_tree(cls, raw_expression: str, tree: BaseNode) -> CompiledQuery:
+        cost = cls._get_tree_cost(tree=tree)
+        cls._check_query_cost(cost=cost)
 
         parsed_tree = cls._parse_tree(tree=tree)
 
         if parsed_tree is None:
             raise LuceneSearchException()
 
-        return parsed_tree
+        compiled_query = CompiledQuery(query=parsed_tree, cost=cost)
+
+        cache = cls.get_parsed_query_cache()
+        if cache is not None and cls._is_cacheable_tree(tree=tree):
+            cache.set(raw_expression, compiled_query)
+
+        return compiled_query
+
+    @classmethod
+    def get_query_cost(cls, raw_expression: str) -> QueryCost:
+        """
+        Returns estimated cost of raw expression without query compilation
+        """
+        cache = cls.get_parsed_query_cache()
+
+        if cache is not None:
+            compiled_query = cache.peek(raw_expression)
+            if compiled_query is not None:
+                return compiled_query.cost
+
+        return cls._get_tree_cost(tree=cls._get_optimized_tree(raw_expression=raw_expression))
+
+    @classmethod
+    def _get_optimized_tree(cls, raw_expression: str) -> BaseNode:
+        tree = cls._get_tree_from_raw_expression(raw_expression=raw_expression)
+        return cls._optimize_tree(tree=tree)
+
+    @classmethod
+    def get_query_cost_limit(cls) -> Optional[float]:
+        """
+        Returns max cost of queries. Searchsets Meta option has priority over settings
+        """
+        limit = getattr(getattr(cls, '_meta', None), 'query_cost_limit', None)
+        return lucyfer_settings.QUERY_COST_LIMIT if limit is None else limit
+
+    @classmethod
+    def _check_query_cost(cls, cost: QueryCost) -> None:
+        limit = cls.get_query_cost_limit()
+
+        if limit is not None and cost.score > limit:
+            raise LuceneSearchQueryTooExpensiveException(cost=cost, limit=limit)
+
+    @classmethod
+    def _get_tree_cost(cls, tree: BaseNode) -> QueryCost:
+        """
+        Estimates query cost by its conditions before query compilation.
+        Saved searches cost as much as their resolved trees
+        """
+        cost = QueryCost()
+        stack = [tree]
+
+        while stack:
+            node = stack.pop()
+
+            if isinstance(node, LogicalNode):
+                stack.extend(node.children)
+
+            elif isinstance(node, ExpressionNode) and cls._is_saved_search_condition(node):
+                if cls.saved_search_resolver is not None:
+                    cost += cls.saved_search_resolver.get_cost(searchset_class=cls, saved_search_id=node.value)
+
+            elif isinstance(node, ExpressionNode):
+                field = cls.get_field(node.name)
+                cls.query_cost_model.add_condition(cost=cost,
+                                                   lookup_kind=field.get_lookup_kind(node),
+                                                   sources_count=len(field.get_sources(node.name)))
+
+        return cost
+
+    @classmethod
+    def _is_cacheable_tree(cls, tree: BaseNode) -> bool:
+        """
+        Returns True if compiled query of tree may be cached: it has no conditions relative to current time
+        and no saved searches with such conditions. Saved searches are cacheable only if they are resolved
+        by `saved_search_resolver`, which is invalidated on changes. Saved searches have to be resolved already
+        """
+        stack = [tree]
+
+        while stack:
+            node = stack.pop()
+
+            if isinstance(node, LogicalNode):
+                stack.extend(node.children)
+
+            elif isinstance(node, ExpressionNode):
+                if cls._is_saved_search_condition(node):
+                    # saved searches of overridden `get_saved_search` may be changed at any time
+                    if cls.saved_search_resolver is None or \
+                            not cls.saved_search_resolver.is_cacheable(saved_search_id=node.value):
+                        return False
+
+                elif not cls.get_field(node.name).is_cacheable_condition(node):
+                    return False
+
+        return True
+
+    @classmethod
+    def get_parsed_query_cache(cls) -> Optional[ParsedQueryCache]:
+        """
+        Returns cache for parsed queries. Searchsets keep it in its storage state
+        """
+        storage = getattr(cls, 'storage', None)
+        return storage.parsed_query_cache if storage is not None else None
 
     @classmethod
     def _parse_tree(cls, tree: BaseNode):
         """
-        Parses lucyparsers tree to query tree
+        Parses lucyparsers tree to query tree.
+        Tree is walked in one pass with explicit stack, so its depth and size are limited by memory only
+        """
+        results: List[Any] = []
+
+        # node, its children which have been pushed to stack already and queries for grouped children
+        stack = [(tree, None, None)]
+
+        while stack:
+            node, children, grouped_queries = stack.pop()
+
+            if not isinstance(node, LogicalNode):
+                results.append(cls._parse_expression(node))
+                continue
+
+            if children is None:
+                grouped_queries, children = cls._parse_grouped_children(node=node, children=flatten_children(node))
+                stack.append((node, children, grouped_queries))
+                stack.extend((child, None, None) for child in reversed(children))
+                continue
+
+            queries = results[len(results) - len(children):]
+            del results[len(results) - len(children):]
+
+            results.append(cls._parse_logical_node(node=node, queries=grouped_queries + queries))
+
+        return results.pop()
+
+    @classmethod
+    def _parse_expression(cls, tree: ExpressionNode):
+        """
+        Returns query for single condition
+        """
+        if cls._is_saved_search_condition(tree):
+            return cls.get_saved_search(tree)
+
+        return cls.get_query_for_field(tree)
+
+    @classmethod
+    def _parse_grouped_children(cls, node: LogicalNode, children: List[BaseNode]) -> Tuple[List[Any], List[BaseNode]]:
         """
+        Allows to compile several children of logical node into one query (for ex. `a: 1 OR a: 2` into `a IN (1, 2)`).
+        Returns queries for grouped children and children which have to be parsed as usual
+        """
+        return [], children
+
+    @classmethod
+    def _merge_same_field_conditions(cls,
+                                     children: List[BaseNode],
+                                     is_mergeable: Callable[[Any, ExpressionNode], bool],
+                                     get_merged_query: Callable[[Any, str, List[ExpressionNode]], Any],
+                                     ) -> Tuple[List[Any], List[BaseNode]]:
+        """
+        Compiles mergeable conditions on the same field into one query for each field.
+
+        :param children: children of logical node
+        :param is_mergeable: returns True if condition may be merged with others (field, condition)
+        :param get_merged_query: returns one query for several conditions (field, field name, conditions)
+
+        :return: queries for merged conditions and children which have to be parsed as usual
+        """
+        queries = []
+        merged_children = set()
+
+        for (field, field_name), conditions in cls._get_same_field_conditions(children).items():
+            conditions = [condition for condition in conditions if is_mergeable(field, condition)]
+            if len(conditions) < 2:
+                continue
+
+            queries.append(get_merged_query(field, field_name, conditions))
+            merged_children.update(id(condition) for condition in conditions)
+
+        if not merged_children:
+            return queries, children
+
+        return queries, [child for child in children if id(child) not in merged_children]
+
+    @classmethod
+    def _merge_range_conditions(cls, children: List[BaseNode]) -> Tuple[List[Any], List[BaseNode]]:
+        """
+        Compiles AND'ed comparisons on the same single source field into one range query for each field
+        (for ex. `a >= 1 AND a <= 5` into `1 <= a <= 5`). Contradictory bounds like `a > 10 AND a < 5`
+        are compiled into query which matches nothing without searching
+        """
+        return cls._merge_same_field_conditions(
+            children=children,
+            is_mergeable=lambda field, condition: field.get_range_bounds(condition) is not None,
+            get_merged_query=cls._get_query_for_range,
+        )
+
+    @classmethod
+    def _get_query_for_range(cls, field, field_name: str, conditions: List[ExpressionNode]):
+        bounds = merge_bounds(bound for condition in conditions for bound in field.get_range_bounds(condition))
+
+        if bounds is None:
+            return cls._combine_queries_with_and([cls._parse_expression(condition) for condition in conditions])
+
+        if bounds.is_empty:
+            return cls._get_empty_query()
+
+        return field.get_query_for_bounds(source=field.get_sources(field_name)[0], bounds=bounds.to_dict())
+
+    @classmethod
+    def _get_same_field_conditions(cls, children: List[BaseNode]) -> Dict[Tuple[Any, str], List[ExpressionNode]]:
+        """
+        Returns conditions grouped by field and its name. Field is resolved once for every name
+        """
+        name_to_field = {}
+        groups = {}
+
+        for child in children:
+            if not isinstance(child, ExpressionNode) or cls._is_saved_search_condition(child):
+                continue
+
+            if child.name not in name_to_field:
+                name_to_field[child.name] = cls.get_field(child.name)
+
+            field = name_to_field[child.name]
+            if field.merge_conditions:
+                groups.setdefault((field, child.name), []).append(child)
+
+        return groups
+
+    @classmethod
+    def _parse_logical_node(cls, node: LogicalNode, queries: List[Any]):
+        """
+        Returns query for logical node by queries of its children
+        """
+        if isinstance(node, AndNode):
+            return cls._combine_queries_with_and(queries)
+
+        if isinstance(node, OrNode):
+            return cls._combine_queries_with_or(queries)
+
+        if isinstance(node, NotNode):
+            return cls._negate_query(cls._combine_queries_with_and(queries))
+
+        raise LuceneSearchException()
+
+    @classmethod
+    def _combine_queries_with_and(cls, queries: List[Any]):
+        raise NotImplementedError()
+
+    @classmethod
+    def _combine_queries_with_or(cls, queries: List[Any]):
         raise NotImplementedError()
 
+    @classmethod
+    def _negate_query(cls, query):
+        raise NotImplementedError()
+
+    @classmethod
+    def _get_empty_query(cls):
+        """
+        Returns query which matches nothing
+        """
+        raise NotImplementedError()
+
+    @classmethod
+    def _optimize_tree(cls, tree: BaseNode) -> BaseNode:
+        """
+        Simplifies lucyparsers tree to make resulting query smaller
+        """
+        if not lucyfer_settings.OPTIMIZE_QUERY_TREE:
+            return tree
+
+        return optimize_tree(tree=tree, is_match_all=cls._is_match_all_condition)
+
+    @classmethod
+    def _is_match_all_condition(cls, condition: ExpressionNode) -> bool:
+        if cls._is_saved_search_condition(condition):
+            return False
+
+        return cls.get_field(condition.name).is_match_all_condition(condition)
+
+    @classmethod
+    def _is_saved_search_condition(cls, condition: ExpressionNode) -> bool:
+        return lucyfer_settings.SAVED_SEARCHES_ENABLE and condition.name == lucyfer_settings.SAVED_SEARCHES_KEY
+
     @classmethod
     def get_saved_search(cls, tree):
         """
         Add availability to use saved searches. For ex. you can save it in database and get it here.
+        Saved searches are resolved by `saved_search_resolver` if it is set. Queries with saved searches
+        of overridden method aren't cached, so changes of saved searches are seen at once
         """
-        return None
+        if cls.saved_search_resolver is None:
+            return None
+
+        return cls.saved_search_resolver.resolve(searchset_class=cls, saved_search_id=tree.value)
 
     @classmethod
     def _get_tree_from_raw_expression(cls, raw_expression):
@@ -45,10 +456,10 @@ class BaseLuceneParserMixin:
         Parses raw search string to lucy tree
         If you want to use some literals except of `string.ascii_letters + string.digits + "-.*_?!;,:@|"`
         you have to:
-        1. override lucyparser's Parser class and define your own value_chars in it
-        2. override that func and force your Parser class to parse func
+        1. override `LucyferParser` class and define your own value_chars in it
+        2. set your Parser class to `_parser_class` attribute of searchset
         """
         try:
-            return parse(string=raw_expression)
+            return parse(string=raw_expression, parser_class=cls._parser_class)
         except BaseLucyException:
             raise LuceneSearchException()
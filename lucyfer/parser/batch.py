@@ -0,0 +1,130 @@
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, List, Optional, Union
+
+from lucyparser.tree import BaseNode, LogicalNode, NotNode
+
+from lucyfer.parser.cost import QueryCost
+from lucyfer.parser.optimizer import flatten_children
+from lucyfer.utils import LuceneSearchException
+
+
+__all__ = [
+    'CompileResult',
+    'get_trees_from_raw_expressions',
+    'encode_tree',
+    'decode_tree',
+]
+
+
+@dataclass(frozen=True)
+class CompileResult:
+    raw_expression: str
+    query: Any = None
+    cost: Optional[QueryCost] = None
+    error: Optional[LuceneSearchException] = None
+
+    @classmethod
+    def from_compiled_query(cls, raw_expression: str, compiled_query) -> "CompileResult":
+        return cls(raw_expression=raw_expression, query=compiled_query.query, cost=compiled_query.cost)
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _get_tree_or_error(searchset_class, raw_expression: str) -> Union[BaseNode, LuceneSearchException]:
+    try:
+        return searchset_class._get_tree_from_raw_expression(raw_expression=raw_expression)
+    except LuceneSearchException as e:
+        return e
+    except RecursionError:
+        return LuceneSearchException("Expression is too deep")
+
+
+def encode_tree(tree: BaseNode) -> List[Any]:
+    """
+    Returns tree in post order: conditions and (logical node class, children count) pairs.
+    lucyparsers trees of long chains are deeply nested and can't be pickled, flat list is pickled without recursion
+    """
+    result = []
+    stack = [(tree, None)]
+
+    while stack:
+        node, children = stack.pop()
+
+        if not isinstance(node, LogicalNode):
+            result.append(node)
+            continue
+
+        if children is None:
+            children = node.children if isinstance(node, NotNode) else flatten_children(node)
+            stack.append((node, children))
+            stack.extend((child, None) for child in reversed(children))
+            continue
+
+        result.append((type(node), len(children)))
+
+    return result
+
+
+def decode_tree(encoded_tree: List[Any]) -> BaseNode:
+    """
+    Builds tree from `encode_tree` result. Chains are built flat, so compilation doesn't flatten them again
+    """
+    stack = []
+
+    for item in encoded_tree:
+        if not isinstance(item, tuple):
+            stack.append(item)
+            continue
+
+        node_class, children_count = item
+        children = stack[len(stack) - children_count:]
+        del stack[len(stack) - children_count:]
+        stack.append(node_class(children=children))
+
+    return stack.pop()
+
+
+def _get_encoded_trees_or_errors(searchset_class, raw_expressions: List[str]) -> List[Any]:
+    results = []
+
+    for raw_expression in raw_expressions:
+        tree = _get_tree_or_error(searchset_class, raw_expression)
+        results.append(tree if isinstance(tree, LuceneSearchException) else encode_tree(tree))
+
+    return results
+
+
+def get_trees_from_raw_expressions(searchset_class, raw_expressions: List[str],
+                                   max_workers: Optional[int] = None) -> List[Union[BaseNode, LuceneSearchException]]:
+    """
+    Tokenizes raw expressions to lucyparsers trees, errors are returned instead of trees.
+    Tokenization is CPU-bound, so it may be done in process pool. Searchset class has to be importable then.
+    Trees are sent from pool flattened, chunks which pool fails to return are tokenized in current process.
+    Trees are compiled to queries in current process, so searchsets storage is built once
+    """
+    if not max_workers or max_workers < 2 or len(raw_expressions) < 2:
+        return [_get_tree_or_error(searchset_class, raw_expression) for raw_expression in raw_expressions]
+
+    chunksize = max(1, len(raw_expressions) // (max_workers * 4))
+    chunks = [raw_expressions[i:i + chunksize] for i in range(0, len(raw_expressions), chunksize)]
+
+    results = []
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(_get_encoded_trees_or_errors, searchset_class, chunk) for chunk in chunks]
+
+        for chunk, future in zip(chunks, futures):
+            try:
+                encoded_trees = future.result()
+            except Exception:
+                # for ex. pickling errors, errors are reported for each expression by tokenizing them here
+                results.extend(_get_tree_or_error(searchset_class, raw_expression) for raw_expression in chunk)
+                continue
+
+            results.extend(tree if isinstance(tree, LuceneSearchException) else decode_tree(tree)
+                           for tree in encoded_trees)
+
+    return results
@@ -0,0 +1,112 @@
+import threading
+from collections import OrderedDict, namedtuple
+from typing import Any, Optional
+from weakref import WeakSet
+
+from django.test.signals import setting_changed
+
+from lucyfer.settings import lucyfer_settings, LUCYFER_SETTINGS_NAME
+
+
+__all__ = [
+    'CacheInfo',
+    'ParsedQueryCache',
+    'clear_parsed_query_caches',
+]
+
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "evictions", "maxsize", "currsize"])
+
+
+class ParsedQueryCache:
+    """
+    Bounded LRU cache which maps raw expressions to compiled queries.
+    Cached queries are shared between callers, so they must not be changed in place.
+    """
+
+    _instances = WeakSet()
+
+    def __init__(self, maxsize: Optional[int] = None):
+        # if maxsize is None we take it from settings, so it may be changed without caches recreation
+        self._maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._instances.add(self)
+
+    @property
+    def maxsize(self) -> int:
+        if self._maxsize is None:
+            return lucyfer_settings.PARSED_QUERY_CACHE_SIZE or 0
+        return self._maxsize
+
+    def get(self, raw_expression: str) -> Optional[Any]:
+        """
+        Returns cached query or None if expression is not cached yet
+        """
+        with self._lock:
+            try:
+                query = self._data[raw_expression]
+            except KeyError:
+                self.misses += 1
+                return None
+
+            self._data.move_to_end(raw_expression)
+            self.hits += 1
+            return query
+
+    def peek(self, raw_expression: str) -> Optional[Any]:
+        """
+        Returns cached query without counting hit or miss and without updating its recency
+        """
+        with self._lock:
+            return self._data.get(raw_expression)
+
+    def set(self, raw_expression: str, query: Any) -> None:
+        maxsize = self.maxsize
+        if maxsize <= 0:
+            return
+
+        with self._lock:
+            self._data[raw_expression] = query
+            self._data.move_to_end(raw_expression)
+
+            while len(self._data) > maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        Drops cached queries. Counters are kept to have statistics for the whole process lifetime
+        """
+        with self._lock:
+            self._data.clear()
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(hits=self.hits, misses=self.misses, evictions=self.evictions,
+                             maxsize=self.maxsize, currsize=len(self._data))
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, raw_expression):
+        return raw_expression in self._data
+
+
+def clear_parsed_query_caches(*args, **kwargs):
+    """
+    Clears all parsed query caches. Compiled queries depend on settings, so we drop it when settings are changed
+    """
+    if kwargs.get('setting', LUCYFER_SETTINGS_NAME) != LUCYFER_SETTINGS_NAME:
+        return
+
+    for cache in list(ParsedQueryCache._instances):
+        cache.clear()
+
+
+setting_changed.connect(clear_parsed_query_caches)
@@ -0,0 +1,77 @@
+from dataclasses import dataclass, fields
+from enum import Enum, unique
+
+
+__all__ = [
+    'LookupKind',
+    'QueryCost',
+    'QueryCostModel',
+]
+
+
+@unique
+class LookupKind(Enum):
+    """
+    Kind of lookup which field uses for condition. Fields report it to estimate query cost
+    """
+    TERM = 1
+    RANGE = 2
+    WILDCARD = 3
+    LEADING_WILDCARD = 4  # also substring search like `icontains` which can't use index
+    REGEXP = 5
+
+
+@dataclass
+class QueryCost:
+    score: float = 0
+
+    leaves: int = 0
+    sources: int = 0
+    wildcards: int = 0
+    leading_wildcards: int = 0
+    regexps: int = 0
+
+    def __add__(self, other: "QueryCost") -> "QueryCost":
+        return QueryCost(**{field.name: getattr(self, field.name) + getattr(other, field.name)
+                            for field in fields(self)})
+
+
+@dataclass(frozen=True)
+class QueryCostModel:
+    """
+    Weights for query cost estimation. Each condition costs `leaf_cost` plus for each of its sources
+    `source_cost` and cost of lookup kind, so regexp over 50 sources is much more expensive than over one
+    """
+    leaf_cost: float = 1
+    source_cost: float = 1
+
+    term_cost: float = 0
+    range_cost: float = 1
+    wildcard_cost: float = 5
+    leading_wildcard_cost: float = 25
+    regexp_cost: float = 50
+
+    def get_lookup_kind_cost(self, lookup_kind: LookupKind) -> float:
+        return {
+            LookupKind.TERM: self.term_cost,
+            LookupKind.RANGE: self.range_cost,
+            LookupKind.WILDCARD: self.wildcard_cost,
+            LookupKind.LEADING_WILDCARD: self.leading_wildcard_cost,
+            LookupKind.REGEXP: self.regexp_cost,
+        }[lookup_kind]
+
+    def add_condition(self, cost: QueryCost, lookup_kind: LookupKind, sources_count: int) -> None:
+        """
+        Adds cost of one condition to query cost
+        """
+        cost.leaves += 1
+        cost.sources += sources_count
+
+        if lookup_kind == LookupKind.WILDCARD:
+            cost.wildcards += 1
+        elif lookup_kind == LookupKind.LEADING_WILDCARD:
+            cost.leading_wildcards += 1
+        elif lookup_kind == LookupKind.REGEXP:
+            cost.regexps += 1
+
+        cost.score += self.leaf_cost + sources_count * (self.source_cost + self.get_lookup_kind_cost(lookup_kind))
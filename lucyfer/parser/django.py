@@ -1,42 +1,81 @@
+from typing import List
+
 from django.db.models import Q
-from lucyparser.tree import ExpressionNode, AndNode, OrNode, NotNode
+from lucyparser.tree import AndNode, OrNode, ExpressionNode
 
 from lucyfer.parser.base import BaseLuceneParserMixin
-from lucyfer.settings import lucyfer_settings
 
 
 class LuceneToDjangoParserMixin(BaseLuceneParserMixin):
     @classmethod
-    def _parse_tree(cls, tree):
-        if isinstance(tree, ExpressionNode):
-            if lucyfer_settings.SAVED_SEARCHES_ENABLE and tree.name == lucyfer_settings.SAVED_SEARCHES_KEY:
-                return cls.get_saved_search(tree)
+    def _parse_grouped_children(cls, node, children):
+        """
+        Merges OR'ed exact match conditions on the same field into one `__in` lookup per source
+        and AND'ed comparisons on the same source into one range
+        """
+        if isinstance(node, AndNode):
+            return cls._merge_range_conditions(children=children)
+
+        if not isinstance(node, OrNode):
+            return [], children
+
+        return cls._merge_same_field_conditions(
+            children=children,
+            is_mergeable=lambda field, condition: field.is_in_condition(condition),
+            get_merged_query=cls._get_query_for_in,
+        )
+
+    @classmethod
+    def _get_query_for_in(cls, field, field_name: str, conditions: List[ExpressionNode]):
+        values = list(dict.fromkeys(field.cast_value(condition.value) for condition in conditions))
+        return field.get_query_for_in(field_name=field_name, values=values)
+
+    @classmethod
+    def _combine_queries_with_and(cls, queries):
+        return cls._combine_queries(queries=queries, connector=Q.AND)
 
-            return cls.get_query_for_field(tree)
+    @classmethod
+    def _combine_queries_with_or(cls, queries):
+        return cls._combine_queries(queries=queries, connector=Q.OR)
 
-        is_and_node = isinstance(tree, AndNode)
-        is_or_node = isinstance(tree, OrNode)
-        is_not_node = isinstance(tree, NotNode)
+    @classmethod
+    def _negate_query(cls, query):
+        return ~Q(query)
+
+    @classmethod
+    def _get_empty_query(cls):
+        return Q(pk__in=[])
+
+    @classmethod
+    def _is_empty_query(cls, query) -> bool:
+        return not query.negated and query.children == [("pk__in", [])]
+
+    @classmethod
+    def _combine_queries(cls, queries, connector):
+        """
+        Combines queries in one Q object the same way as `&` and `|` do but in linear time.
+        Conditions which don't filter anything (None or empty Q) are skipped,
+        queries which match nothing make AND empty and are dropped from OR
+        """
+        queries = [q for q in queries if q]
 
-        query = Q()
+        if connector == Q.AND and any(cls._is_empty_query(q) for q in queries):
+            return cls._get_empty_query()
 
-        if is_and_node or is_not_node or is_or_node:
-            queries = [cls._parse_tree(tree=child) for child in tree.children]
-            queries = [q for q in queries if q is not None]
+        if connector == Q.OR and len(queries) > 1:
+            queries = [q for q in queries if not cls._is_empty_query(q)] or [cls._get_empty_query()]
 
-            if is_and_node:
-                for q in queries:
-                    query = query & q
-                query = (query)
+        if not queries:
+            return Q()
 
-            elif is_or_node:
-                for q in queries:
-                    query = query | q
-                query = (query)
+        if len(queries) == 1:
+            return queries[0]
 
-            elif is_not_node:
-                for q in queries:
-                    query = query & q
-                query = ~Q(query)
+        children = []
+        for q in queries:
+            if not q.negated and (q.connector == connector or len(q) == 1):
+                children.extend(q.children)
+            else:
+                children.append(q)
 
-        return query
+        return Q(*children, _connector=connector)
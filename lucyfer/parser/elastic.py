@@ -1,5 +1,8 @@
+from typing import Any, Dict, List, Optional
+
 from elasticsearch_dsl import Q
-from lucyparser.tree import ExpressionNode, AndNode, OrNode, NotNode
+from elasticsearch_dsl.query import Bool, MatchAll, MatchNone
+from lucyparser.tree import AndNode, OrNode, ExpressionNode
 
 from lucyfer.parser.base import BaseLuceneParserMixin
 from lucyfer.settings import lucyfer_settings
@@ -7,35 +10,122 @@ from lucyfer.settings import lucyfer_settings
 
 class LuceneToElasticParserMixin(BaseLuceneParserMixin):
     @classmethod
-    def _parse_tree(cls, tree):
-        if isinstance(tree, ExpressionNode):
-            if lucyfer_settings.SAVED_SEARCHES_ENABLE and tree.name == lucyfer_settings.SAVED_SEARCHES_KEY:
-                return cls.get_saved_search(tree)
+    def _parse_expression(cls, tree):
+        if cls._is_saved_search_condition(tree):
+            return cls.get_saved_search(tree)
+
+        return cls.get_query_for_field(tree) or ~Q()
+
+    @classmethod
+    def _parse_grouped_children(cls, node, children):
+        """
+        Merges exact match conditions on the same field in OR node into one `terms` query per source
+        and comparisons on the same source in AND node into one `range` query if field has `merge_ranges` option
+        """
+        if isinstance(node, AndNode):
+            return cls._merge_range_conditions(children=children)
+
+        if not isinstance(node, OrNode):
+            return [], children
+
+        return cls._merge_same_field_conditions(
+            children=children,
+            is_mergeable=lambda field, condition: field.is_terms_condition(condition),
+            get_merged_query=cls._get_query_for_terms,
+        )
+
+    @classmethod
+    def _get_query_for_terms(cls, field, field_name: str, conditions: List[ExpressionNode]):
+        values = list(dict.fromkeys(field.cast_value(condition.value) for condition in conditions))
+
+        max_terms_count = lucyfer_settings.MAX_TERMS_COUNT
+        lookup_min_values_count = lucyfer_settings.TERMS_LOOKUP_MIN_VALUES_COUNT
+
+        queries = []
+
+        for source in field.get_sources(field_name):
+            terms_lookup = None
+            if lookup_min_values_count is not None and len(values) >= lookup_min_values_count:
+                terms_lookup = cls.get_terms_lookup(source=source, values=values)
 
-            return cls.get_query_for_field(tree) or ~Q()
+            if terms_lookup is not None:
+                queries.append(field.get_query_for_terms(source=source, values=terms_lookup))
+                continue
 
-        query = ~Q()
+            for i in range(0, len(values), max_terms_count):
+                queries.append(field.get_query_for_terms(source=source, values=values[i:i + max_terms_count]))
 
-        is_and_node = isinstance(tree, AndNode)
-        is_or_node = isinstance(tree, OrNode)
-        is_not_node = isinstance(tree, NotNode)
+        return cls._combine_queries_with_or(queries)
 
-        if is_and_node or is_not_node or is_or_node:
-            queries = [cls._parse_tree(tree=child) for child in tree.children]
+    @classmethod
+    def get_terms_lookup(cls, source: str, values: List[Any]) -> Optional[Dict[str, Any]]:
+        """
+        Returns terms lookup (like {"index": ..., "id": ..., "path": ...}) to use it instead of very long values list.
+        For ex. you can save values in some lookup index here. Values are used as is by default
+        """
+        return None
+
+    @classmethod
+    def _combine_queries_with_and(cls, queries):
+        """
+        Combines queries in one bool query the same way as `&` does but in linear time
+        """
+        must, must_not, filter_ = [], [], []
 
-            query = queries[0]
+        for q in queries:
+            if q is None or isinstance(q, MatchAll):
+                continue
 
-            if is_and_node:
-                for q in queries[1:]:
-                    query = query & q
+            if isinstance(q, MatchNone):
+                return q
 
-            elif is_or_node:
-                for q in queries[1:]:
-                    query = query | q
+            if isinstance(q, Bool) and set(q._params) <= {"must", "must_not", "filter"}:
+                must.extend(q.must)
+                must_not.extend(q.must_not)
+                filter_.extend(q.filter)
+            else:
+                must.append(q)
 
-            elif is_not_node:
-                for q in queries[1:]:
-                    query = query & q
-                query = ~Q(query)
+        if len(must) == 1 and not must_not and not filter_:
+            return must[0]
 
-        return query
+        if not (must or must_not or filter_):
+            return MatchAll()
+
+        return Bool(**{key: value for key, value in (("must", must), ("must_not", must_not), ("filter", filter_))
+                       if value})
+
+    @classmethod
+    def _combine_queries_with_or(cls, queries):
+        """
+        Combines queries in one bool query the same way as `|` does but in linear time
+        """
+        should = []
+
+        for q in queries:
+            if q is None or isinstance(q, MatchNone):
+                continue
+
+            if isinstance(q, MatchAll):
+                return q
+
+            if isinstance(q, Bool) and set(q._params) == {"should"}:
+                should.extend(q.should)
+            else:
+                should.append(q)
+
+        if len(should) == 1:
+            return should[0]
+
+        if not should:
+            return MatchNone()
+
+        return Bool(should=should)
+
+    @classmethod
+    def _negate_query(cls, query):
+        return ~Q(query)
+
+    @classmethod
+    def _get_empty_query(cls):
+        return MatchNone()
@@ -0,0 +1,191 @@
+from typing import Callable, Dict, List, Tuple, Optional
+
+from lucyparser.tree import BaseNode, ExpressionNode, LogicalNode, AndNode, OrNode, NotNode
+
+
+__all__ = [
+    'flatten_children',
+    'optimize_tree',
+]
+
+
+class _MatchAll:
+    """
+    Marker for subtree which doesn't filter anything. Keeps original node to use it if it can't be folded
+    """
+
+    def __init__(self, node: BaseNode):
+        self.node = node
+
+
+def optimize_tree(tree: BaseNode, is_match_all: Callable[[ExpressionNode], bool]) -> BaseNode:
+    """
+    Simplifies lucyparsers tree before compilation:
+    - flattens nested AND and OR nodes
+    - removes duplicated children
+    - folds away conditions which match everything (`field: *`) and empty logical nodes
+    - cancels double negations
+
+    Tree is walked without recursion, so it works with trees of any depth.
+
+    :param tree: lucyparsers tree
+    :param is_match_all: returns True for conditions which don't filter anything
+    """
+    return _TreeOptimizer(is_match_all=is_match_all).optimize(tree=tree)
+
+
+def flatten_children(node: LogicalNode) -> List[BaseNode]:
+    """
+    Returns children of AND or OR node together with children of nested nodes of the same type.
+    Long chains like `a OR b OR c` are parsed to deeply nested trees, so we flatten it before processing.
+    Nodes with single child (lucyparser wraps each condition into AND node) are replaced by its child
+    """
+    node_class = type(node)
+
+    result = []
+    stack = list(reversed(node.children))
+
+    while stack:
+        child = stack.pop()
+        if type(child) is node_class and node_class is not NotNode:
+            stack.extend(reversed(child.children))
+        elif isinstance(child, (AndNode, OrNode)) and len(child.children) == 1:
+            stack.append(child.children[0])
+        else:
+            result.append(child)
+
+    return result
+
+
+class _TreeOptimizer:
+    def __init__(self, is_match_all: Callable[[ExpressionNode], bool]):
+        self.is_match_all = is_match_all
+
+        # each unique subtree gets an integer key, so comparing of subtrees is cheap
+        self.keys: Dict[Tuple, int] = {}
+
+        # built logical nodes to keys of its children and built negations to its negated subtrees.
+        # nodes are kept in values to be sure ids are not reused while optimization
+        self.children_keys: Dict[int, Tuple[LogicalNode, Tuple[int, ...]]] = {}
+        self.negated: Dict[int, Tuple[NotNode, Tuple[object, int]]] = {}
+
+    def optimize(self, tree: BaseNode) -> BaseNode:
+        results: List[Tuple[object, int]] = []
+
+        # node and its children if they have been pushed to stack already
+        stack: List[Tuple[BaseNode, Optional[List[BaseNode]]]] = [(tree, None)]
+
+        while stack:
+            node, children = stack.pop()
+
+            if isinstance(node, ExpressionNode):
+                key = self._get_key(("expr", node.name, node.operator, node.value))
+                results.append((_MatchAll(node) if self.is_match_all(node) else node, key))
+                continue
+
+            if not isinstance(node, LogicalNode):
+                results.append((node, self._get_unique_key()))
+                continue
+
+            if children is None:
+                children = flatten_children(node)
+                stack.append((node, children))
+                stack.extend((child, None) for child in reversed(children))
+                continue
+
+            children = results[len(results) - len(children):]
+            del results[len(results) - len(children):]
+
+            if isinstance(node, OrNode):
+                results.append(self._build_or_node(children=children))
+            elif isinstance(node, NotNode):
+                results.append(self._build_not_node(children=children))
+            else:
+                results.append(self._build_and_node(children=children))
+
+        result, _ = results.pop()
+
+        if isinstance(result, _MatchAll):
+            # the whole expression doesn't filter anything.
+            # single condition is kept as is to let compilers process it the same way as before
+            return result.node if result.node is tree else AndNode(children=[])
+
+        return result
+
+    def _get_key(self, value: Tuple) -> int:
+        return self.keys.setdefault(value, len(self.keys))
+
+    def _get_unique_key(self) -> int:
+        return self._get_key(("unique", len(self.keys)))
+
+    def _build_and_node(self, children):
+        unique_children = self._unique_children(children=children, node_class=AndNode)
+
+        if not unique_children:
+            match_all = next((child for child, _ in children if isinstance(child, _MatchAll)), None)
+            return match_all or _MatchAll(AndNode(children=[])), -1
+
+        return self._build_logical_node(node_class=AndNode, children=unique_children)
+
+    def _build_or_node(self, children):
+        match_all = next((child for child, _ in children if isinstance(child, _MatchAll)), None)
+        if match_all is not None:
+            return match_all, -1
+
+        unique_children = self._unique_children(children=children, node_class=OrNode)
+        if not unique_children:
+            return _MatchAll(OrNode(children=[])), -1
+
+        return self._build_logical_node(node_class=OrNode, children=unique_children)
+
+    def _build_not_node(self, children):
+        inner = self._build_and_node(children=children)
+        node, key = inner
+
+        if id(node) in self.negated:
+            # NOT NOT x -> x
+            return self.negated[id(node)][1]
+
+        if isinstance(node, _MatchAll):
+            # negation of everything can't be folded without knowledge about backend, so we keep it
+            node = node.node
+            key = self._get_unique_key()
+
+        not_node = NotNode(children=[node])
+        self.negated[id(not_node)] = (not_node, inner)
+
+        return not_node, self._get_key(("not", key))
+
+    def _unique_children(self, children, node_class):
+        """
+        Returns children without match all markers and duplicates. Children of the same type are flattened
+        """
+        seen = set()
+        result = []
+
+        for child, key in children:
+            if isinstance(child, _MatchAll):
+                continue
+
+            if isinstance(child, node_class) and id(child) in self.children_keys:
+                nested = zip(child.children, self.children_keys[id(child)][1])
+            else:
+                nested = ((child, key),)
+
+            for nested_child, nested_key in nested:
+                if nested_key not in seen:
+                    seen.add(nested_key)
+                    result.append((nested_child, nested_key))
+
+        return result
+
+    def _build_logical_node(self, node_class, children):
+        if len(children) == 1:
+            return children[0]
+
+        children_keys = tuple(key for _, key in children)
+
+        node = node_class(children=[child for child, _ in children])
+        self.children_keys[id(node)] = (node, children_keys)
+
+        return node, self._get_key((node_class.__name__, children_keys))
@@ -0,0 +1,83 @@
+from typing import List
+
+import pandas as pd
+from lucyparser.tree import OrNode, ExpressionNode
+
+from lucyfer.parser.base import BaseLuceneParserMixin
+
+
+def match_all(df: pd.DataFrame) -> pd.Series:
+    return pd.Series(True, index=df.index)
+
+
+class LuceneToPandasParserMixin(BaseLuceneParserMixin):
+    """
+    Compiles lucene expressions to functions which return boolean mask for DataFrame.
+    Masks of conditions are combined by `&`, `|` and `~`
+    """
+
+    @classmethod
+    def _parse_expression(cls, tree):
+        if cls._is_saved_search_condition(tree):
+            return cls.get_saved_search(tree) or match_all
+
+        return cls.get_query_for_field(tree) or match_all
+
+    @classmethod
+    def _parse_grouped_children(cls, node, children):
+        """
+        Merges OR'ed exact match conditions on the same field into one `isin` mask
+        """
+        if not isinstance(node, OrNode):
+            return [], children
+
+        return cls._merge_same_field_conditions(
+            children=children,
+            is_mergeable=lambda field, condition: field.is_in_condition(condition),
+            get_merged_query=cls._get_query_for_in,
+        )
+
+    @classmethod
+    def _get_query_for_in(cls, field, field_name: str, conditions: List[ExpressionNode]):
+        values = list(dict.fromkeys(field.cast_value(condition.value) for condition in conditions))
+        return field.get_query_for_in(field_name=field_name, values=values)
+
+    @classmethod
+    def _combine_queries_with_and(cls, queries):
+        mask_functions = [q for q in queries if q is not match_all]
+
+        if not mask_functions:
+            return match_all
+
+        if len(mask_functions) == 1:
+            return mask_functions[0]
+
+        def mask_function(df):
+            mask = mask_functions[0](df)
+            for function in mask_functions[1:]:
+                mask &= function(df)
+            return mask
+
+        return mask_function
+
+    @classmethod
+    def _combine_queries_with_or(cls, queries):
+        mask_functions = list(queries)
+
+        if not mask_functions or match_all in mask_functions:
+            return match_all
+
+        if len(mask_functions) == 1:
+            return mask_functions[0]
+
+        def mask_function(df):
+            mask = mask_functions[0](df)
+            for function in mask_functions[1:]:
+                mask |= function(df)
+            return mask
+
+        return mask_function
+
+    @classmethod
+    def _negate_query(cls, query):
+        return lambda df: ~query(df)
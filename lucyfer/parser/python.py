@@ -0,0 +1,81 @@
+from typing import List
+
+from lucyparser.tree import OrNode, ExpressionNode
+
+from lucyfer.parser.base import BaseLuceneParserMixin
+
+
+def match_all(record) -> bool:
+    return True
+
+
+class LuceneToPythonParserMixin(BaseLuceneParserMixin):
+    """
+    Compiles lucene expressions to predicates: functions which take a record and return True if it matches
+    """
+
+    @classmethod
+    def _parse_expression(cls, tree):
+        if cls._is_saved_search_condition(tree):
+            return cls.get_saved_search(tree) or match_all
+
+        return cls.get_query_for_field(tree) or match_all
+
+    @classmethod
+    def _parse_grouped_children(cls, node, children):
+        """
+        Merges OR'ed exact match conditions on the same field into one set lookup
+        """
+        if not isinstance(node, OrNode):
+            return [], children
+
+        return cls._merge_same_field_conditions(
+            children=children,
+            is_mergeable=lambda field, condition: field.is_in_condition(condition),
+            get_merged_query=cls._get_query_for_in,
+        )
+
+    @classmethod
+    def _get_query_for_in(cls, field, field_name: str, conditions: List[ExpressionNode]):
+        return field.get_query_for_in(field_name=field_name,
+                                      values=[field.cast_value(condition.value) for condition in conditions])
+
+    @classmethod
+    def _combine_queries_with_and(cls, queries):
+        predicates = tuple(q for q in queries if q is not match_all)
+
+        if not predicates:
+            return match_all
+
+        if len(predicates) == 1:
+            return predicates[0]
+
+        def predicate(record):
+            for p in predicates:
+                if not p(record):
+                    return False
+            return True
+
+        return predicate
+
+    @classmethod
+    def _combine_queries_with_or(cls, queries):
+        predicates = tuple(queries)
+
+        if not predicates or match_all in predicates:
+            return match_all
+
+        if len(predicates) == 1:
+            return predicates[0]
+
+        def predicate(record):
+            for p in predicates:
+                if p(record):
+                    return True
+            return False
+
+        return predicate
+
+    @classmethod
+    def _negate_query(cls, query):
+        return lambda record: not query(record)
@@ -0,0 +1,68 @@
+from datetime import datetime
+from typing import Any, Iterable, List, NamedTuple, Optional, Tuple
+
+
+__all__ = [
+    'RANGE_LOOKUPS',
+    'RangeBounds',
+    'merge_bounds',
+]
+
+
+LOWER_LOOKUPS = ("gt", "gte")
+UPPER_LOOKUPS = ("lt", "lte")
+RANGE_LOOKUPS = LOWER_LOOKUPS + UPPER_LOOKUPS
+
+
+class RangeBounds(NamedTuple):
+    """
+    Bounds of one range: lookups with values, for ex. ("gte", 100) and ("lt", 5000)
+    """
+    lower: Optional[Tuple[str, Any]]
+    upper: Optional[Tuple[str, Any]]
+    is_empty: bool = False
+
+    def to_dict(self):
+        return dict(bound for bound in (self.lower, self.upper) if bound is not None)
+
+
+def is_comparable(values: List[Any]) -> bool:
+    """
+    Returns True if values are compared by backends the same way as in python.
+    Strings are not: they may be values of ip addresses or numbers in mapping of unknown field type
+    """
+    if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in values):
+        return True
+
+    if all(isinstance(value, datetime) for value in values):
+        # naive and aware datetimes can't be compared
+        return len({value.tzinfo is None for value in values}) == 1
+
+    return False
+
+
+def merge_bounds(bounds: Iterable[Tuple[str, Any]]) -> Optional[RangeBounds]:
+    """
+    Merges AND'ed bounds of one source into one range. The strictest bound is kept on each side
+    and bounds which can't be met together make the range empty.
+    Returns None if several bounds on one side have values which can't be compared
+    """
+    bounds = list(bounds)
+    lowers = [bound for bound in bounds if bound[0] in LOWER_LOOKUPS]
+    uppers = [bound for bound in bounds if bound[0] in UPPER_LOOKUPS]
+
+    if not is_comparable([value for _, value in bounds]):
+        if len(lowers) > 1 or len(uppers) > 1:
+            return None
+
+        return RangeBounds(lower=lowers[0] if lowers else None, upper=uppers[0] if uppers else None)
+
+    # exclusive bound is stricter than inclusive one with the same value
+    lower = max(lowers, key=lambda bound: (bound[1], bound[0] == "gt"), default=None)
+    upper = min(uppers, key=lambda bound: (bound[1], bound[0] == "lte"), default=None)
+
+    is_empty = False
+    if lower is not None and upper is not None:
+        is_empty = lower[1] > upper[1] or (lower[1] == upper[1] and (lower[0], upper[0]) != ("gte", "lte"))
+
+    return RangeBounds(lower=lower, upper=upper, is_empty=is_empty)
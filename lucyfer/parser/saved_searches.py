@@ -0,0 +1,154 @@
+import threading
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from lucyfer.parser.cache import clear_parsed_query_caches
+from lucyfer.parser.cost import QueryCost
+from lucyfer.utils import LuceneSearchInvalidValueException, LuceneSearchSavedSearchCycleException
+
+
+__all__ = [
+    'SavedSearchResolver',
+]
+
+
+class SavedSearchResolver:
+    """
+    Resolves saved search conditions to queries.
+
+    `loader` returns raw expression of saved search and its version by saved search id
+    or None if there is no such saved search. Saved search is loaded and compiled once for each searchset,
+    so you have to call `invalidate` when saved search is changed (for ex. in post_save signal handler).
+    Saved searches may reference other saved searches, references with cycles raise an exception.
+    """
+
+    def __init__(self, loader: Callable[[str], Optional[Tuple[str, Any]]]):
+        self.loader = loader
+
+        self._lock = threading.RLock()
+        self._local = threading.local()
+
+        # saved search id to its expression and version
+        self._saved_searches: Dict[str, Tuple[str, Any]] = {}
+        # (searchset class, saved search id, version) to compiled query
+        self._queries: Dict[Tuple[Any, str, Any], Any] = {}
+        # (searchset class, saved search id, version) to estimated cost of its query, costs of volatile saved searches
+        # are memoized too
+        self._costs: Dict[Tuple[Any, str, Any], QueryCost] = {}
+        # saved search id to ids of saved searches which reference it
+        self._dependents: Dict[str, Set[str]] = {}
+        # ids of saved searches which queries mustn't be cached (for ex. relative to current time)
+        self._volatile: Set[str] = set()
+
+    def resolve(self, searchset_class, saved_search_id: str):
+        """
+        Returns query of saved search for searchset
+        """
+        return self._resolve(searchset_class=searchset_class, saved_search_id=saved_search_id)[0]
+
+    def get_cost(self, searchset_class, saved_search_id: str) -> QueryCost:
+        """
+        Returns estimated cost of saved search query for searchset. Saved search is compiled if it isn't yet
+        """
+        return self._resolve(searchset_class=searchset_class, saved_search_id=saved_search_id, cost_only=True)[1]
+
+    def _resolve(self, searchset_class, saved_search_id: str, cost_only: bool = False) -> Tuple[Any, QueryCost]:
+        resolving = self._get_resolving()
+
+        if saved_search_id in resolving:
+            raise LuceneSearchSavedSearchCycleException(ids=resolving[resolving.index(saved_search_id):] +
+                                                        [saved_search_id])
+
+        if resolving:
+            with self._lock:
+                self._dependents.setdefault(saved_search_id, set()).add(resolving[-1])
+
+        raw_expression, version = self._get_saved_search(saved_search_id)
+        key = (searchset_class, saved_search_id, version)
+
+        with self._lock:
+            if key in self._queries:
+                return self._queries[key], self._costs[key]
+            if cost_only and key in self._costs:
+                return None, self._costs[key]
+
+        resolving.append(saved_search_id)
+        try:
+            tree = searchset_class._get_optimized_tree(raw_expression=raw_expression)
+            cost = searchset_class._get_tree_cost(tree=tree)
+            query = searchset_class._parse_tree(tree=tree)
+            is_cacheable = searchset_class._is_cacheable_tree(tree=tree)
+        finally:
+            resolving.pop()
+
+        with self._lock:
+            if not is_cacheable:
+                self._volatile.add(saved_search_id)
+
+            # saved search may be invalidated while compilation
+            if self._saved_searches.get(saved_search_id, (None, None))[1] == version:
+                self._costs[key] = cost
+                if is_cacheable:
+                    self._queries[key] = query
+
+        return query, cost
+
+    def is_cacheable(self, saved_search_id: str) -> bool:
+        """
+        Returns False if query of resolved saved search is compiled on every usage, so queries with it can't be cached
+        """
+        with self._lock:
+            return saved_search_id not in self._volatile
+
+    def invalidate(self, saved_search_id: str) -> None:
+        """
+        Drops saved search and all saved searches which reference it.
+        Parsed queries are cached with resolved saved searches, so parsed query caches are cleared too
+        """
+        with self._lock:
+            ids = {saved_search_id}
+            stack = [saved_search_id]
+
+            while stack:
+                for dependent_id in self._dependents.pop(stack.pop(), ()):
+                    if dependent_id not in ids:
+                        ids.add(dependent_id)
+                        stack.append(dependent_id)
+
+            for id_ in ids:
+                self._saved_searches.pop(id_, None)
+                self._volatile.discard(id_)
+
+            self._queries = {key: query for key, query in self._queries.items() if key[1] not in ids}
+            self._costs = {key: cost for key, cost in self._costs.items() if key[1] not in ids}
+
+        clear_parsed_query_caches()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._saved_searches.clear()
+            self._queries.clear()
+            self._costs.clear()
+            self._dependents.clear()
+            self._volatile.clear()
+
+        clear_parsed_query_caches()
+
+    def _get_saved_search(self, saved_search_id: str) -> Tuple[str, Any]:
+        with self._lock:
+            if saved_search_id in self._saved_searches:
+                return self._saved_searches[saved_search_id]
+
+        saved_search = self.loader(saved_search_id)
+        if saved_search is None:
+            raise LuceneSearchInvalidValueException(f"Unknown saved search {saved_search_id}")
+
+        with self._lock:
+            return self._saved_searches.setdefault(saved_search_id, tuple(saved_search))
+
+    def _get_resolving(self):
+        """
+        Returns ids of saved searches which are being resolved in current thread
+        """
+        if not hasattr(self._local, "resolving"):
+            self._local.resolving = []
+        return self._local.resolving
@@ -1,2 +1,4 @@
 from .django import DjangoSearchSet
 from .elastic import ElasticSearchSet
+from .python import PythonSearchSet
+from .registry import searchset_registry, warm_up
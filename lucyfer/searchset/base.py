@@ -1,11 +1,13 @@
 from typing import List, Optional, Dict, Any, Type, Set
 
+from django.core.cache import cache
 try:
     from django.utils.decorators import classproperty
 except ImportError:
     from django.utils.functional import classproperty
 
 from lucyfer.searchset.fields import BaseSearchField
+from lucyfer.searchset.registry import searchset_registry
 from lucyfer.searchset.storage import SearchSetStorage
 from lucyfer.searchset.utils import FieldType
 from lucyfer.settings import lucyfer_settings
@@ -22,6 +24,15 @@ class BaseMetaClass:
 
     search_fields_for_default_search: List[str] = None
 
+    # elasticsearch only: apply query in non-scoring filter context to use filter cache
+    use_filter_context = False
+
+    # elasticsearch only: loader of raw mapping (see lucyfer.searchset.mapping_loader), latest index is used if None
+    mapping_loader = None
+
+    # max estimated query cost, QUERY_COST_LIMIT setting is used if None
+    query_cost_limit: Optional[float] = None
+
 
 class BaseSearchSetMetaClass(type):
     def __new__(mcs, name, bases, attrs):
@@ -38,6 +49,8 @@ class BaseSearchSetMetaClass(type):
         setattr(meta, "_storage", storage)
         setattr(searchset, "_meta", meta)
 
+        searchset_registry.register(searchset)
+
         return searchset
 
     _required_field = ["_field_base_class", "_default_field"]
@@ -196,13 +209,13 @@ class BaseSearchSet(metaclass=BaseSearchSetMetaClass):
         if not cls._meta.show_suggestions:
             return list()
 
-        field = cls.storage.field_source_to_field.get(field_name, cls._default_field())
+        field = cls.get_field(field_name)
 
         return field.get_values(
             qs=qs,
             prefix=prefix,
             cache_key=cache_key,
-            model_name=cls._meta.model.__name__,
+            model_name=getattr(cls._meta.model, "__name__", cls.__name__),
             escape_quotes_in_suggestions=cls._meta.escape_quotes_in_suggestions,
             max_return_suggestions_count=max_return_suggestions_count,
             allow_empty_values=allow_empty_values,
@@ -216,10 +229,48 @@ class BaseSearchSet(metaclass=BaseSearchSetMetaClass):
         """
         raise NotImplementedError()
 
+    @classmethod
+    def get_mapping_cache_time(cls) -> Optional[int]:
+        """
+        Returns seconds to keep raw mapping in django cache, storage is refreshed with that interval.
+        Mapping never expires if None
+        """
+        return None
+
+    @classmethod
+    def _load_raw_mapping(cls, use_cache: bool = True) -> Dict[str, FieldType]:
+        """
+        Returns raw mapping from django cache if it is enabled, so processes share one mapping request
+        """
+        cache_time = cls.get_mapping_cache_time()
+        if not cache_time:
+            return cls._get_raw_mapping()
+
+        key = cls._get_mapping_cache_key()
+
+        raw_mapping = cache.get(key) if use_cache else None
+        if raw_mapping is None:
+            raw_mapping = cls._get_raw_mapping()
+            cache.set(key, raw_mapping, cache_time)
+
+        return raw_mapping
+
+    @classmethod
+    def _get_mapping_cache_key(cls) -> str:
+        return f"LUCYFER__MAPPING__{cls.__module__}.{cls.__qualname__}"
+
+    @classmethod
+    def get_field(cls, field_name: str) -> BaseSearchField:
+        """
+        Returns field instance by its name or source. Default field is used for unknown names
+        """
+        field = cls.storage.field_source_to_field.get(field_name)
+        return field if field is not None else cls.storage.default_field
+
     @classmethod
     def get_query_for_field(cls, condition):
         """
         Returns Q object with query for parsed condition
         """
-        field = cls.storage.field_source_to_field.get(condition.name, cls._default_field())
+        field = cls.get_field(condition.name)
         return field.get_query(condition)
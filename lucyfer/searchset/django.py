@@ -1,4 +1,4 @@
-from typing import List, Dict
+from typing import Any, List, Dict, Optional, Tuple
 
 from django.core.exceptions import FieldError
 from django.db.models import ForeignKey, AutoField, BooleanField, BigAutoField, BigIntegerField, FloatField, \
@@ -7,8 +7,11 @@ from django.db.models import ForeignKey, AutoField, BooleanField, BigAutoField,
 from lucyfer.searchset.base import BaseSearchSet
 from lucyfer.searchset.fields.django import DjangoSearchField, DjangoSearchFieldWithoutWildcard, \
     default_django_field_types_to_fields
+from lucyfer.searchset.timeout import with_statement_timeout
 from lucyfer.searchset.utils import FieldType
 from lucyfer.parser import LuceneToDjangoParserMixin
+from lucyfer.parser.cost import QueryCost
+from lucyfer.settings import lucyfer_settings
 from lucyfer.utils import LuceneSearchException
 
 
@@ -36,16 +39,39 @@ class DjangoSearchSet(LuceneToDjangoParserMixin, BaseSearchSet):
     _raw_type_to_field_type = django_model_field_to_field_type
 
     @classmethod
-    def filter(cls, queryset, search_terms, raise_exception=False):
+    def filter(cls, queryset, search_terms, raise_exception=False, timeout: Optional[float] = None):
+        """
+        Applies lucene expression to queryset.
+
+        :param timeout: statement timeout in seconds for queries of filtered queryset. Settings are used by default
+        """
         query = cls.parse(raw_expression=search_terms)
+
+        if cls._is_empty_query(query):
+            # for ex. contradictory ranges, database isn't queried at all
+            return queryset.none()
+
+        if timeout is None:
+            timeout = lucyfer_settings.QUERY_TIMEOUT
+
         try:
-            return queryset.filter(query)
+            return with_statement_timeout(queryset.filter(query), timeout=timeout)
         except FieldError:
             if raise_exception:
                 raise LuceneSearchException()
 
             return queryset.none()
 
+    @classmethod
+    def filter_with_cost(cls, queryset, search_terms, raise_exception=False,
+                         timeout: Optional[float] = None) -> Tuple[Any, QueryCost]:
+        """
+        Applies lucene expression to queryset with `filter` and returns estimated cost of query too
+        """
+        filtered_queryset = cls.filter(queryset, search_terms, raise_exception=raise_exception, timeout=timeout)
+        # compiled query is cached by filter, so cost is usually taken from cache
+        return filtered_queryset, cls.get_query_cost(raw_expression=search_terms)
+
     @classmethod
     def _get_raw_mapping(cls) -> Dict[str, FieldType]:
         return {field.name: cls._raw_type_to_field_type.get(field.__class__)
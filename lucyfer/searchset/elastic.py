@@ -1,10 +1,16 @@
-from typing import Dict
+import sys
+from typing import Any, Dict, Optional, Tuple
+
+from elasticsearch_dsl.query import Bool
 
 from lucyfer.parser import LuceneToElasticParserMixin
+from lucyfer.parser.cost import QueryCost
 from lucyfer.searchset.base import BaseSearchSet
 from lucyfer.searchset.fields.elastic import default_elastic_field_types_to_fields, ElasticSearchField, \
     ElasticQueryStringField
+from lucyfer.searchset.mapping_loader import LatestIndexMappingLoader
 from lucyfer.searchset.utils import FieldType
+from lucyfer.settings import lucyfer_settings
 from lucyfer.utils import LuceneSearchException
 
 
@@ -33,7 +39,18 @@ class ElasticSearchSet(LuceneToElasticParserMixin, BaseSearchSet):
         raise NotImplementedError()
 
     @classmethod
-    def filter(cls, search, search_terms, raise_exception=False):
+    def get_mapping_cache_time(cls) -> Optional[int]:
+        return lucyfer_settings.MAPPING_CACHE_TIME
+
+    @classmethod
+    def filter(cls, search, search_terms, raise_exception=False, filter_context: Optional[bool] = None,
+               timeout: Optional[float] = None):
+        """
+        Applies lucene expression to search.
+
+        :param filter_context: apply query in non-scoring filter context. Searchsets Meta option is used by default
+        :param timeout: search timeout in seconds. Settings are used by default
+        """
         query = cls.parse(raw_expression=search_terms)
         if query is None:
             if raise_exception:
@@ -41,36 +58,80 @@ class ElasticSearchSet(LuceneToElasticParserMixin, BaseSearchSet):
             else:
                 return None
 
-        return search.query(query)
+        if filter_context is None:
+            filter_context = cls._meta.use_filter_context
+
+        if filter_context:
+            query = cls._get_filter_context_query(query)
+
+        return cls._apply_timeout(search.query(query), timeout=timeout)
+
+    @classmethod
+    def filter_with_cost(cls, search, search_terms, raise_exception=False, filter_context: Optional[bool] = None,
+                         timeout: Optional[float] = None) -> Tuple[Any, QueryCost]:
+        """
+        Applies lucene expression to search with `filter` and returns estimated cost of query too
+        """
+        filtered_search = cls.filter(search, search_terms, raise_exception=raise_exception,
+                                     filter_context=filter_context, timeout=timeout)
+        # compiled query is cached by filter, so cost is usually taken from cache
+        return filtered_search, cls.get_query_cost(raw_expression=search_terms)
+
+    @classmethod
+    def _apply_timeout(cls, search, timeout: Optional[float]):
+        """
+        Sets search timeout and terminate_after, so shards return partial results instead of long searching
+        """
+        if timeout is None:
+            timeout = lucyfer_settings.QUERY_TIMEOUT
+
+        if timeout:
+            search = search.extra(timeout=f"{int(timeout * 1000)}ms")
+
+        terminate_after = lucyfer_settings.QUERY_TERMINATE_AFTER
+        if terminate_after:
+            search = search.extra(terminate_after=terminate_after)
+
+        return search
+
+    @classmethod
+    def _get_filter_context_query(cls, query) -> Bool:
+        """
+        Moves query to bool filter. Top level negations are moved to must_not directly
+        """
+        if isinstance(query, Bool) and set(query._params) <= {"must", "must_not", "filter"}:
+            filter_, must_not = [*query.must, *query.filter], list(query.must_not)
+        else:
+            filter_, must_not = [query], []
+
+        return Bool(**{key: value for key, value in (("filter", filter_), ("must_not", must_not)) if value})
 
     @classmethod
     def _format_mapping_values(cls, mapping, prefix="") -> Dict[str, FieldType]:
+        """
+        Flattens nested mapping to dotted field names. Objects are walked with stack of (name prefix, properties),
+        so each name is built with one concatenation and deep mappings don't hit recursion limit
+        """
         field_name_to_field_type = dict()
+        stack = [(f"{prefix}." if prefix else "", iter(mapping.items()))]
+
+        while stack:
+            name_prefix, items = stack[-1]
 
-        for key, value in mapping.items():
-            if "properties" in value:
-                field_name_to_field_type.update(
-                    cls._format_mapping_values(value["properties"], ".".join([prefix, key]) if prefix else key)
-                )
+            for key, value in items:
+                if "properties" in value:
+                    stack.append((f"{name_prefix}{key}.", iter(value["properties"].items())))
+                    break
+
+                # names are interned, so searchsets with the same mapping share them
+                field_name_to_field_type[sys.intern(name_prefix + key)] = \
+                    cls._raw_type_to_field_type.get(value.get("type"))
             else:
-                field_name = ".".join([prefix, key]) if prefix else key
-                field_name_to_field_type[field_name] = cls._raw_type_to_field_type.get(value.get("type"))
+                stack.pop()
 
         return field_name_to_field_type
 
     @classmethod
     def _get_raw_mapping(cls) -> Dict[str, FieldType]:
-        model_instance = cls._meta.model()
-        index_to_mapping = cls.get_es_client().indices.get_mapping(index=model_instance._get_index())
-        if not index_to_mapping:
-            return dict()
-
-        last_index = max(index_to_mapping)
-
-        try:
-            last_mapping = index_to_mapping[last_index]['mappings'][model_instance._doc_type.name]['properties']
-        except KeyError:
-            return dict()
-
-        field_name_to_field_type = cls._format_mapping_values(last_mapping)
-        return field_name_to_field_type
+        loader = cls._meta.mapping_loader or LatestIndexMappingLoader()
+        return loader.load(cls)
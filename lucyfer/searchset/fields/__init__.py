@@ -1,2 +1,3 @@
 from .django import *
 from .elastic import *
+from .python import *
@@ -1,11 +1,18 @@
-from typing import Dict, List, Optional, Callable, Any
+import copy
+from types import MappingProxyType
+from typing import Dict, List, Optional, Callable, Any, Tuple
 
 from lucyparser.tree import Operator
 
+from lucyfer.parser.cost import LookupKind
 from lucyfer.searchset.fields.mapping.base import MappingMixin
 from lucyfer.settings import lucyfer_settings
 
 
+# shared by fields without kwargs for available values method, it is never changed
+EMPTY_KWARGS = MappingProxyType({})
+
+
 class BaseSearchField(MappingMixin):
     """
     Base Field class for including in SearchSet classes
@@ -23,6 +30,7 @@ class BaseSearchField(MappingMixin):
                  available_values_method_kwargs: Optional[Dict[str, Any]] = None,
                  use_field_class_for_sources: bool = False,
                  use_cache_for_suggestions: bool = None,
+                 merge_conditions: bool = True,
                  *args, **kwargs):
 
         sources = list() if sources is None else sources
@@ -31,8 +39,11 @@ class BaseSearchField(MappingMixin):
         self.exclude_sources_from_mapping = exclude_sources_from_mapping
         self.show_suggestions = show_suggestions
         self.use_field_class_for_sources = use_field_class_for_sources
+
+        # allows to merge several conditions on the field into one query (for ex. `a: 1 OR a: 2` into `a IN (1, 2)`)
+        self.merge_conditions = merge_conditions
         self._get_available_values_method = get_available_values_method
-        self._available_values_method_kwargs = available_values_method_kwargs or {}
+        self._available_values_method_kwargs = available_values_method_kwargs or EMPTY_KWARGS
 
         if use_cache_for_suggestions is None:
             self.use_cache_for_suggestions = lucyfer_settings.CACHE_SEARCH_VALUES
@@ -49,6 +60,18 @@ class BaseSearchField(MappingMixin):
         """
         self.sources = self.sources or [field_name]
 
+    def copy_for_source(self, source: str, show_suggestions: bool) -> "BaseSearchField":
+        """
+        Returns field for one of its sources with all options of the field (`use_field_class_for_sources`).
+        Subclasses with options which mustn't be shared by copies extend it
+        """
+        field = copy.copy(self)
+        field.sources = [source]
+        field.show_suggestions = show_suggestions
+        field.exclude_sources_from_mapping = False
+        field.use_field_class_for_sources = False
+        return field
+
     def cast_value(self, value: str):
         """
         Method for value casting if it necessary (or for ex. for search replaces)
@@ -81,6 +104,51 @@ class BaseSearchField(MappingMixin):
         """
         return value == "*"
 
+    def get_lookup_kind(self, condition) -> LookupKind:
+        """
+        Returns kind of lookup used for condition. It is used to estimate query cost
+        """
+        if condition.operator == Operator.MATCH:
+            return LookupKind.REGEXP
+
+        if condition.operator in (Operator.GT, Operator.GTE, Operator.LT, Operator.LTE):
+            return LookupKind.RANGE
+
+        value = str(condition.value)
+        if value.startswith(("*", "?")):
+            return LookupKind.LEADING_WILDCARD
+
+        if "*" in value or "?" in value:
+            return LookupKind.WILDCARD
+
+        return LookupKind.TERM
+
+    def is_match_all_condition(self, condition) -> bool:
+        """
+        Returns True if condition doesn't filter anything, so it may be dropped from query
+        """
+        return False
+
+    def get_range_bounds(self, condition) -> Optional[List[Tuple[str, Any]]]:
+        """
+        Returns range lookups (gt, gte, lt, lte) with values matched by condition together,
+        so AND'ed conditions on the field may be merged into one range. None if condition isn't a range
+        """
+        return None
+
+    def get_query_for_bounds(self, source: str, bounds: Dict[str, Any]):
+        """
+        Returns one range query on source by its lookups with values
+        """
+        raise NotImplementedError()
+
+    def is_cacheable_condition(self, condition) -> bool:
+        """
+        Returns False if query of condition depends on something but the condition itself (for ex. current time),
+        so compiled query containing it mustn't be cached
+        """
+        return True
+
     def get_available_values_method(self) -> Optional[Callable[..., List[Any]]]:
         return self._get_available_values_method or self._default_get_available_values_method
 
@@ -0,0 +1,171 @@
+"""
+Parsing of date values shared by date fields: ISO dates, epoch values and elasticsearch-like date math
+(`now-1h`, `now/d`, `2020-01-01||+1M/d`).
+"""
+import calendar
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone, tzinfo
+from typing import Optional, Tuple
+
+from lucyfer.utils import LuceneSearchCastValueException
+
+
+__all__ = [
+    'DateValue',
+    'parse_date',
+    'parse_absolute_date',
+    'add_units',
+    'round_down',
+    'has_now',
+]
+
+
+DATE_MATH_UNITS = "yMwdhHms"
+
+DATE_MATH_OPERATION_RE = re.compile(rf"([+-])(\d+)([{DATE_MATH_UNITS}])|/([{DATE_MATH_UNITS}])")
+
+EPOCH_RE = re.compile(r"-?\d{5,}(\.\d+)?")
+
+# date without time is a day, month or year
+DATE_RE_TO_UNIT = (
+    (re.compile(r"\d{4}-\d{2}-\d{2}"), "d"),
+    (re.compile(r"\d{4}-\d{2}"), "M"),
+    (re.compile(r"\d{4}"), "y"),
+)
+
+# epoch values greater than that are milliseconds (it is year 5138 in seconds)
+MAX_EPOCH_SECONDS = 10 ** 11
+
+
+@dataclass(frozen=True)
+class DateValue:
+    """
+    Parsed date. Date without time or rounded date is a period of one unit (for ex. `2020-01-01` is the whole day),
+    exact moments have no unit
+    """
+    start: datetime
+    unit: Optional[str] = None
+
+    @property
+    def end(self) -> datetime:
+        """
+        Returns the first moment after period
+        """
+        if self.unit is None:
+            return self.start
+        return add_units(self.start, 1, self.unit)
+
+
+def has_now(value: str) -> bool:
+    """
+    Returns True if value is relative to current time, so its query can't be cached
+    """
+    return value.strip().lower().startswith("now")
+
+
+def parse_date(value: str, now: datetime, time_zone: Optional[tzinfo] = None) -> DateValue:
+    """
+    Parses date value, `now` is used as anchor of `now` expressions.
+    If time zone is set, aware dates are converted to naive wall-clock time of it, so periods and rounding follow
+    local calendar even on DST changes (day may be 23 or 25 hours long). Naive dates are local time already.
+    Otherwise time zone is kept as is: naive values are returned naive
+    """
+    value = value.strip()
+
+    if value.lower().startswith("now"):
+        anchor, unit, math = now, None, value[3:]
+    else:
+        anchor_value, _, math = value.partition("||")
+        anchor, unit = parse_absolute_date(anchor_value)
+
+    if time_zone is not None and anchor.tzinfo is not None:
+        anchor = anchor.astimezone(time_zone).replace(tzinfo=None)
+
+    return apply_date_math(DateValue(start=anchor, unit=unit), math)
+
+
+def parse_absolute_date(value: str) -> Tuple[datetime, Optional[str]]:
+    if EPOCH_RE.fullmatch(value):
+        epoch = float(value)
+        if abs(epoch) >= MAX_EPOCH_SECONDS:
+            epoch /= 1000
+
+        try:
+            return datetime.fromtimestamp(epoch, tz=timezone.utc), None
+        except (OverflowError, OSError, ValueError):
+            raise LuceneSearchCastValueException()
+
+    for date_re, unit in DATE_RE_TO_UNIT:
+        if date_re.fullmatch(value):
+            parts = [int(part) for part in value.split("-")] + [1, 1]
+            try:
+                return datetime(*parts[:3]), unit
+            except ValueError:
+                raise LuceneSearchCastValueException()
+
+    if value.endswith(("Z", "z")):
+        # fromisoformat supports `Z` since python 3.11 only
+        value = value[:-1] + "+00:00"
+
+    try:
+        return datetime.fromisoformat(value), None
+    except ValueError:
+        raise LuceneSearchCastValueException()
+
+
+def apply_date_math(date: DateValue, math: str) -> DateValue:
+    position = 0
+
+    while position < len(math):
+        match = DATE_MATH_OPERATION_RE.match(math, position)
+        if match is None:
+            raise LuceneSearchCastValueException()
+
+        sign, count, unit, rounding_unit = match.groups()
+
+        if rounding_unit:
+            date = DateValue(start=round_down(date.start, rounding_unit), unit=rounding_unit)
+        else:
+            date = DateValue(start=add_units(date.start, int(count) if sign == "+" else -int(count), unit),
+                             unit=date.unit)
+
+        position = match.end()
+
+    return date
+
+
+def add_units(date: datetime, count: int, unit: str) -> datetime:
+    try:
+        if unit in ("y", "M"):
+            months = date.month - 1 + count * (12 if unit == "y" else 1)
+            year, month = date.year + months // 12, months % 12 + 1
+            return date.replace(year=year, month=month, day=min(date.day, calendar.monthrange(year, month)[1]))
+
+        if unit == "w":
+            return date + timedelta(weeks=count)
+        if unit == "d":
+            return date + timedelta(days=count)
+        if unit in ("h", "H"):
+            return date + timedelta(hours=count)
+        if unit == "m":
+            return date + timedelta(minutes=count)
+        return date + timedelta(seconds=count)
+    except (OverflowError, ValueError):
+        raise LuceneSearchCastValueException()
+
+
+def round_down(date: datetime, unit: str) -> datetime:
+    if unit == "y":
+        return date.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+    if unit == "M":
+        return date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    if unit == "w":
+        return add_units(round_down(date, "d"), -date.weekday(), "d")
+    if unit == "d":
+        return date.replace(hour=0, minute=0, second=0, microsecond=0)
+    if unit in ("h", "H"):
+        return date.replace(minute=0, second=0, microsecond=0)
+    if unit == "m":
+        return date.replace(second=0, microsecond=0)
+    return date.replace(microsecond=0)
@@ -1,14 +1,43 @@
-from typing import Tuple, Optional
+from datetime import datetime
+from typing import Tuple, Optional, List, Any, Dict
 
+from django.conf import settings
 from django.db.models import Q
+from django.utils import timezone
+try:
+    from pytz.exceptions import InvalidTimeError
+except ImportError:
+    # zoneinfo time zones resolve such times by fold instead of raising
+    class InvalidTimeError(Exception):
+        pass
 from lucyparser.tree import Operator
 
+from lucyfer.parser.cost import LookupKind
+from lucyfer.parser.ranges import RANGE_LOOKUPS
 from lucyfer.searchset.fields.base import BaseSearchField, negate_query_if_necessary
+from lucyfer.searchset.fields.dates import DateValue, parse_date, has_now
 from lucyfer.searchset.fields.mapping import DjangoMappingMixin
 from lucyfer.searchset.utils import FieldType
 from lucyfer.utils import LuceneSearchCastValueException
 
 
+django_lookup_to_lookup_kind = {
+    "gt": LookupKind.RANGE,
+    "gte": LookupKind.RANGE,
+    "lt": LookupKind.RANGE,
+    "lte": LookupKind.RANGE,
+    "range": LookupKind.RANGE,
+    "startswith": LookupKind.WILDCARD,
+    "istartswith": LookupKind.WILDCARD,
+    "endswith": LookupKind.LEADING_WILDCARD,
+    "iendswith": LookupKind.LEADING_WILDCARD,
+    "contains": LookupKind.LEADING_WILDCARD,
+    "icontains": LookupKind.LEADING_WILDCARD,
+    "regex": LookupKind.REGEXP,
+    "iregex": LookupKind.REGEXP,
+}
+
+
 class DjangoSearchFieldWithoutWildcard(DjangoMappingMixin, BaseSearchField):
     DEFAULT_LOOKUP = "icontains"
 
@@ -22,6 +51,56 @@ class DjangoSearchFieldWithoutWildcard(DjangoMappingMixin, BaseSearchField):
             query = query | Q(**{"{}__{}".format(source, lookup): value})
         return query
 
+    def is_match_all_condition(self, condition) -> bool:
+        return self.match_all(value=condition.value)
+
+    def get_lookup_kind(self, condition) -> LookupKind:
+        lookup = self.get_lookup(condition.operator)
+        return django_lookup_to_lookup_kind.get(lookup, LookupKind.TERM)
+
+    def is_in_condition(self, condition) -> bool:
+        """
+        Returns True if condition is an exact match, so it may be merged with others into one `__in` lookup.
+        Case insensitive match is merged only for values without cased characters (like ids or ip addresses)
+        """
+        if condition.operator != Operator.EQ or self.match_all(value=condition.value):
+            return False
+
+        value = self.cast_value(condition.value)
+        if value is None:
+            # `IN (NULL)` doesn't match anything
+            return False
+
+        lookup = self.get_lookup(condition.operator)
+        if lookup == "exact":
+            return True
+
+        return lookup == "iexact" and isinstance(value, str) and value.lower() == value.upper()
+
+    def get_query_for_in(self, field_name: str, values: List[Any]):
+        query = Q()
+
+        for source in self.get_sources(field_name):
+            query = query | Q(**{"{}__in".format(source): values})
+        return query
+
+    def get_range_bounds(self, condition) -> Optional[List[Tuple[str, Any]]]:
+        if condition.operator == Operator.NEQ or self.match_all(value=condition.value) or \
+                len(self.get_sources(condition.name)) != 1:
+            return None
+
+        lookup = self.get_lookup(condition.operator)
+        if lookup not in RANGE_LOOKUPS:
+            return None
+
+        return [(lookup, self.cast_value(condition.value))]
+
+    def get_query_for_bounds(self, source: str, bounds: Dict[str, Any]):
+        if set(bounds) == {"gte", "lte"}:
+            return Q(**{"{}__range".format(source): (bounds["gte"], bounds["lte"])})
+
+        return Q(**{"{}__{}".format(source, lookup): value for lookup, value in bounds.items()})
+
     @negate_query_if_necessary
     def get_query(self, condition):
         if self.match_all(value=condition.value):
@@ -47,6 +126,22 @@ class DjangoWildcardMixin:
 class DjangoSearchField(DjangoWildcardMixin, DjangoSearchFieldWithoutWildcard):
     DEFAULT_LOOKUP = "iexact"
 
+    def is_in_condition(self, condition) -> bool:
+        _, lookup = self.process_wildcard(value=self.cast_value(condition.value))
+        return lookup is None and super().is_in_condition(condition)
+
+    def get_range_bounds(self, condition) -> Optional[List[Tuple[str, Any]]]:
+        _, lookup = self.process_wildcard(value=self.cast_value(condition.value))
+        return super().get_range_bounds(condition) if lookup is None else None
+
+    def get_lookup_kind(self, condition) -> LookupKind:
+        _, lookup = self.process_wildcard(value=self.cast_value(condition.value))
+
+        if lookup is None:
+            return super().get_lookup_kind(condition)
+
+        return django_lookup_to_lookup_kind.get(lookup, LookupKind.TERM)
+
     def create_query_for_sources(self, condition):
         value = self.cast_value(condition.value)
 
@@ -123,9 +218,122 @@ class DjangoNullBooleanField(DjangoBooleanField):
     _default_get_available_values_method = _values.keys
 
 
+class DjangoDateTimeField(DjangoSearchFieldWithoutWildcard):
+    """
+    Datetime field. Values are ISO dates (`2020-01-01`, `2020-01-01T10:00:00Z`), epoch seconds or milliseconds
+    and date math relative to current time (`now-1h`, `now/d`) or to date (`2020-01-01||+1M`).
+    Dates without time and rounded dates are periods: `a: 2020-01-01` matches the whole day
+    and `a > 2020-01-01` matches dates from the next day. Every condition is compiled to lookups on the column itself
+    (`gte`/`lt` bounds instead of `__date`), so database indexes are used
+    """
+    OPERATOR_TO_LOOKUP = {
+        Operator.GTE: "gte",
+        Operator.LTE: "lte",
+        Operator.GT: "gt",
+        Operator.LT: "lt",
+        Operator.EQ: "exact",
+        Operator.NEQ: "exact",
+    }
+
+    def cast_value(self, value: str) -> DateValue:
+        """
+        Returns date in naive wall-clock time of current time zone, bounds are made aware after date math
+        """
+        return parse_date(value, now=self.get_now(), time_zone=timezone.get_current_timezone())
+
+    @staticmethod
+    def get_now() -> datetime:
+        """
+        Returns current naive wall-clock time of current time zone, so `now/d` is rounded to the start of local day
+        """
+        if settings.USE_TZ:
+            return timezone.localtime(timezone.now()).replace(tzinfo=None)
+        return datetime.now()
+
+    @staticmethod
+    def localize(value: datetime) -> datetime:
+        """
+        Makes wall-clock time aware if time zone support is enabled.
+        Times which are skipped or repeated on DST changes are resolved as standard time
+        """
+        if not settings.USE_TZ:
+            return value
+
+        try:
+            return timezone.make_aware(value)
+        except InvalidTimeError:
+            return timezone.make_aware(value, is_dst=False)
+
+    def get_bounds(self, condition) -> List[Tuple[str, datetime]]:
+        """
+        Returns lookups with values which are matched by condition together
+        """
+        date = self.cast_value(condition.value)
+
+        if date.unit is None:
+            return [(self.get_lookup(condition.operator), self.localize(date.start))]
+
+        if condition.operator in (Operator.EQ, Operator.NEQ):
+            return [("gte", self.localize(date.start)), ("lt", self.localize(date.end))]
+
+        if condition.operator == Operator.GT:
+            return [("gte", self.localize(date.end))]
+
+        if condition.operator == Operator.LTE:
+            return [("lt", self.localize(date.end))]
+
+        if condition.operator == Operator.LT:
+            return [("lt", self.localize(date.start))]
+
+        return [("gte", self.localize(date.start))]
+
+    def create_query_for_sources(self, condition):
+        bounds = self.get_bounds(condition)
+
+        query = Q()
+        for source in self.get_sources(condition.name):
+            query = query | Q(**{"{}__{}".format(source, lookup): value for lookup, value in bounds})
+        return query
+
+    def get_lookup_kind(self, condition) -> LookupKind:
+        if self.match_all(value=condition.value):
+            return LookupKind.TERM
+
+        if all(lookup == "exact" for lookup, _ in self.get_bounds(condition)):
+            return LookupKind.TERM
+
+        return LookupKind.RANGE
+
+    def is_in_condition(self, condition) -> bool:
+        return super().is_in_condition(condition) and self.cast_value(condition.value).unit is None
+
+    def get_query_for_in(self, field_name: str, values: List[DateValue]):
+        return super().get_query_for_in(field_name=field_name, values=[self.localize(value.start) for value in values])
+
+    def get_range_bounds(self, condition) -> Optional[List[Tuple[str, Any]]]:
+        if condition.operator == Operator.NEQ or self.match_all(value=condition.value) or \
+                len(self.get_sources(condition.name)) != 1:
+            return None
+
+        bounds = self.get_bounds(condition)
+        return bounds if all(lookup in RANGE_LOOKUPS for lookup, _ in bounds) else None
+
+    def is_cacheable_condition(self, condition) -> bool:
+        if has_now(condition.value):
+            return False
+
+        if not settings.USE_TZ:
+            return True
+
+        # local dates and periods depend on time zone activated for request, only exact moments with offset don't
+        date = parse_date(condition.value, now=datetime.now())
+        return date.unit is None and date.start.tzinfo is not None
+
+
 default_django_field_types_to_fields = {
     FieldType.INTEGER: DjangoIntegerField,
     FieldType.BOOLEAN: DjangoBooleanField,
     FieldType.NULL_BOOLEAN: DjangoNullBooleanField,
-    FieldType.FLOAT: DjangoFloatField
+    FieldType.FLOAT: DjangoFloatField,
+    FieldType.TIMESTAMP: DjangoDateTimeField,
 }
@@ -1,14 +1,19 @@
 import re
-from typing import List, Any
+from datetime import datetime, timezone
+from typing import List, Any, Optional, Dict, Tuple
 
 from elasticsearch_dsl import Q
 from elasticsearch_dsl.query import Range
 from lucyparser.tree import Operator
 
+from lucyfer.parser.cost import LookupKind
+from lucyfer.parser.ranges import RANGE_LOOKUPS
 from lucyfer.searchset.fields.base import BaseSearchField, negate_query_if_necessary
+from lucyfer.searchset.fields.dates import DATE_MATH_UNITS, EPOCH_RE, parse_date, parse_absolute_date, has_now
 from lucyfer.searchset.fields.mapping import ElasticMappingMixin
 from lucyfer.searchset.utils import FieldType
-from lucyfer.utils import LuceneSearchCastValueException
+from lucyfer.settings import lucyfer_settings
+from lucyfer.utils import LuceneSearchCastValueException, LuceneSearchInvalidValueException
 
 
 class ElasticSearchField(ElasticMappingMixin, BaseSearchField):
@@ -24,6 +29,16 @@ class ElasticSearchField(ElasticMappingMixin, BaseSearchField):
         Operator.MATCH: "regexp",
     }
 
+    def __init__(self, *args, merge_ranges: bool = False, **kwargs):
+        """
+        :param merge_ranges: merge AND'ed comparisons on the field into one `range` query. Set it for fields with
+            one value per document only: each comparison may match another element of array,
+            so `a >= 1 AND a <= 5` matches `[0, 10]` while merged range doesn't
+        """
+        super().__init__(*args, **kwargs)
+
+        self.merge_ranges = merge_ranges
+
     def create_query_for_sources(self, condition):
         lookup = self.get_lookup(condition.operator)
         value = self.cast_value(condition.value)
@@ -67,6 +82,39 @@ class ElasticSearchField(ElasticMappingMixin, BaseSearchField):
                 query = query | Q(lookup, **{source: value})
         return query
 
+    def is_terms_condition(self, condition) -> bool:
+        """
+        Returns True if condition is an exact match, so it may be merged with others into one `terms` query
+        """
+        if condition.operator != Operator.EQ:
+            return False
+
+        lookup = self.get_lookup(condition.operator)
+        if lookup != "term":
+            return False
+
+        _, lookup = self._get_wildcard_or_lookup(value=self.cast_value(condition.value), lookup=lookup)
+        return lookup == "term"
+
+    def get_query_for_terms(self, source: str, values: Any):
+        """
+        Returns `terms` query for values list or terms lookup
+        """
+        return Q("terms", **{source: values})
+
+    def get_range_bounds(self, condition) -> Optional[List[Tuple[str, Any]]]:
+        if not self.merge_ranges or len(self.get_sources(condition.name)) != 1:
+            return None
+
+        lookup = self.get_lookup(condition.operator)
+        if condition.operator in (Operator.EQ, Operator.NEQ, Operator.MATCH) or lookup not in RANGE_LOOKUPS:
+            return None
+
+        return [(lookup, self.cast_value(condition.value))]
+
+    def get_query_for_bounds(self, source: str, bounds: Dict[str, Any]):
+        return Range(**{source: bounds})
+
     def _get_wildcard_or_lookup(self, value, lookup):
         if [i.start() for i in re.finditer("\\*", value)]:
             return value.replace("\\\\", "\\").replace("\\", "\\\\"), "wildcard"
@@ -81,6 +129,14 @@ class ElasticSearchFieldWithoutWildCard(ElasticSearchField):
     def _get_wildcard_or_lookup(self, value, lookup):
         return value, lookup
 
+    def get_lookup_kind(self, condition) -> LookupKind:
+        lookup_kind = super().get_lookup_kind(condition)
+
+        if lookup_kind in (LookupKind.WILDCARD, LookupKind.LEADING_WILDCARD):
+            return LookupKind.TERM
+
+        return lookup_kind
+
 
 class ElasticIntegerField(ElasticSearchFieldWithoutWildCard):
     def cast_value(self, value):
@@ -130,6 +186,135 @@ class ElasticNullBooleanField(ElasticBooleanField):
     _default_get_available_values_method = _values.keys
 
 
+class ElasticDateField(ElasticSearchFieldWithoutWildCard):
+    """
+    Date field compiled to `range` queries. Values are ISO dates, epoch values and elasticsearch date math
+    (`now-1h`, `now/d`, `2020-01-01||+1M`), date math is resolved by elasticsearch.
+    Dates without time are periods: `a: 2020-01-01` matches the whole day and `a > 2020-01-01` starts from the next day.
+    `now` expressions without rounding are rounded to `rounding` unit (`DATE_MATH_ROUNDING` setting by default),
+    so repeated queries are equal and may be served from shard request cache. `a: *` matches any date (`exists` query)
+    """
+    OPERATOR_TO_LOOKUP = {
+        Operator.GTE: "gte",
+        Operator.LTE: "lte",
+        Operator.GT: "gt",
+        Operator.LT: "lt",
+    }
+
+    ROUNDING_RE = re.compile(rf"/[{DATE_MATH_UNITS}]$")
+
+    def __init__(self, *args, date_format: Optional[str] = None, time_zone: Optional[str] = None,
+                 rounding: Optional[str] = None, **kwargs):
+        """
+        :param date_format: `format` of range query, values are passed to elasticsearch as is if it is set
+        :param time_zone: `time_zone` of range query, it is used for dates without offset and rounding
+        :param rounding: date math unit to round `now` expressions to (for ex. "m" for `now-15m/m`)
+        """
+        super().__init__(*args, **kwargs)
+
+        assert rounding is None or rounding in DATE_MATH_UNITS, f'Invalid rounding "{rounding}"'
+
+        self.date_format = date_format
+        self.time_zone = time_zone
+        self.rounding = rounding
+
+    def get_rounding(self) -> Optional[str]:
+        return lucyfer_settings.DATE_MATH_ROUNDING if self.rounding is None else self.rounding
+
+    def cast_value(self, value: str) -> str:
+        """
+        Validates date and returns it as elasticsearch date math
+        """
+        value = value.strip()
+
+        if not has_now(value) and self.date_format is not None:
+            # values of custom format are validated by elasticsearch
+            return value
+
+        date = parse_date(value, now=datetime.now(timezone.utc))
+
+        if has_now(value):
+            rounding = self.get_rounding()
+            if rounding and date.unit is None:
+                return f"{value}/{rounding}"
+            return value
+
+        anchor, separator, math = value.partition("||")
+
+        if EPOCH_RE.fullmatch(anchor):
+            # seconds are not supported by default date formats
+            anchor = parse_absolute_date(anchor)[0].isoformat(timespec="milliseconds")
+
+        if date.unit is not None and not self.ROUNDING_RE.search(value):
+            # elasticsearch rounds `gt` and `lte` bounds up and `gte` and `lt` bounds down
+            math = f"{math}/{date.unit}"
+
+        return f"{anchor}||{math}" if math else anchor
+
+    def create_query_for_sources(self, condition):
+        if condition.operator == Operator.MATCH:
+            raise LuceneSearchInvalidValueException("Regular expressions are not supported by date fields")
+
+        if self._is_match_all_date(condition):
+            return self._get_query_for_exists(sources=self.get_sources(condition.name))
+
+        bounds = dict(self._get_bounds(condition))
+
+        query = None  # if set Q() as default it will be MatchAll() anytime
+        for source in self.get_sources(condition.name):
+            if query is None:
+                query = self.get_query_for_bounds(source=source, bounds=bounds)
+            else:
+                query = query | self.get_query_for_bounds(source=source, bounds=bounds)
+        return query
+
+    def _is_match_all_date(self, condition) -> bool:
+        """
+        `a: *` matches documents with any date, it isn't a date value
+        """
+        return condition.operator in (Operator.EQ, Operator.NEQ) and self.match_all(value=condition.value)
+
+    def _get_query_for_exists(self, sources: List[str]):
+        query = None  # if set Q() as default it will be MatchAll() anytime
+        for source in sources:
+            if query is None:
+                query = Q("exists", field=source)
+            else:
+                query = query | Q("exists", field=source)
+        return query
+
+    def _get_bounds(self, condition) -> List[Tuple[str, str]]:
+        value = self.cast_value(condition.value)
+
+        if condition.operator in (Operator.EQ, Operator.NEQ):
+            return [("gte", value), ("lte", value)]
+
+        return [(self.get_lookup(condition.operator), value)]
+
+    def get_range_bounds(self, condition) -> Optional[List[Tuple[str, Any]]]:
+        if not self.merge_ranges or condition.operator in (Operator.NEQ, Operator.MATCH) or \
+                len(self.get_sources(condition.name)) != 1 or self._is_match_all_date(condition):
+            return None
+
+        return self._get_bounds(condition)
+
+    def get_query_for_bounds(self, source: str, bounds: Dict[str, Any]):
+        bounds = dict(bounds)
+
+        if self.date_format is not None:
+            bounds["format"] = self.date_format
+        if self.time_zone is not None:
+            bounds["time_zone"] = self.time_zone
+
+        return Range(**{source: bounds})
+
+    def get_lookup_kind(self, condition) -> LookupKind:
+        return LookupKind.RANGE
+
+    def is_terms_condition(self, condition) -> bool:
+        return False
+
+
 class ElasticQueryStringField(ElasticSearchField):
     DEFAULT_LOOKUP = "query_string"
 
@@ -149,4 +334,5 @@ default_elastic_field_types_to_fields = {
     FieldType.INTEGER: ElasticIntegerField,
     FieldType.NULL_BOOLEAN: ElasticNullBooleanField,
     FieldType.FLOAT: ElasticFloatField,
+    FieldType.TIMESTAMP: ElasticDateField,
 }
@@ -1,2 +1,3 @@
 from .django import DjangoMappingMixin
 from .elastic import ElasticMappingMixin
+from .python import PythonMappingMixin
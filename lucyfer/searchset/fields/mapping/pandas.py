@@ -0,0 +1,25 @@
+from typing import List
+
+from lucyfer.searchset.fields.mapping.base import MappingMixin
+
+
+class PandasMappingMixin(MappingMixin):
+    def prepare_qs_for_suggestions(self, qs, prefix: str):
+        """
+        qs is a DataFrame here, so values are taken from its columns
+        """
+        values = []
+
+        for source in self.sources:
+            if source not in qs:
+                continue
+
+            column = qs[source].dropna().astype(str)
+            if prefix:
+                column = column[column.str.contains(prefix, case=False, regex=False)]
+            values.extend(column.unique())
+
+        return values
+
+    def get_suggestions_from_prepared_qs(self, qs, prefix: str) -> List[str]:
+        return list(set(qs))
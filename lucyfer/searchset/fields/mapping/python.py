@@ -0,0 +1,23 @@
+from typing import List
+
+from lucyfer.searchset.fields.mapping.base import MappingMixin
+from lucyfer.searchset.utils import get_value_getter
+
+
+class PythonMappingMixin(MappingMixin):
+    def prepare_qs_for_suggestions(self, qs, prefix: str):
+        """
+        qs is an iterable of records here, so values are collected from records directly
+        """
+        getters = [get_value_getter(source) for source in self.sources]
+
+        for record in qs:
+            for getter in getters:
+                value = getter(record)
+
+                for item in value if isinstance(value, (list, tuple, set, frozenset)) else [value]:
+                    if item is not None and prefix in str(item):
+                        yield str(item)
+
+    def get_suggestions_from_prepared_qs(self, qs, prefix: str) -> List[str]:
+        return list(set(qs))
@@ -0,0 +1,223 @@
+import re
+from typing import Any, Callable, List
+
+import pandas as pd
+from lucyparser.tree import Operator
+
+from lucyfer.parser.cost import LookupKind
+from lucyfer.searchset.fields.base import BaseSearchField
+from lucyfer.searchset.fields.django import DjangoWildcardMixin, django_lookup_to_lookup_kind
+from lucyfer.searchset.fields.mapping.pandas import PandasMappingMixin
+from lucyfer.searchset.utils import FieldType
+from lucyfer.utils import LuceneSearchCastValueException, LuceneSearchInvalidValueException
+
+
+def as_string_column(column: pd.Series) -> pd.Series:
+    if pd.api.types.is_string_dtype(column.dtype):
+        return column
+    return column.astype("string")
+
+
+def as_mask(column: pd.Series) -> pd.Series:
+    """
+    Missed values don't match anything
+    """
+    if column.dtype == bool:
+        return column
+    return column.astype("boolean").fillna(False).astype(bool)
+
+
+lookup_to_mask = {
+    "exact": lambda column, value: column.isna() if value is None else as_mask(column == value),
+    "iexact": lambda column, value: as_mask(as_string_column(column).str.lower() == value.lower()),
+    "gt": lambda column, value: as_mask(column > value),
+    "gte": lambda column, value: as_mask(column >= value),
+    "lt": lambda column, value: as_mask(column < value),
+    "lte": lambda column, value: as_mask(column <= value),
+    "contains": lambda column, value: as_mask(
+        as_string_column(column).str.contains(value, case=True, regex=False)),
+    "icontains": lambda column, value: as_mask(
+        as_string_column(column).str.contains(value, case=False, regex=False)),
+    "startswith": lambda column, value: as_mask(as_string_column(column).str.startswith(value)),
+    "istartswith": lambda column, value: as_mask(
+        as_string_column(column).str.lower().str.startswith(value.lower())),
+    "endswith": lambda column, value: as_mask(as_string_column(column).str.endswith(value)),
+    "iendswith": lambda column, value: as_mask(as_string_column(column).str.lower().str.endswith(value.lower())),
+    "regex": lambda column, value: as_mask(as_string_column(column).str.contains(value, case=True, regex=True)),
+    "iregex": lambda column, value: as_mask(as_string_column(column).str.contains(value, case=False, regex=True)),
+}
+
+
+class PandasSearchFieldWithoutWildcard(PandasMappingMixin, BaseSearchField):
+    """
+    Field compiles conditions to functions which return boolean mask for DataFrame.
+    Lookups have the same meaning as django lookups but they are evaluated by vectorized column operations
+    """
+    DEFAULT_LOOKUP = "icontains"
+
+    def get_mask_function(self, field_name: str, lookup: str, value) -> Callable[[pd.DataFrame], pd.Series]:
+        """
+        Returns function which applies lookup to each source column. Missed columns don't match anything
+        """
+        if lookup in ("regex", "iregex"):
+            self._validate_regex(value)
+
+        get_mask = lookup_to_mask[lookup]
+        sources = self.get_sources(field_name)
+
+        def mask_function(df):
+            mask = pd.Series(False, index=df.index)
+
+            for source in sources:
+                if source in df:
+                    mask |= get_mask(df[source], value)
+
+            return mask
+
+        return mask_function
+
+    def create_query_for_sources(self, condition):
+        lookup = self.get_lookup(condition.operator)
+        value = self.cast_value(condition.value)
+
+        return self.get_mask_function(field_name=condition.name, lookup=lookup, value=value)
+
+    def is_match_all_condition(self, condition) -> bool:
+        return self.match_all(value=condition.value)
+
+    def get_lookup_kind(self, condition) -> LookupKind:
+        lookup = self.get_lookup(condition.operator)
+        return django_lookup_to_lookup_kind.get(lookup, LookupKind.TERM)
+
+    def is_in_condition(self, condition) -> bool:
+        """
+        Returns True if condition is an exact match, so it may be merged with others into one `isin` mask
+        """
+        if condition.operator != Operator.EQ or self.match_all(value=condition.value):
+            return False
+
+        return self.get_lookup(condition.operator) == "exact" and self.cast_value(condition.value) is not None
+
+    def get_query_for_in(self, field_name: str, values: List[Any]):
+        sources = self.get_sources(field_name)
+
+        def mask_function(df):
+            mask = pd.Series(False, index=df.index)
+
+            for source in sources:
+                if source in df:
+                    mask |= df[source].isin(values)
+
+            return mask
+
+        return mask_function
+
+    def get_query(self, condition):
+        if self.match_all(value=condition.value):
+            return None
+
+        mask_function = self.create_query_for_sources(condition=condition)
+
+        if mask_function is not None and condition.operator == Operator.NEQ:
+            return lambda df: ~mask_function(df)
+
+        return mask_function
+
+    @staticmethod
+    def _validate_regex(value):
+        try:
+            re.compile(value)
+        except re.error:
+            raise LuceneSearchInvalidValueException()
+
+
+class PandasSearchField(DjangoWildcardMixin, PandasSearchFieldWithoutWildcard):
+    DEFAULT_LOOKUP = "iexact"
+
+    def create_query_for_sources(self, condition):
+        value, lookup = self.process_wildcard(value=self.cast_value(condition.value))
+
+        if lookup is None:
+            return super().create_query_for_sources(condition)
+
+        if not value:
+            return None
+
+        return self.get_mask_function(field_name=condition.name, lookup=lookup, value=value)
+
+    def is_in_condition(self, condition) -> bool:
+        _, lookup = self.process_wildcard(value=self.cast_value(condition.value))
+        return lookup is None and super().is_in_condition(condition)
+
+    def get_lookup_kind(self, condition) -> LookupKind:
+        _, lookup = self.process_wildcard(value=self.cast_value(condition.value))
+
+        if lookup is None:
+            return super().get_lookup_kind(condition)
+
+        return django_lookup_to_lookup_kind.get(lookup, LookupKind.TERM)
+
+
+class PandasCharField(PandasSearchField):
+    OPERATOR_TO_LOOKUP = {
+        Operator.EQ: "icontains",
+        Operator.NEQ: "iexact",
+        Operator.MATCH: "regex",
+    }
+
+
+class PandasNumberField(PandasSearchFieldWithoutWildcard):
+    OPERATOR_TO_LOOKUP = {
+        Operator.GTE: "gte",
+        Operator.LTE: "lte",
+        Operator.GT: "gt",
+        Operator.LT: "lt",
+        Operator.EQ: "exact",
+        Operator.NEQ: "exact",
+    }
+
+
+class PandasIntegerField(PandasNumberField):
+    def cast_value(self, value: str) -> int:
+        try:
+            return int(value)
+        except (ValueError, TypeError):
+            raise LuceneSearchCastValueException()
+
+
+class PandasFloatField(PandasNumberField):
+    def cast_value(self, value: str) -> float:
+        try:
+            return float(value)
+        except (ValueError, TypeError):
+            raise LuceneSearchCastValueException()
+
+
+class PandasBooleanField(PandasSearchFieldWithoutWildcard):
+    OPERATOR_TO_LOOKUP = {
+        Operator.EQ: "exact",
+        Operator.NEQ: "exact",
+    }
+
+    _values = {"true": True, "false": False}
+    _default_get_available_values_method = _values.keys
+
+    def cast_value(self, value: str) -> bool:
+        value = value.lower()
+        if value in self._values:
+            return self._values[value]
+
+        raise LuceneSearchCastValueException()
+
+
+class PandasNullBooleanField(PandasBooleanField):
+    _values = {"true": True, "false": False, "null": None}
+    _default_get_available_values_method = _values.keys
+
+
+default_pandas_field_types_to_fields = {
+    FieldType.INTEGER: PandasIntegerField,
+    FieldType.BOOLEAN: PandasBooleanField,
+    FieldType.NULL_BOOLEAN: PandasNullBooleanField,
+    FieldType.FLOAT: PandasFloatField,
+}
@@ -0,0 +1,249 @@
+import operator
+import re
+from typing import Any, Callable, List
+
+from lucyparser.tree import Operator
+
+from lucyfer.parser.cost import LookupKind
+from lucyfer.searchset.fields.base import BaseSearchField
+from lucyfer.searchset.fields.mapping import PythonMappingMixin
+from lucyfer.searchset.utils import FieldType, get_value_getter
+from lucyfer.utils import LuceneSearchCastValueException, LuceneSearchInvalidValueException
+
+
+lookup_to_comparison = {
+    "gt": operator.gt,
+    "gte": operator.ge,
+    "lt": operator.lt,
+    "lte": operator.le,
+}
+
+multiple_value_types = (list, tuple, set, frozenset)
+
+
+class PythonSearchFieldWithoutWildcard(PythonMappingMixin, BaseSearchField):
+    """
+    Field compiles conditions to predicates over mappings or objects.
+    Sources are dotted paths to values, lists of values match if any of its items matches
+    """
+    DEFAULT_LOOKUP = "exact"
+
+    OPERATOR_TO_LOOKUP = {
+        Operator.EQ: "exact",
+        Operator.NEQ: "exact",
+        Operator.GT: "gt",
+        Operator.GTE: "gte",
+        Operator.LT: "lt",
+        Operator.LTE: "lte",
+        Operator.MATCH: "regex",
+    }
+
+    def prepare_record_value(self, value):
+        """
+        Prepares value from record before comparison with casted value of condition.
+        Records from text formats (like csv) contain strings only, so they are casted as values of conditions
+        """
+        if isinstance(value, str):
+            try:
+                return self.cast_value(value)
+            except LuceneSearchCastValueException:
+                return value
+        return value
+
+    def prepare_condition_value(self, value):
+        """
+        Prepares casted value of condition before comparison with values from records
+        """
+        return value
+
+    def get_value_predicate(self, lookup: str, value) -> Callable[[Any], bool]:
+        """
+        Returns predicate for single value from record
+        """
+        prepare = self.prepare_record_value
+
+        if lookup == "regex":
+            pattern = self._compile_regex(str(value))
+            return lambda v: v is not None and pattern.fullmatch(str(v)) is not None
+
+        if lookup in lookup_to_comparison:
+            compare = lookup_to_comparison[lookup]
+
+            def predicate(v):
+                if v is None:
+                    return False
+                try:
+                    return compare(prepare(v), value)
+                except TypeError:
+                    return False
+
+            return predicate
+
+        return lambda v: prepare(v) == value
+
+    def get_predicate_for_sources(self, field_name: str, value_predicate: Callable[[Any], bool]):
+        """
+        Returns predicate for record which is True if any value from sources matches
+        """
+        getters = [get_value_getter(source) for source in self.get_sources(field_name)]
+
+        def predicate(record):
+            for getter in getters:
+                value = getter(record)
+
+                if isinstance(value, multiple_value_types):
+                    for item in value:
+                        if value_predicate(item):
+                            return True
+                elif value_predicate(value):
+                    return True
+
+            return False
+
+        return predicate
+
+    def create_query_for_sources(self, condition):
+        lookup = self.get_lookup(condition.operator)
+        value = self.cast_value(condition.value)
+
+        return self.get_predicate_for_sources(field_name=condition.name,
+                                              value_predicate=self.get_value_predicate(lookup=lookup, value=value))
+
+    def is_in_condition(self, condition) -> bool:
+        """
+        Returns True if condition is an exact match, so it may be merged with others into one set lookup
+        """
+        if condition.operator != Operator.EQ or self.get_lookup(condition.operator) != "exact":
+            return False
+
+        try:
+            hash(self.cast_value(condition.value))
+        except TypeError:
+            return False
+
+        return True
+
+    def get_query_for_in(self, field_name: str, values: List[Any]):
+        prepare = self.prepare_record_value
+        values = frozenset(self.prepare_condition_value(value) for value in values)
+
+        def value_predicate(v):
+            try:
+                return prepare(v) in values
+            except TypeError:
+                return False
+
+        return self.get_predicate_for_sources(field_name=field_name, value_predicate=value_predicate)
+
+    def get_lookup_kind(self, condition) -> LookupKind:
+        lookup_kind = super().get_lookup_kind(condition)
+
+        if lookup_kind in (LookupKind.WILDCARD, LookupKind.LEADING_WILDCARD):
+            return LookupKind.TERM
+
+        return lookup_kind
+
+    def get_query(self, condition):
+        predicate = self.create_query_for_sources(condition=condition)
+
+        if condition.operator == Operator.NEQ:
+            return lambda record: not predicate(record)
+
+        return predicate
+
+    def _compile_regex(self, pattern: str, flags: int = 0):
+        try:
+            return re.compile(pattern, flags)
+        except re.error:
+            raise LuceneSearchInvalidValueException()
+
+
+class PythonSearchField(PythonSearchFieldWithoutWildcard):
+    """
+    String field with wildcards support: `*` matches any characters and `?` matches one character
+    """
+    case_sensitive = True
+
+    def prepare_record_value(self, value):
+        if value is None:
+            return None
+
+        value = str(value)
+        return value if self.case_sensitive else value.lower()
+
+    def get_value_predicate(self, lookup: str, value) -> Callable[[Any], bool]:
+        if lookup == "regex" and not self.case_sensitive:
+            pattern = self._compile_regex(str(value), flags=re.IGNORECASE)
+            return lambda v: v is not None and pattern.fullmatch(str(v)) is not None
+
+        value = self.prepare_condition_value(value)
+
+        if lookup == "exact" and self._has_wildcard(value):
+            pattern = self._compile_regex("".join(
+                ".*" if char == "*" else "." if char == "?" else re.escape(char) for char in value
+            ), flags=re.DOTALL)
+            prepare = self.prepare_record_value
+            return lambda v: v is not None and pattern.fullmatch(prepare(v)) is not None
+
+        return super().get_value_predicate(lookup=lookup, value=value)
+
+    def is_in_condition(self, condition) -> bool:
+        return not self._has_wildcard(condition.value) and super().is_in_condition(condition)
+
+    def prepare_condition_value(self, value):
+        if self.case_sensitive or not isinstance(value, str):
+            return value
+        return value.lower()
+
+    def get_lookup_kind(self, condition) -> LookupKind:
+        return BaseSearchField.get_lookup_kind(self, condition)
+
+    @staticmethod
+    def _has_wildcard(value) -> bool:
+        return isinstance(value, str) and ("*" in value or "?" in value)
+
+
+class PythonIntegerField(PythonSearchFieldWithoutWildcard):
+    def cast_value(self, value: str) -> int:
+        try:
+            return int(value)
+        except (ValueError, TypeError):
+            raise LuceneSearchCastValueException()
+
+
+class PythonFloatField(PythonSearchFieldWithoutWildcard):
+    def cast_value(self, value: str) -> float:
+        try:
+            return float(value)
+        except (ValueError, TypeError):
+            raise LuceneSearchCastValueException()
+
+
+class PythonBooleanField(PythonSearchFieldWithoutWildcard):
+    OPERATOR_TO_LOOKUP = {
+        Operator.EQ: "exact",
+        Operator.NEQ: "exact",
+    }
+
+    _values = {"true": True, "false": False}
+    _default_get_available_values_method = _values.keys
+
+    def cast_value(self, value: str) -> bool:
+        value = value.lower()
+        if value in self._values:
+            return self._values[value]
+
+        raise LuceneSearchCastValueException()
+
+
+class PythonNullBooleanField(PythonBooleanField):
+    _values = {"true": True, "false": False, "null": None}
+    _default_get_available_values_method = _values.keys
+
+
+default_python_field_types_to_fields = {
+    FieldType.INTEGER: PythonIntegerField,
+    FieldType.BOOLEAN: PythonBooleanField,
+    FieldType.NULL_BOOLEAN: PythonNullBooleanField,
+    FieldType.FLOAT: PythonFloatField,
+}
@@ -0,0 +1,183 @@
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from lucyfer.searchset.utils import FieldType
+
+
+__all__ = [
+    'BaseElasticMappingLoader',
+    'LatestIndexMappingLoader',
+    'AliasMappingLoader',
+    'IndicesMappingLoader',
+    'FieldCapsMappingLoader',
+    'merge_raw_mappings',
+]
+
+
+def merge_raw_mappings(raw_mappings: Iterable[Dict[str, Optional[FieldType]]]) -> Dict[str, Optional[FieldType]]:
+    """
+    Merges raw mappings of several indices. Fields with different types in indices get None type (default field)
+    """
+    result = {}
+
+    for raw_mapping in raw_mappings:
+        for name, field_type in raw_mapping.items():
+            if name in result and result[name] != field_type:
+                result[name] = None
+            else:
+                result[name] = field_type
+
+    return result
+
+
+def is_index_pattern(index: str) -> bool:
+    return "*" in index or "," in index
+
+
+class BaseElasticMappingLoader:
+    """
+    Loads raw mapping for elasticsearch searchset.
+    Loaders request mappings of resolved indices only, `filter_path` trims everything but field types from response
+    """
+
+    def __init__(self, index: Optional[str] = None, use_filter_path: bool = True):
+        """
+        :param index: index name or pattern, index of searchset model is used by default
+        """
+        self.index = index
+        self.use_filter_path = use_filter_path
+
+    def load(self, searchset_class) -> Dict[str, Optional[FieldType]]:
+        raise NotImplementedError()
+
+    def get_index(self, searchset_class) -> str:
+        if self.index is not None:
+            return self.index
+
+        return searchset_class._meta.model()._get_index()
+
+    def get_raw_mappings(self, searchset_class, indices: Sequence[str]) -> Dict[str, Dict[str, Optional[FieldType]]]:
+        """
+        Returns index to its raw mapping for given indices only
+        """
+        if not indices:
+            return dict()
+
+        kwargs = {}
+        if self.use_filter_path:
+            kwargs["filter_path"] = "*.mappings.*.properties.**.type"
+
+        index_to_mapping = searchset_class.get_es_client().indices.get_mapping(index=",".join(indices), **kwargs)
+        if not index_to_mapping:
+            return dict()
+
+        doc_type = searchset_class._meta.model._doc_type.name
+
+        result = {}
+        for index, mapping in index_to_mapping.items():
+            try:
+                properties = mapping["mappings"][doc_type]["properties"]
+            except KeyError:
+                continue
+
+            result[index] = searchset_class._format_mapping_values(properties)
+
+        return result
+
+
+class LatestIndexMappingLoader(BaseElasticMappingLoader):
+    """
+    Uses mapping of the latest index (the last one by name, as for daily rolled indices).
+    Index names are listed first for patterns, so only one mapping is requested
+    """
+
+    def load(self, searchset_class) -> Dict[str, Optional[FieldType]]:
+        index = self.get_index(searchset_class)
+
+        if is_index_pattern(index):
+            indices = self.get_index_names(searchset_class, index=index)
+            if not indices:
+                return dict()
+            index = max(indices)
+
+        index_to_raw_mapping = self.get_raw_mappings(searchset_class, indices=[index])
+        if not index_to_raw_mapping:
+            return dict()
+
+        # index may be an alias with several indices
+        return index_to_raw_mapping[max(index_to_raw_mapping)]
+
+    @staticmethod
+    def get_index_names(searchset_class, index: str) -> List[str]:
+        rows = searchset_class.get_es_client().cat.indices(index=index, h="index", format="json")
+        return [row["index"] for row in rows or ()]
+
+
+class AliasMappingLoader(BaseElasticMappingLoader):
+    """
+    Uses mapping of write index of alias, or the latest index of alias if write index is not set
+    """
+
+    def __init__(self, alias: str, use_filter_path: bool = True):
+        super().__init__(index=alias, use_filter_path=use_filter_path)
+
+    def load(self, searchset_class) -> Dict[str, Optional[FieldType]]:
+        index_to_aliases = searchset_class.get_es_client().indices.get_alias(name=self.index)
+        if not index_to_aliases:
+            return dict()
+
+        write_indices = [
+            index for index, data in index_to_aliases.items()
+            if data.get("aliases", {}).get(self.index, {}).get("is_write_index")
+        ]
+        index = max(write_indices or index_to_aliases)
+
+        return self.get_raw_mappings(searchset_class, indices=[index]).get(index, dict())
+
+
+class IndicesMappingLoader(BaseElasticMappingLoader):
+    """
+    Merges mappings of explicitly listed indices
+    """
+
+    def __init__(self, indices: Sequence[str], use_filter_path: bool = True):
+        super().__init__(index=",".join(indices), use_filter_path=use_filter_path)
+        self.indices = list(indices)
+
+    def load(self, searchset_class) -> Dict[str, Optional[FieldType]]:
+        index_to_raw_mapping = self.get_raw_mappings(searchset_class, indices=self.indices)
+        return merge_raw_mappings(index_to_raw_mapping[index] for index in sorted(index_to_raw_mapping))
+
+
+class FieldCapsMappingLoader(BaseElasticMappingLoader):
+    """
+    Merges field types of all indices matching pattern with one `field_caps` request instead of their mappings.
+    Fields with different types in indices get None type
+    """
+
+    # object fields are containers of other fields, so they are not searchable themselves
+    skipped_types = frozenset(("object", "nested"))
+
+    def load(self, searchset_class) -> Dict[str, Optional[FieldType]]:
+        kwargs = {}
+        if self.use_filter_path:
+            kwargs["filter_path"] = "fields.*.*.type"
+
+        response = searchset_class.get_es_client().field_caps(
+            index=self.get_index(searchset_class), fields="*", **kwargs
+        )
+
+        result = {}
+        for name, type_to_caps in (response or {}).get("fields", {}).items():
+            if name.startswith("_"):
+                # meta fields like _id or _index
+                continue
+
+            types = set(type_to_caps) - self.skipped_types
+            if not types:
+                continue
+
+            # for ex. integer and long in different indices are both integer fields
+            field_types = {searchset_class._raw_type_to_field_type.get(type_) for type_ in types}
+            result[name] = field_types.pop() if len(field_types) == 1 else None
+
+        return result
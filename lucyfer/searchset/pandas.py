@@ -0,0 +1,55 @@
+from typing import Dict
+
+import pandas as pd
+
+from lucyfer.parser.pandas import LuceneToPandasParserMixin
+from lucyfer.searchset.base import BaseSearchSet
+from lucyfer.searchset.fields.pandas import PandasSearchField, PandasSearchFieldWithoutWildcard, \
+    default_pandas_field_types_to_fields
+from lucyfer.searchset.utils import FieldType
+
+
+pandas_dtype_kind_to_field_type = {
+    "b": FieldType.BOOLEAN,
+    "i": FieldType.INTEGER,
+    "u": FieldType.INTEGER,
+    "f": FieldType.FLOAT,
+    "M": FieldType.TIMESTAMP,
+    "O": FieldType.STRING,
+    "U": FieldType.STRING,
+}
+
+
+class PandasSearchSet(LuceneToPandasParserMixin, BaseSearchSet):
+    """
+    Searchset for DataFrames. Meta.model is a DataFrame (it may be empty) which dtypes are used as mapping.
+    pandas is an optional dependency, so import it from `lucyfer.searchset.pandas` directly
+    """
+    _field_base_class = PandasSearchFieldWithoutWildcard
+    _default_field = PandasSearchField
+    _field_class_for_default_searching = PandasSearchField
+
+    _field_type_to_field_class = default_pandas_field_types_to_fields
+    _raw_type_to_field_type = pandas_dtype_kind_to_field_type
+
+    @classmethod
+    def filter(cls, df: pd.DataFrame, search_terms: str, raise_exception=False) -> pd.DataFrame:
+        """
+        Returns rows of DataFrame which match lucene expression
+        """
+        return df[cls.get_mask(df=df, search_terms=search_terms)]
+
+    @classmethod
+    def get_mask(cls, df: pd.DataFrame, search_terms: str) -> pd.Series:
+        """
+        Returns boolean mask of rows which match lucene expression
+        """
+        return cls.parse(raw_expression=search_terms)(df)
+
+    @classmethod
+    def _get_raw_mapping(cls) -> Dict[str, FieldType]:
+        if cls._meta.model is None:
+            return dict()
+
+        return {str(name): cls._raw_type_to_field_type.get(dtype.kind)
+                for name, dtype in cls._meta.model.dtypes.items()}
@@ -0,0 +1,186 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from lucyparser.tree import BaseNode, ExpressionNode, AndNode, OrNode
+
+from lucyfer.parser.optimizer import flatten_children
+from lucyfer.searchset.python import PythonSearchSet
+from lucyfer.searchset.utils import get_value_getter
+
+
+__all__ = [
+    'PercolatorIndex',
+]
+
+
+# term is a source of field and prepared value: ((field, source), value)
+Term = Tuple[Tuple[Any, str], Any]
+
+
+class PercolatorIndex:
+    """
+    Finds stored expressions which match a document.
+
+    Each expression is indexed by exact terms one of which must be in a document to match it
+    (for ex. `(a: 1 OR a: 2) AND b > 3` is indexed by `a: 1` and `a: 2`).
+    Only expressions found by document terms are evaluated, expressions without required terms are evaluated always.
+    """
+
+    def __init__(self, searchset_class):
+        assert issubclass(searchset_class, PythonSearchSet), "Percolator index works with python searchsets only"
+
+        self.searchset_class = searchset_class
+
+        self._lock = threading.RLock()
+
+        # expression id to its predicate and terms (None if expression has no required terms)
+        self._expressions: Dict[Hashable, Tuple[Callable[[Any], bool], Optional[Set[Term]]]] = {}
+
+        # (field, source) to value to expression ids
+        self._postings: Dict[Tuple[Any, str], Dict[Any, Set[Hashable]]] = {}
+        self._source_getters: Dict[Tuple[Any, str], Callable[[Any], Any]] = {}
+
+        # expressions without required terms
+        self._unindexed: Set[Hashable] = set()
+
+    def add(self, expression_id: Hashable, raw_expression: str) -> None:
+        """
+        Adds expression to index or replaces expression with the same id.
+        Raises LuceneSearchException for invalid expressions
+        """
+        tree = self.searchset_class._get_optimized_tree(raw_expression=raw_expression)
+        # stored expressions aren't put to parsed query cache, so they don't evict queries of searches
+        predicate = self.searchset_class._parse_tree(tree=tree)
+        terms = self._get_required_terms(tree)
+
+        with self._lock:
+            self._remove(expression_id)
+            self._expressions[expression_id] = (predicate, terms)
+
+            if terms is None:
+                self._unindexed.add(expression_id)
+                return
+
+            for (field_source, value) in terms:
+                if field_source not in self._postings:
+                    self._postings[field_source] = {}
+                    self._source_getters[field_source] = get_value_getter(field_source[1])
+
+                self._postings[field_source].setdefault(value, set()).add(expression_id)
+
+    def remove(self, expression_id: Hashable) -> None:
+        with self._lock:
+            self._remove(expression_id)
+
+    def match(self, document) -> Set[Hashable]:
+        """
+        Returns ids of expressions which match document.
+        Predicates are evaluated without lock, so slow documents don't block adding of expressions in other threads
+        """
+        with self._lock:
+            candidates = set(self._unindexed)
+            candidates.update(self._get_candidates(document))
+
+            predicates = [(expression_id, self._expressions[expression_id][0]) for expression_id in candidates]
+
+        return {expression_id for expression_id, predicate in predicates if predicate(document)}
+
+    def get_candidates_count(self, document) -> int:
+        """
+        Returns count of expressions which have to be evaluated for document
+        """
+        with self._lock:
+            return len(self._unindexed | self._get_candidates(document))
+
+    def __len__(self):
+        return len(self._expressions)
+
+    def __contains__(self, expression_id):
+        return expression_id in self._expressions
+
+    def _get_candidates(self, document) -> Set[Hashable]:
+        candidates = set()
+
+        for field_source, value_to_ids in self._postings.items():
+            field = field_source[0]
+            value = self._source_getters[field_source](document)
+
+            for item in value if isinstance(value, (list, tuple, set, frozenset)) else [value]:
+                try:
+                    ids = value_to_ids.get(field.prepare_record_value(item))
+                except TypeError:
+                    continue
+
+                if ids:
+                    candidates.update(ids)
+
+        return candidates
+
+    def _remove(self, expression_id: Hashable) -> None:
+        if expression_id not in self._expressions:
+            return
+
+        _, terms = self._expressions.pop(expression_id)
+        self._unindexed.discard(expression_id)
+
+        for field_source, value in terms or ():
+            value_to_ids = self._postings[field_source]
+            value_to_ids[value].discard(expression_id)
+
+            if not value_to_ids[value]:
+                del value_to_ids[value]
+
+            if not value_to_ids:
+                del self._postings[field_source]
+                del self._source_getters[field_source]
+
+    def _get_required_terms(self, tree: BaseNode) -> Optional[Set[Term]]:
+        """
+        Returns terms one of which must be in document to match the tree or None if there are no such terms.
+        OR node requires one term of each child, AND node requires terms of any child, so the smallest set is taken
+        """
+        results: List[Optional[Set[Term]]] = []
+        stack = [(tree, None)]
+
+        while stack:
+            node, children = stack.pop()
+
+            if isinstance(node, ExpressionNode):
+                results.append(self._get_condition_terms(node))
+                continue
+
+            if not isinstance(node, (AndNode, OrNode)):
+                # negations don't require anything
+                results.append(None)
+                continue
+
+            if children is None:
+                children = flatten_children(node)
+                stack.append((node, children))
+                stack.extend((child, None) for child in children)
+                continue
+
+            children_terms = results[len(results) - len(children):]
+            del results[len(results) - len(children):]
+
+            if isinstance(node, OrNode):
+                if any(terms is None for terms in children_terms):
+                    results.append(None)
+                else:
+                    results.append(set().union(*children_terms))
+            else:
+                children_terms = [terms for terms in children_terms if terms is not None]
+                results.append(min(children_terms, key=len) if children_terms else None)
+
+        return results.pop()
+
+    def _get_condition_terms(self, condition: ExpressionNode) -> Optional[Set[Term]]:
+        if self.searchset_class._is_saved_search_condition(condition):
+            return None
+
+        field = self.searchset_class.get_field(condition.name)
+        if not field.is_in_condition(condition):
+            return None
+
+        value = field.prepare_condition_value(field.cast_value(condition.value))
+        return {((field, source), value) for source in field.get_sources(condition.name)}
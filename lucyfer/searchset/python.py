@@ -0,0 +1,87 @@
+import dataclasses
+import sys
+import typing
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, Any
+
+from lucyfer.parser import LuceneToPythonParserMixin
+from lucyfer.searchset.base import BaseSearchSet
+from lucyfer.searchset.fields.python import PythonSearchField, PythonSearchFieldWithoutWildcard, \
+    default_python_field_types_to_fields
+from lucyfer.searchset.utils import FieldType
+
+
+python_type_to_field_type = {
+    bool: FieldType.BOOLEAN,
+    int: FieldType.INTEGER,
+    float: FieldType.FLOAT,
+    str: FieldType.STRING,
+    datetime: FieldType.TIMESTAMP,
+    date: FieldType.TIMESTAMP,
+}
+
+
+class PythonSearchSet(LuceneToPythonParserMixin, BaseSearchSet):
+    """
+    Searchset for records in memory: mappings (like decoded json events) or any objects.
+    Mapping is taken from annotations of Meta.model (for ex. dataclass or TypedDict), nested dataclasses are
+    available by dotted names
+    """
+    _field_base_class = PythonSearchFieldWithoutWildcard
+    _default_field = PythonSearchField
+    _field_class_for_default_searching = PythonSearchField
+
+    _field_type_to_field_class = default_python_field_types_to_fields
+    _raw_type_to_field_type = python_type_to_field_type
+
+    @classmethod
+    def filter(cls, records: Iterable[Any], search_terms: str, raise_exception=False) -> Iterator[Any]:
+        """
+        Returns iterator over records which match lucene expression
+        """
+        predicate = cls.parse(raw_expression=search_terms)
+        return (record for record in records if predicate(record))
+
+    @classmethod
+    def _get_raw_mapping(cls) -> Dict[str, FieldType]:
+        if cls._meta.model is None:
+            return dict()
+
+        return cls._format_mapping_values(cls._meta.model)
+
+    @classmethod
+    def _format_mapping_values(cls, model, prefix="") -> Dict[str, FieldType]:
+        field_name_to_field_type = dict()
+        stack = [(f"{prefix}." if prefix else "", iter(typing.get_type_hints(model).items()))]
+
+        while stack:
+            name_prefix, items = stack[-1]
+
+            for key, annotation in items:
+                field_name = sys.intern(name_prefix + key)
+                annotation, optional = cls._unwrap_optional(annotation)
+
+                if dataclasses.is_dataclass(annotation):
+                    stack.append((f"{field_name}.", iter(typing.get_type_hints(annotation).items())))
+                    break
+
+                if annotation is bool and optional:
+                    field_name_to_field_type[field_name] = FieldType.NULL_BOOLEAN
+                else:
+                    field_name_to_field_type[field_name] = cls._raw_type_to_field_type.get(annotation)
+            else:
+                stack.pop()
+
+        return field_name_to_field_type
+
+    @staticmethod
+    def _unwrap_optional(annotation):
+        """
+        Returns type from Optional[type] annotation and flag if it was optional
+        """
+        if typing.get_origin(annotation) is typing.Union:
+            args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+            if len(args) == 1:
+                return args[0], True
+
+        return annotation, False
@@ -0,0 +1,95 @@
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional
+
+from lucyfer.settings import lucyfer_settings
+
+
+__all__ = [
+    'SearchSetRegistry',
+    'searchset_registry',
+    'warm_up',
+]
+
+
+class SearchSetRegistry:
+    """
+    Keeps all searchset classes created by metaclass.
+    Classes are referenced weakly, so searchsets defined in functions (for ex. in tests) don't leak
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._searchsets = weakref.WeakSet()
+
+    def register(self, searchset_class) -> None:
+        with self._lock:
+            self._searchsets.add(searchset_class)
+
+    def unregister(self, searchset_class) -> None:
+        with self._lock:
+            self._searchsets.discard(searchset_class)
+
+    def get_searchsets(self) -> List:
+        """
+        Returns searchsets with model, base searchsets can't build mapping
+        """
+        with self._lock:
+            searchsets = list(self._searchsets)
+
+        return sorted((searchset for searchset in searchsets if searchset._meta.model is not None),
+                      key=lambda searchset: f"{searchset.__module__}.{searchset.__qualname__}")
+
+    def warm_up(self, searchset_classes: Optional[Iterable] = None, max_workers: Optional[int] = None,
+                raise_exception: bool = False) -> Dict[type, Optional[Exception]]:
+        """
+        Builds raw mapping and fields of searchsets storages concurrently, so first requests don't wait for it.
+        Returns searchset to exception raised while building its storage (None if storage was built)
+
+        :param searchset_classes: all registered searchsets with model by default
+        :param max_workers: threads count, mapping loading is mostly io (elasticsearch requests), so threads are enough.
+            Settings are used by default
+        :param raise_exception: raise first exception after all storages are processed
+        """
+        if searchset_classes is None:
+            searchset_classes = self.get_searchsets()
+
+        searchset_classes = list(searchset_classes)
+        if not searchset_classes:
+            return {}
+
+        if max_workers is None:
+            max_workers = lucyfer_settings.WARM_UP_MAX_WORKERS
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lucyfer-warm-up") as executor:
+            results = dict(zip(searchset_classes, executor.map(_build_storage, searchset_classes)))
+
+        if raise_exception:
+            for exception in results.values():
+                if exception is not None:
+                    raise exception
+
+        return results
+
+
+def _build_storage(searchset_class) -> Optional[Exception]:
+    try:
+        # fields are built from raw mapping, so both are cached
+        searchset_class.storage.field_source_to_field
+    except Exception as e:
+        return e
+    return None
+
+
+searchset_registry = SearchSetRegistry()
+
+
+def warm_up(searchset_classes: Optional[Iterable] = None, max_workers: Optional[int] = None,
+            raise_exception: bool = False) -> Dict[type, Optional[Exception]]:
+    """
+    Builds storages of searchsets in current process. Call it in serving processes before requests,
+    for ex. in `wsgi.py` after `get_wsgi_application()` or in `post_fork` hook of gunicorn
+    """
+    return searchset_registry.warm_up(searchset_classes=searchset_classes, max_workers=max_workers,
+                                      raise_exception=raise_exception)
@@ -0,0 +1,183 @@
+"""
+Snapshots of resolved searchsets storages. Snapshot is dumped at build time and used instead of mapping requests
+on startup, searchsets which configuration doesn't match snapshot load mapping as usual.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from django.test.signals import setting_changed
+
+from lucyfer.searchset.registry import searchset_registry
+from lucyfer.searchset.utils import FieldType
+from lucyfer.settings import lucyfer_settings, LUCYFER_SETTINGS_NAME
+
+
+__all__ = [
+    'SNAPSHOT_VERSION',
+    'dump_snapshot',
+    'load_snapshot',
+    'get_snapshot_entry',
+    'get_state_from_snapshot',
+]
+
+
+# snapshots of other versions are ignored
+SNAPSHOT_VERSION = 1
+
+_lock = threading.Lock()
+
+# path to loaded snapshot, it is read once per process
+_path_to_snapshot: Dict[str, Optional[Dict[str, Any]]] = {}
+
+
+def get_searchset_key(searchset_class) -> str:
+    return f"{searchset_class.__module__}.{searchset_class.__qualname__}"
+
+
+def get_class_path(cls) -> str:
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def get_checksum(snapshot: Dict[str, Any]) -> str:
+    """
+    Returns checksum of all snapshot fields except checksum itself
+    """
+    content = {key: value for key, value in snapshot.items() if key != "checksum"}
+    return hashlib.sha256(json.dumps(content, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def get_snapshot_entry_for_state(storage, raw_mapping, field_source_to_field) -> Dict[str, Any]:
+    return {
+        "raw_mapping": {name: field_type.name if field_type else None for name, field_type in raw_mapping.items()},
+        "field_classes": {source: get_class_path(field_source_to_field.get_field_class(source))
+                          for source in field_source_to_field},
+        "fields_to_exclude_from_mapping": sorted(storage.fields_to_exclude_from_mapping),
+        "fields_to_exclude_from_suggestions": sorted(storage.fields_to_exclude_from_suggestions),
+    }
+
+
+def dump_snapshot(path: str, searchset_classes: Optional[Iterable] = None) -> Dict[str, Any]:
+    """
+    Loads mappings of searchsets (all registered searchsets by default) and writes them with resolved field classes
+    to json file. File is replaced atomically, so running processes never read partially written snapshot
+    """
+    if searchset_classes is None:
+        searchset_classes = searchset_registry.get_searchsets()
+
+    searchsets = {}
+    for searchset_class in searchset_classes:
+        storage = searchset_class.storage
+        raw_mapping = searchset_class._load_raw_mapping(use_cache=False)
+
+        searchsets[get_searchset_key(searchset_class)] = get_snapshot_entry_for_state(
+            storage=storage,
+            raw_mapping=raw_mapping,
+            field_source_to_field=storage._build_field_source_to_field(raw_mapping=raw_mapping),
+        )
+
+    snapshot = {
+        "version": SNAPSHOT_VERSION,
+        "created_at": time.time(),
+        "searchsets": searchsets,
+    }
+    snapshot["checksum"] = get_checksum(snapshot)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as fp:
+        json.dump(snapshot, fp, sort_keys=True, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+    with _lock:
+        _path_to_snapshot.pop(path, None)
+
+    return snapshot
+
+
+def load_snapshot(path: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns snapshot from file or None if file is missed, corrupted or has another version.
+    Checksum covers version and creation time too, so edited snapshot can't bypass max age check
+    """
+    try:
+        with open(path) as fp:
+            snapshot = json.load(fp)
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(snapshot, dict) or snapshot.get("version") != SNAPSHOT_VERSION:
+        return None
+
+    if not isinstance(snapshot.get("searchsets"), dict) or \
+            not isinstance(snapshot.get("created_at"), (int, float)) or isinstance(snapshot["created_at"], bool):
+        return None
+
+    if snapshot.get("checksum") != get_checksum(snapshot):
+        return None
+
+    return snapshot
+
+
+def get_snapshot(path: str) -> Optional[Dict[str, Any]]:
+    with _lock:
+        if path not in _path_to_snapshot:
+            _path_to_snapshot[path] = load_snapshot(path)
+        return _path_to_snapshot[path]
+
+
+def get_snapshot_entry(searchset_class) -> Optional[Dict[str, Any]]:
+    """
+    Returns snapshot entry of searchset from MAPPING_SNAPSHOT_PATH file or None if there is no actual snapshot
+    """
+    path = lucyfer_settings.MAPPING_SNAPSHOT_PATH
+    if not path:
+        return None
+
+    snapshot = get_snapshot(path)
+    if snapshot is None:
+        return None
+
+    max_age = lucyfer_settings.MAPPING_SNAPSHOT_MAX_AGE
+    if max_age is not None and time.time() - snapshot["created_at"] > max_age:
+        return None
+
+    return snapshot["searchsets"].get(get_searchset_key(searchset_class))
+
+
+def get_state_from_snapshot(storage):
+    """
+    Builds storage state from snapshot. Returns None if snapshot is missed or stale,
+    for ex. searchset fields or exclusions were changed after it was dumped
+    """
+    entry = get_snapshot_entry(storage.searchset_class)
+    if entry is None:
+        return None
+
+    try:
+        raw_mapping = {name: FieldType[field_type] if field_type else None
+                       for name, field_type in entry["raw_mapping"].items()}
+    except (KeyError, AttributeError):
+        return None
+
+    state = storage._build_state(raw_mapping=raw_mapping, version=1)
+
+    actual_entry = get_snapshot_entry_for_state(storage=storage, raw_mapping=state.raw_mapping,
+                                                field_source_to_field=state.field_source_to_field)
+    if actual_entry != entry:
+        return None
+
+    return state
+
+
+def clear_loaded_snapshots(*args, **kwargs) -> None:
+    if kwargs.get('setting', LUCYFER_SETTINGS_NAME) != LUCYFER_SETTINGS_NAME:
+        return
+
+    with _lock:
+        _path_to_snapshot.clear()
+
+
+setting_changed.connect(clear_loaded_snapshots)
@@ -1,12 +1,239 @@
+import hashlib
+import sys
+import threading
+import time
 import warnings
-from dataclasses import dataclass
-from typing import Dict, Any, Set, Optional
+from collections.abc import Mapping
+from dataclasses import dataclass, field as dataclass_field
+from typing import Dict, Any, Set, Optional, ClassVar, Iterator, Type, FrozenSet
+from weakref import WeakSet, WeakValueDictionary
 
+from django.test.signals import setting_changed
+
+from lucyfer.parser.cache import ParsedQueryCache
 from lucyfer.searchset.fields import BaseSearchField, FieldType
-from lucyfer.settings import lucyfer_settings
+from lucyfer.searchset.snapshot import get_state_from_snapshot
+from lucyfer.settings import lucyfer_settings, LUCYFER_SETTINGS_NAME
+
+
+class MappingFieldTable(Mapping):
+    """
+    Read only mapping of raw mapping sources to fields. Fields are created on first access only,
+    so big mappings don't keep thousands of fields which are never queried or suggested.
+    Table doesn't depend on searchset, so searchsets with the same mapping and field classes share it
+    """
+
+    def __init__(self,
+                 raw_mapping: Dict[str, Optional[FieldType]],
+                 field_type_to_field_class: Dict[Optional[FieldType], Type[BaseSearchField]],
+                 default_field_class: Type[BaseSearchField],
+                 fields_to_exclude_from_suggestions: FrozenSet[str]):
+        self.raw_mapping = raw_mapping
+
+        self._field_type_to_field_class = field_type_to_field_class
+        self._default_field_class = default_field_class
+        self._fields_to_exclude_from_suggestions = fields_to_exclude_from_suggestions
+
+        self._fields: Dict[str, BaseSearchField] = {}
+
+    def __getitem__(self, source: str) -> BaseSearchField:
+        field = self.get(source)
+        if field is None:
+            raise KeyError(source)
+        return field
+
+    def get(self, source: str, default=None):
+        field = self._fields.get(source)
+        if field is not None:
+            return field
+
+        if source not in self.raw_mapping:
+            return default
+
+        field = self.get_field_class(source)(show_suggestions=source not in self._fields_to_exclude_from_suggestions,
+                                             sources=[sys.intern(source)])
+
+        # setdefault keeps the first created field if several threads create it at once
+        return self._fields.setdefault(source, field)
+
+    def __contains__(self, source) -> bool:
+        return source in self.raw_mapping
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.raw_mapping)
+
+    def __len__(self) -> int:
+        return len(self.raw_mapping)
+
+    def get_field_class(self, source: str) -> Type[BaseSearchField]:
+        """
+        Returns class of field for source without its creation
+        """
+        return self._field_type_to_field_class.get(self.raw_mapping[source], self._default_field_class)
+
+    def get_created_fields_count(self) -> int:
+        return len(self._fields)
+
+
+# tables are shared while any storage uses them
+_mapping_field_tables: "WeakValueDictionary[str, MappingFieldTable]" = WeakValueDictionary()
+_mapping_field_tables_lock = threading.Lock()
+
+
+def get_mapping_field_table(raw_mapping: Dict[str, Optional[FieldType]],
+                            field_type_to_field_class: Dict[Optional[FieldType], Type[BaseSearchField]],
+                            default_field_class: Type[BaseSearchField],
+                            fields_to_exclude_from_suggestions: Set[str]) -> MappingFieldTable:
+    """
+    Returns table for raw mapping and field classes. Tables are addressed by hash of its content,
+    so searchsets with the same mapping (for ex. searchsets of tenants with one index template) share
+    raw mapping and created fields
+    """
+    fields_to_exclude_from_suggestions = frozenset(
+        source for source in fields_to_exclude_from_suggestions if source in raw_mapping
+    )
+
+    field_type_to_repr = {}
+    parts = []
+
+    for source, field_type in raw_mapping.items():
+        if field_type not in field_type_to_repr:
+            field_type_to_repr[field_type] = repr(field_type)
+
+        parts.append(source)
+        parts.append(field_type_to_repr[field_type])
+
+    digest = hashlib.sha256("\0".join(parts).encode())
+
+    # classes are referenced by table, so their ids are unique while it is alive
+    digest.update(repr(sorted(
+        (repr(field_type), id(field_class)) for field_type, field_class in field_type_to_field_class.items()
+    )).encode())
+    digest.update(str(id(default_field_class)).encode())
+    digest.update(repr(sorted(fields_to_exclude_from_suggestions)).encode())
+
+    key = digest.hexdigest()
+
+    with _mapping_field_tables_lock:
+        table = _mapping_field_tables.get(key)
+
+        if table is None:
+            table = MappingFieldTable(raw_mapping=raw_mapping,
+                                      field_type_to_field_class=field_type_to_field_class,
+                                      default_field_class=default_field_class,
+                                      fields_to_exclude_from_suggestions=fields_to_exclude_from_suggestions)
+            _mapping_field_tables[key] = table
+
+        return table
+
+
+class FieldTable(Mapping):
+    """
+    Read only mapping of sources to fields: explicit fields of searchset (defined in searchset and its sources)
+    layered on top of shared table of raw mapping fields
+    """
+
+    def __init__(self, fields: Dict[str, BaseSearchField], mapping_field_table: MappingFieldTable):
+        self._fields = fields
+        self._mapping_field_table = mapping_field_table
+
+    @property
+    def fields(self) -> Dict[str, BaseSearchField]:
+        return self._fields
+
+    @property
+    def mapping_field_table(self) -> MappingFieldTable:
+        return self._mapping_field_table
+
+    def __getitem__(self, source: str) -> BaseSearchField:
+        field = self.get(source)
+        if field is None:
+            raise KeyError(source)
+        return field
+
+    def get(self, source: str, default=None):
+        field = self._fields.get(source)
+        if field is not None:
+            return field
+
+        return self._mapping_field_table.get(source, default)
+
+    def __contains__(self, source) -> bool:
+        return source in self._fields or source in self._mapping_field_table
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._mapping_field_table
+        yield from (source for source in self._fields if source not in self._mapping_field_table)
+
+    def __len__(self) -> int:
+        return len(self._mapping_field_table) + sum(source not in self._mapping_field_table for source in self._fields)
+
+    def get_field_class(self, source: str) -> Type[BaseSearchField]:
+        """
+        Returns class of field for source without its creation
+        """
+        field = self._fields.get(source)
+        if field is not None:
+            return field.__class__
+
+        return self._mapping_field_table.get_field_class(source)
+
+    def get_created_fields_count(self) -> int:
+        return len(self._fields) + self._mapping_field_table.get_created_fields_count()
+
+
+class SearchSetMapping(Mapping):
+    """
+    Read only view of field table without sources excluded from mapping.
+    Fields of raw mapping are created on access only, so listings of big mappings should use `get_field_classes`
+    """
+
+    def __init__(self, field_table: FieldTable, excluded_sources: Set[str]):
+        self._field_table = field_table
+        self._excluded_sources = excluded_sources
+
+    def __getitem__(self, source: str) -> BaseSearchField:
+        if source in self._excluded_sources:
+            raise KeyError(source)
+        return self._field_table[source]
+
+    def __contains__(self, source) -> bool:
+        return source not in self._excluded_sources and source in self._field_table
+
+    def __iter__(self) -> Iterator[str]:
+        return (source for source in self._field_table if source not in self._excluded_sources)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def get_field_class(self, source: str) -> Type[BaseSearchField]:
+        if source in self._excluded_sources:
+            raise KeyError(source)
+        return self._field_table.get_field_class(source)
+
+    def get_field_classes(self) -> Dict[str, Type[BaseSearchField]]:
+        """
+        Returns classes of fields by sources without fields creation
+        """
+        return {source: self._field_table.get_field_class(source) for source in self}
+
+
+@dataclass(frozen=True)
+class SearchSetStorageState:
+    """
+    Immutable result of storage building. Refresh replaces the whole state at once, so requests which got
+    previous state keep using consistent mapping, fields and compiled queries
+    """
+    version: int
 
+    raw_mapping: Dict[str, FieldType]
+    field_source_to_field: FieldTable
 
-@dataclass
+    # compiled queries depend on fields, so cache lives with them
+    parsed_query_cache: ParsedQueryCache = dataclass_field(default_factory=ParsedQueryCache)
+
+
+@dataclass(eq=False)
 class SearchSetStorage:
     """
     Class provides availability to use fields in SearchSet class
@@ -22,92 +249,225 @@ class SearchSetStorage:
 
     field_class_for_default_searching: Optional[BaseSearchField]
 
-    _full_mapping = None
+    _state: Optional[SearchSetStorageState] = dataclass_field(default=None, init=False, repr=False)
+
+    # monotonic time after which mapping is refreshed, None if it never expires
+    _expires_at: Optional[float] = dataclass_field(default=None, init=False, repr=False)
+
+    # state is built and replaced by one thread at a time, readers of built state don't take it
+    _build_lock: threading.Lock = dataclass_field(default_factory=threading.Lock, init=False, repr=False)
+
+    _refresh_lock: threading.Lock = dataclass_field(default_factory=threading.Lock, init=False, repr=False)
+    _refreshing: bool = dataclass_field(default=False, init=False, repr=False)
+
+    _default_field: Optional[BaseSearchField] = dataclass_field(default=None, init=False, repr=False)
+
+    _instances: ClassVar[WeakSet] = WeakSet()
+
+    def __post_init__(self):
+        self._instances.add(self)
 
     @property
-    def mapping(self):
+    def mapping(self) -> SearchSetMapping:
         """
         Returns mapping for current searchset. Its looks like {field name: field}
         That property only contains fields not excluded from original mapping
         If you want to get values for some field in mapping - don't. You better use `field_source_to_field`
         """
-        return {
-            name: field for name, field in self.field_source_to_field.items()
-            if name not in self.fields_to_exclude_from_mapping
-        }
+        return SearchSetMapping(field_table=self.field_source_to_field,
+                                excluded_sources=self.fields_to_exclude_from_mapping)
 
     @property
-    def raw_mapping(self) -> Dict[str, FieldType]:
+    def state(self) -> SearchSetStorageState:
+        """
+        Returns current state and builds it on first usage.
+        Concurrent first usages wait for one build, so mapping is loaded once.
+        Expired state is returned as is while new one is loaded in background
+        """
+        state = self._state
+
+        if state is None:
+            with self._build_lock:
+                # state may be built while we were waiting for the lock
+                state = self._state
+
+                if state is None:
+                    state = get_state_from_snapshot(self) or \
+                        self._build_state(raw_mapping=self.searchset_class._load_raw_mapping(), version=1)
+                    self._set_state(state)
+        elif self._expires_at is not None and time.monotonic() >= self._expires_at:
+            self._start_background_refresh()
+
+        return state
+
+    @property
+    def default_field(self) -> BaseSearchField:
         """
-        Caches raw mapping and return it
+        Returns field for names which are not in mapping. Default field takes sources from condition name,
+        so one instance is shared by all unknown names instead of creating it for each query
         """
-        if not hasattr(self, 'raw_mapping_result'):
-            result = self.searchset_class._get_raw_mapping()
-            setattr(self, 'raw_mapping_result', result)
-        return self.raw_mapping_result
+        field = self._default_field
+
+        if field is None:
+            field = self.searchset_class._default_field()
+            self._default_field = field
+
+        return field
+
+    @property
+    def is_built(self) -> bool:
+        return self._state is not None
 
     @property
-    def field_source_to_field(self) -> Dict[str, BaseSearchField]:
+    def version(self) -> int:
+        """
+        Version of current state, it is increased each time changed mapping is loaded
+        """
+        return self.state.version
+
+    @property
+    def raw_mapping(self) -> Dict[str, FieldType]:
+        return self.state.raw_mapping
+
+    @property
+    def field_source_to_field(self) -> FieldTable:
         """
         Auto generated fields by type checking in raw mapping and sources handling in defined fields
         """
-        if not hasattr(self, 'field_source_to_field_result'):
-            # first process raw mapping
-            source_to_field_from_raw_mapping = {
-                name: self.searchset_class._field_type_to_field_class.get(
-                    field_type, self.searchset_class._default_field
-                )(show_suggestions=name not in self.fields_to_exclude_from_suggestions, sources=[name])
-
-                for name, field_type in self.raw_mapping.items()
-            }
-
-            # then process defined fields and its sources
-            source_to_field_from_user_fields = self.field_name_to_field.copy()
-            source_to_field_from_user_fields_sources = {}
-
-            # `missed_fields` uses for process possibly missed sources from case when defined
-            # some field in searchset like this one:
-            # x = SearchField(sources=["y"], use_field_class_for_sources=False)
-            # and when we have not found "y" in raw mapping and we have no idea what field class we need to use.
-            # it will be warning in the end of function.
-            missed_fields = []
-
-            for name, field in self.field_name_to_field.items():
-                if not field.sources:
-                    continue
-
-                if not field.use_field_class_for_sources:
-                    # we extend missed fields by all fields because after cycle we will filter it anyway
-                    missed_fields.extend([source for source in field.sources])
-                    continue
-
-                source_to_field_from_user_fields_sources.update(
-                    {
-                        source: field.__class__(sources=[source],
-                                                show_suggestions=source not in self.fields_to_exclude_from_suggestions,
-                                                get_available_values_method=field._get_available_values_method,
-                                                available_values_method_kwargs=field._available_values_method_kwargs,
-                                                use_cache_for_suggestions=field.use_cache_for_suggestions)
-                        for source in field.sources
-                    }
-                )
-
-            # now result
-            # we create an empty dict and update it by our dicts with order from low to high priority.
-            # it means if user have wrote field "A" in searchset and we have found field "A" in raw mapping
-            # priority of searchset is higher, so in result we will see users field, not field from raw mapping.
-            result = {}
-            result.update(source_to_field_from_raw_mapping)
-            result.update(source_to_field_from_user_fields_sources)
-            result.update(source_to_field_from_user_fields)
-
-            # and check default searching field if presented
-            if self.field_class_for_default_searching:
-                result.update({lucyfer_settings.FIELD_NAME_FOR_DEFAULT_SEARCH: self.field_class_for_default_searching})
-
-            missed_fields = [field for field in missed_fields if field not in result]
-            if missed_fields:
-                warnings.warn(f"There is some undefined fields in {self.searchset_class}: {', '.join(missed_fields)}")
-
-            setattr(self, "field_source_to_field_result", result)
-        return self.field_source_to_field_result
+        return self.state.field_source_to_field
+
+    @property
+    def parsed_query_cache(self) -> ParsedQueryCache:
+        return self.state.parsed_query_cache
+
+    def refresh(self, use_cache: bool = True) -> bool:
+        """
+        Loads raw mapping and replaces state if mapping is changed. Returns True if state was replaced
+
+        :param use_cache: mapping may be taken from django cache (if searchset caches it), otherwise it is fetched
+        """
+        with self._build_lock:
+            raw_mapping = self.searchset_class._load_raw_mapping(use_cache=use_cache)
+            state = self._state
+
+            if state is not None and state.raw_mapping == raw_mapping:
+                self._expires_at = self._get_expires_at()
+                return False
+
+            self._set_state(self._build_state(raw_mapping=raw_mapping, version=state.version + 1 if state else 1))
+            return True
+
+    def reset(self):
+        """
+        Drops built state, so it will be rebuilt on next usage
+        """
+        with self._build_lock:
+            self._state = None
+            self._expires_at = None
+            self._default_field = None
+
+    def _set_state(self, state: SearchSetStorageState) -> None:
+        self._expires_at = self._get_expires_at()
+        self._state = state
+
+    def _get_expires_at(self) -> Optional[float]:
+        cache_time = self.searchset_class.get_mapping_cache_time()
+        return time.monotonic() + cache_time if cache_time else None
+
+    def _start_background_refresh(self) -> None:
+        with self._refresh_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        threading.Thread(target=self._background_refresh, name="lucyfer-mapping-refresh", daemon=True).start()
+
+    def _background_refresh(self) -> None:
+        try:
+            self.refresh()
+        except Exception as e:
+            # previous state is used until next try
+            self._expires_at = self._get_expires_at()
+            warnings.warn(f"Mapping refresh failed for {self.searchset_class}: {e!r}")
+        finally:
+            with self._refresh_lock:
+                self._refreshing = False
+
+    def _build_state(self, raw_mapping: Dict[str, FieldType], version: int) -> SearchSetStorageState:
+        field_source_to_field = self._build_field_source_to_field(raw_mapping=raw_mapping)
+
+        return SearchSetStorageState(
+            version=version,
+            # raw mapping of shared table is used, so equal mappings are kept once
+            raw_mapping=field_source_to_field.mapping_field_table.raw_mapping,
+            field_source_to_field=field_source_to_field,
+        )
+
+    def _build_field_source_to_field(self, raw_mapping: Dict[str, FieldType]) -> FieldTable:
+        # then process defined fields and its sources
+        source_to_field_from_user_fields = self.field_name_to_field.copy()
+        source_to_field_from_user_fields_sources = {}
+
+        # `missed_fields` uses for process possibly missed sources from case when defined
+        # some field in searchset like this one:
+        # x = SearchField(sources=["y"], use_field_class_for_sources=False)
+        # and when we have not found "y" in raw mapping and we have no idea what field class we need to use.
+        # it will be warning in the end of function.
+        missed_fields = []
+
+        for name, field in self.field_name_to_field.items():
+            if not field.sources:
+                continue
+
+            if not field.use_field_class_for_sources:
+                # we extend missed fields by all fields because after cycle we will filter it anyway
+                missed_fields.extend([source for source in field.sources])
+                continue
+
+            source_to_field_from_user_fields_sources.update(
+                {
+                    source: field.copy_for_source(source=source,
+                                                  show_suggestions=source not in self.fields_to_exclude_from_suggestions)
+                    for source in field.sources
+                }
+            )
+
+        # now result
+        # we create an empty dict and update it by our dicts with order from low to high priority.
+        # it means if user have wrote field "A" in searchset and we have found field "A" in raw mapping
+        # priority of searchset is higher, so in result we will see users field, not field from raw mapping.
+        # fields from raw mapping have the lowest priority, they are created by field table on first usage
+        result = {}
+        result.update(source_to_field_from_user_fields_sources)
+        result.update(source_to_field_from_user_fields)
+
+        # and check default searching field if presented
+        if self.field_class_for_default_searching:
+            result.update({lucyfer_settings.FIELD_NAME_FOR_DEFAULT_SEARCH: self.field_class_for_default_searching})
+
+        missed_fields = [field for field in missed_fields if field not in result and field not in raw_mapping]
+        if missed_fields:
+            warnings.warn(f"There is some undefined fields in {self.searchset_class}: {', '.join(missed_fields)}")
+
+        mapping_field_table = get_mapping_field_table(
+            raw_mapping=raw_mapping,
+            field_type_to_field_class=self.searchset_class._field_type_to_field_class,
+            default_field_class=self.searchset_class._default_field,
+            fields_to_exclude_from_suggestions=self.fields_to_exclude_from_suggestions,
+        )
+
+        return FieldTable(fields=result, mapping_field_table=mapping_field_table)
+
+
+def drop_default_fields(*args, **kwargs):
+    """
+    Default fields take some options from settings on creation, so they are recreated when settings are changed
+    """
+    if kwargs.get('setting', LUCYFER_SETTINGS_NAME) != LUCYFER_SETTINGS_NAME:
+        return
+
+    for storage in list(SearchSetStorage._instances):
+        storage._default_field = None
+
+
+setting_changed.connect(drop_default_fields)
@@ -0,0 +1,128 @@
+import time
+import warnings
+from contextlib import contextmanager
+from typing import Optional
+
+from django.db import connections, transaction, OperationalError
+from django.db.models import QuerySet
+
+from lucyfer.utils import LuceneSearchTimeoutException
+
+
+# sqlite calls progress handler every N virtual machine instructions
+SQLITE_PROGRESS_HANDLER_STEPS = 1000
+
+# postgres error code for statement cancelled by statement_timeout
+POSTGRESQL_QUERY_CANCELED = "57014"
+
+
+@contextmanager
+def statement_timeout(connection, timeout: Optional[float]):
+    """
+    Limits execution time of queries in context by `timeout` seconds.
+    Postgres and sqlite are supported, queries to other databases are executed without timeout
+    """
+    if not timeout:
+        yield
+    elif connection.vendor == "postgresql":
+        with _postgresql_statement_timeout(connection, timeout):
+            yield
+    elif connection.vendor == "sqlite":
+        with _sqlite_statement_timeout(connection, timeout):
+            yield
+    else:
+        yield
+
+
+@contextmanager
+def _postgresql_statement_timeout(connection, timeout: float):
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT current_setting('statement_timeout'), "
+                           "set_config('statement_timeout', %s, true)", [str(int(timeout * 1000))])
+            previous_timeout, _ = cursor.fetchone()
+
+        try:
+            yield
+        except OperationalError as e:
+            if getattr(e.__cause__, "pgcode", None) == POSTGRESQL_QUERY_CANCELED:
+                raise LuceneSearchTimeoutException(timeout=timeout) from e
+            raise
+
+        # timeout is set locally, so it's restored here only for outer transactions
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT set_config('statement_timeout', %s, true)", [previous_timeout])
+
+
+@contextmanager
+def _sqlite_statement_timeout(connection, timeout: float):
+    connection.ensure_connection()
+    deadline = time.monotonic() + timeout
+
+    connection.connection.set_progress_handler(lambda: time.monotonic() > deadline, SQLITE_PROGRESS_HANDLER_STEPS)
+    try:
+        yield
+    except OperationalError as e:
+        if "interrupted" in str(e):
+            raise LuceneSearchTimeoutException(timeout=timeout) from e
+        raise
+    finally:
+        connection.connection.set_progress_handler(None, 0)
+
+
+class StatementTimeoutQuerySetMixin:
+    """
+    Executes queries of queryset and all its clones with statement timeout set by `with_statement_timeout`.
+    Add it to queryset class of model (for ex. `objects = StatementTimeoutQuerySet.as_manager()`) to enable timeouts.
+    `iterator()` is executed without timeout, its cursor is kept open while results are consumed
+    """
+    statement_timeout: Optional[float] = None
+
+    def with_statement_timeout(self, timeout: Optional[float]):
+        clone = self._chain()
+        clone.statement_timeout = timeout
+        return clone
+
+    def _statement_timeout(self):
+        return statement_timeout(connections[self.db], self.statement_timeout)
+
+    def _clone(self):
+        clone = super()._clone()
+        clone.statement_timeout = self.statement_timeout
+        return clone
+
+    def _fetch_all(self):
+        with self._statement_timeout():
+            super()._fetch_all()
+
+    def count(self):
+        with self._statement_timeout():
+            return super().count()
+
+    def exists(self):
+        with self._statement_timeout():
+            return super().exists()
+
+    def aggregate(self, *args, **kwargs):
+        with self._statement_timeout():
+            return super().aggregate(*args, **kwargs)
+
+
+class StatementTimeoutQuerySet(StatementTimeoutQuerySetMixin, QuerySet):
+    pass
+
+
+def with_statement_timeout(queryset, timeout: Optional[float]):
+    """
+    Returns copy of queryset which executes its queries with statement timeout.
+    Querysets without StatementTimeoutQuerySetMixin are returned as is
+    """
+    if not timeout or not isinstance(queryset, QuerySet):
+        return queryset
+
+    if not isinstance(queryset, StatementTimeoutQuerySetMixin):
+        warnings.warn(f"Queries of {queryset.model} are executed without timeout, "
+                      f"use StatementTimeoutQuerySetMixin in its queryset class")
+        return queryset
+
+    return queryset.with_statement_timeout(timeout)
@@ -1,4 +1,6 @@
+from collections.abc import Mapping
 from enum import Enum, unique
+from typing import Any, Callable
 
 
 @unique
@@ -9,3 +11,24 @@ class FieldType(Enum):
     FLOAT = 4
     NULL_BOOLEAN = 5
     TIMESTAMP = 6
+
+
+def get_value_getter(source: str) -> Callable[[Any], Any]:
+    """
+    Returns function which gets value by dotted source path from mapping or object. Missed values are None
+    """
+    parts = source.split(".")
+
+    def get_value(record):
+        for part in parts:
+            if record is None:
+                return None
+
+            if isinstance(record, Mapping):
+                record = record.get(part)
+            else:
+                record = getattr(record, part, None)
+
+        return record
+
+    return get_value
@@ -15,6 +15,18 @@ DEFAULTS = {
     "ALLOW_EMPTY_SUGGESTIONS": False,
     "EMPTY_SUGGESTIONS_VALUES": {None, },
     "FIELD_NAME_FOR_DEFAULT_SEARCH": "default",
+    "OPTIMIZE_QUERY_TREE": True,
+    "PARSED_QUERY_CACHE_SIZE": 1024,  # per searchset, 0 disables the cache
+    "MAX_TERMS_COUNT": 65536,  # elasticsearch index.max_terms_count
+    "TERMS_LOOKUP_MIN_VALUES_COUNT": None,  # values count to use terms lookup, None disables it
+    "QUERY_COST_LIMIT": None,  # max estimated query cost, None disables the limit
+    "QUERY_TIMEOUT": None,  # seconds, None disables the timeout
+    "QUERY_TERMINATE_AFTER": None,  # max documents count to collect per elasticsearch shard
+    "MAPPING_CACHE_TIME": None,  # seconds to keep elasticsearch mapping in django cache, None disables refresh
+    "MAPPING_SNAPSHOT_PATH": None,  # json file with dumped mappings used instead of loading them on startup
+    "MAPPING_SNAPSHOT_MAX_AGE": None,  # seconds, older snapshot is ignored, None disables the check
+    "WARM_UP_MAX_WORKERS": None,  # threads count for storages warm up
+    "DATE_MATH_ROUNDING": None,  # date math unit to round `now` of elasticsearch date fields to, for ex. "m"
 }
 
 
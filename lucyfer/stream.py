@@ -0,0 +1,253 @@
+"""
+Applies lucene expression of python searchset to big JSONL or CSV inputs and writes matched lines as is.
+
+    python -m lucyfer.stream --searchset path.to.EventSearchSet "host: web* AND severity > 3" events.jsonl
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+__all__ = [
+    'JSONL',
+    'CSV',
+    'filter_file',
+    'filter_lines',
+    'filter_csv_records',
+    'read_csv_records',
+    'read_lines',
+]
+
+
+JSONL = "jsonl"
+CSV = "csv"
+
+# read buffer size
+CHUNK_SIZE = 1024 * 1024
+
+# input is split to ranges of that size in process pool mode, so each task result is small
+RANGE_SIZE = 64 * 1024 * 1024
+
+
+def read_lines(fp: BinaryIO, start: int = 0, end: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Yields lines which start in [start, end) byte range of file.
+    File is read from current position if start is 0, so it may be not seekable
+    """
+    position = start
+
+    if start > 0:
+        # line started in previous range belongs to it
+        fp.seek(start - 1)
+        position = start - 1 + len(fp.readline())
+
+    while end is None or position < end:
+        line = fp.readline()
+        if not line:
+            break
+
+        position += len(line)
+        yield line
+
+
+def get_decoder(input_format: str, fieldnames: Optional[List[str]] = None,
+                encoding: str = "utf-8") -> Callable[[bytes], Optional[Any]]:
+    """
+    Returns function which decodes line to record or returns None for empty and invalid lines
+    """
+    if input_format == JSONL:
+        def decode(line):
+            try:
+                return json.loads(line)
+            except ValueError:
+                return None
+
+        return decode
+
+    if input_format == CSV:
+        def decode(line):
+            try:
+                values = next(csv.reader((line.decode(encoding),)), None)
+            except (ValueError, csv.Error):  # UnicodeDecodeError is ValueError
+                return None
+
+            if not values:
+                return None
+            return dict(zip(fieldnames, values))
+
+        return decode
+
+    raise ValueError(f"Unknown input format {input_format}")
+
+
+def filter_lines(lines: Iterable[bytes], predicate: Callable[[Any], bool],
+                 decode: Callable[[bytes], Optional[Any]]) -> Iterator[bytes]:
+    """
+    Yields lines which records match predicate
+    """
+    for line in lines:
+        record = decode(line)
+        if record is not None and predicate(record):
+            yield line
+
+
+def read_csv_records(lines: Iterable[bytes], encoding: str = "utf-8") -> Iterator[Tuple[bytes, Optional[List[str]]]]:
+    """
+    Yields raw CSV records with their values. Record takes several lines if its quoted values contain line breaks.
+    Values are None for records which can't be decoded
+    """
+    consumed: List[bytes] = []
+    is_invalid = False
+
+    def decode_lines():
+        nonlocal is_invalid
+
+        for line in lines:
+            consumed.append(line)
+            try:
+                yield line.decode(encoding)
+            except UnicodeDecodeError:
+                # reader still has to see line breaks and quotes of the line to find the end of record
+                is_invalid = True
+                yield line.decode(encoding, errors="replace")
+
+    reader = csv.reader(decode_lines())
+
+    while True:
+        try:
+            values = next(reader)
+        except StopIteration:
+            break
+        except csv.Error:
+            values = None
+
+        yield b"".join(consumed), None if is_invalid else values
+
+        consumed.clear()
+        is_invalid = False
+
+
+def filter_csv_records(lines: Iterable[bytes], predicate: Callable[[Any], bool], fieldnames: List[str],
+                       encoding: str = "utf-8") -> Iterator[bytes]:
+    """
+    Yields raw CSV records which match predicate
+    """
+    for raw_record, values in read_csv_records(lines, encoding=encoding):
+        if values and predicate(dict(zip(fieldnames, values))):
+            yield raw_record
+
+
+def filter_file(fp: BinaryIO,
+                searchset_class,
+                search_terms: str,
+                input_format: str = JSONL,
+                processes: Optional[int] = None,
+                encoding: str = "utf-8",
+                range_size: int = RANGE_SIZE) -> Iterator[bytes]:
+    """
+    Yields matched lines of binary file. CSV header is yielded first, CSV records with line breaks in quoted values
+    are yielded whole. Lines are read one by one, so memory usage doesn't depend on input size.
+
+    :param processes: split file by byte ranges and filter them in process pool. File has to be seekable and
+        CSV must not contain line breaks in quoted values: ranges are split by lines
+    """
+    # compile it before reading to raise errors for invalid expressions immediately
+    predicate = searchset_class.parse(raw_expression=search_terms)
+
+    fieldnames = None
+    if input_format == CSV:
+        header = fp.readline()
+        if not header:
+            return
+        fieldnames = next(csv.reader((header.decode(encoding),)))
+        yield header
+
+    if (not processes or processes < 2) and input_format == CSV:
+        yield from filter_csv_records(lines=read_lines(fp), predicate=predicate, fieldnames=fieldnames,
+                                      encoding=encoding)
+        return
+
+    if not processes or processes < 2:
+        yield from filter_lines(lines=read_lines(fp), predicate=predicate,
+                                decode=get_decoder(input_format, fieldnames=fieldnames, encoding=encoding))
+        return
+
+    ranges = get_ranges(start=fp.tell(), end=os.fstat(fp.fileno()).st_size, range_size=range_size)
+    task = (fp.name, searchset_class, search_terms, input_format, fieldnames, encoding)
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=_configure_settings) as executor:
+        # results are yielded in input order, and only few ranges are processed at once to keep memory bounded
+        futures = deque()
+
+        for range_ in ranges:
+            futures.append(executor.submit(_filter_range, task, range_))
+
+            if len(futures) >= processes * 2:
+                yield from futures.popleft().result()
+
+        while futures:
+            yield from futures.popleft().result()
+
+
+def get_ranges(start: int, end: int, range_size: int = RANGE_SIZE) -> List[Tuple[int, int]]:
+    return [(range_start, min(range_start + range_size, end)) for range_start in range(start, end, range_size)]
+
+
+def _filter_range(task, range_: Tuple[int, int]) -> List[bytes]:
+    path, searchset_class, search_terms, input_format, fieldnames, encoding = task
+
+    predicate = searchset_class.parse(raw_expression=search_terms)
+    decode = get_decoder(input_format, fieldnames=fieldnames, encoding=encoding)
+
+    with open(path, "rb", buffering=CHUNK_SIZE) as fp:
+        return list(filter_lines(lines=read_lines(fp, start=range_[0], end=range_[1]),
+                                 predicate=predicate, decode=decode))
+
+
+def _configure_settings():
+    if not settings.configured and "DJANGO_SETTINGS_MODULE" not in os.environ:
+        settings.configure()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Filter JSONL or CSV input by lucene expression")
+    parser.add_argument("search_terms", help="lucene expression")
+    parser.add_argument("path", nargs="?", default="-", help="input file, stdin by default")
+    parser.add_argument("--searchset", required=True, help="dotted path to python searchset class")
+    parser.add_argument("--format", choices=(JSONL, CSV), default=JSONL, dest="input_format")
+    parser.add_argument("--processes", type=int, default=None, help="filter file in process pool")
+    parser.add_argument("--encoding", default="utf-8")
+    args = parser.parse_args(argv)
+
+    _configure_settings()
+    searchset_class = import_string(args.searchset)
+
+    if args.path == "-":
+        if args.processes:
+            parser.error("process pool mode requires a file")
+        fp = sys.stdin.buffer
+    else:
+        fp = open(args.path, "rb", buffering=CHUNK_SIZE)
+
+    output = sys.stdout.buffer
+
+    try:
+        for line in filter_file(fp, searchset_class=searchset_class, search_terms=args.search_terms,
+                                input_format=args.input_format, processes=args.processes, encoding=args.encoding):
+            output.write(line)
+    finally:
+        output.flush()
+        if fp is not sys.stdin.buffer:
+            fp.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
+from rest_framework.exceptions import APIException
+
+
 class LuceneSearchException(Exception):
     pass
 
@@ -8,3 +11,29 @@ class LuceneSearchCastValueException(LuceneSearchException):
 
 class LuceneSearchInvalidValueException(LuceneSearchException):
     pass
+
+
+class LuceneSearchQueryTooExpensiveException(LuceneSearchException):
+    def __init__(self, cost, limit):
+        super().__init__(f"Query cost {cost.score} exceeds the limit {limit}")
+        self.cost = cost
+        self.limit = limit
+
+
+class LuceneSearchTimeoutException(LuceneSearchException, APIException):
+    """
+    Django queries are executed lazily, so it's raised after filtering, for ex. while pagination.
+    It's an APIException, so DRF views respond with 503 instead of server error
+    """
+    status_code = 503
+    default_code = "search_timeout"
+
+    def __init__(self, timeout):
+        super().__init__(f"Query execution exceeds the timeout {timeout}s")
+        self.timeout = timeout
+
+
+class LuceneSearchSavedSearchCycleException(LuceneSearchException):
+    def __init__(self, ids):
+        super().__init__(f"Saved searches reference each other: {' -> '.join(map(str, ids))}")
+        self.ids = ids
@@ -37,7 +37,8 @@ class LucyferSetup:
             description="Lucene search for DRF and elasticsearch-dsl",
             tests_require=self._get_requirements(name="test"),
             install_requires=self._get_requirements(name="base"),
-            extras_require=dict(full=self._get_requirements(name="extra")),
+            extras_require=dict(full=self._get_requirements(name="extra"),
+                                pandas=self._get_requirements(name="pandas")),
             name=self.lib,
             packages=self._get_package_dir(self.lib),
             version=self.version
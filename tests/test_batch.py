@@ -0,0 +1,77 @@
+from unittest import TestCase, mock
+
+from django.db.models import Q
+from django.test import override_settings
+from lucyparser.tree import ExpressionNode
+
+from lucyfer.parser.batch import encode_tree, decode_tree
+from lucyfer.parser.optimizer import optimize_tree
+from lucyfer.searchset import DjangoSearchSet
+from lucyfer.searchset.fields import DjangoCharField, DjangoIntegerField
+from lucyfer.utils import LuceneSearchException, LuceneSearchQueryTooExpensiveException
+from tests.utils import DjangoModel
+
+
+class BatchSearchSet(DjangoSearchSet):
+    char_field = DjangoCharField()
+    integer_field = DjangoIntegerField()
+
+    class Meta:
+        model = DjangoModel
+
+
+class TestCompileMany(TestCase):
+    def setUp(self):
+        BatchSearchSet.storage.reset()
+
+    def test_compile_many(self):
+        results = BatchSearchSet.compile_many(["integer_field: 1", "integer_field: (", "char_field: x"])
+
+        self.assertEqual([result.ok for result in results], [True, False, True])
+        self.assertEqual(results[0].query, Q(integer_field__exact=1))
+        self.assertEqual(results[0].cost, BatchSearchSet.get_query_cost("integer_field: 1"))
+        self.assertIsInstance(results[1].error, LuceneSearchException)
+        self.assertEqual(results[2].query, Q(char_field__icontains="x"))
+
+    def test_parse_many(self):
+        self.assertEqual(BatchSearchSet.parse_many(["integer_field: 1", "integer_field: ("]),
+                         [Q(integer_field__exact=1), None])
+
+    def test_same_expressions_are_compiled_once(self):
+        with mock.patch.object(BatchSearchSet, "_parse_tree", wraps=BatchSearchSet._parse_tree) as parse_tree:
+            results = BatchSearchSet.compile_many(["integer_field: 1", "char_field: x", "integer_field: 1"])
+            BatchSearchSet.compile_many(["integer_field: 1", "char_field: x"])
+
+        self.assertEqual(parse_tree.call_count, 2)
+        self.assertIs(results[0], results[2])
+
+    @override_settings(LUCYFER_SETTINGS={"QUERY_COST_LIMIT": 10})
+    def test_too_expensive_query(self):
+        results = BatchSearchSet.compile_many(["integer_field: 1", "char_field ~ x"])
+
+        self.assertTrue(results[0].ok)
+        self.assertIsInstance(results[1].error, LuceneSearchQueryTooExpensiveException)
+
+    def test_process_pool(self):
+        raw_expressions = [f"integer_field: {i} OR char_field: x{i}" for i in range(100)] + ["integer_field: ("]
+
+        self.assertEqual(BatchSearchSet.parse_many(raw_expressions, max_workers=2),
+                         [BatchSearchSet.parse(raw_expression) for raw_expression in raw_expressions[:-1]] + [None])
+
+    def test_process_pool_with_long_expression(self):
+        long_expression = " OR ".join(f"char_field: v{i}" for i in range(3000))
+        raw_expressions = [long_expression, "integer_field: 1", "integer_field: ("]
+
+        results = BatchSearchSet.compile_many(raw_expressions, max_workers=2)
+
+        self.assertEqual([result.ok for result in results], [True, True, False])
+        self.assertEqual(results[0].query, BatchSearchSet.parse(long_expression))
+        self.assertEqual(results[1].query, Q(integer_field__exact=1))
+
+    def test_encode_tree(self):
+        tree = BatchSearchSet._get_tree_from_raw_expression("a: 1 OR (b: 2 AND NOT c: 3) OR d: 4")
+        encoded_tree = encode_tree(tree)
+
+        self.assertTrue(all(isinstance(item, (ExpressionNode, tuple)) for item in encoded_tree))
+        self.assertEqual(optimize_tree(decode_tree(encoded_tree), is_match_all=lambda condition: False),
+                         optimize_tree(tree, is_match_all=lambda condition: False))
@@ -0,0 +1,104 @@
+from unittest import TestCase, mock
+
+from django.db.models import Q
+from django.test import override_settings
+
+from lucyfer.parser.cache import ParsedQueryCache
+from lucyfer.searchset import DjangoSearchSet
+from lucyfer.searchset.fields import DjangoCharField, DjangoIntegerField
+from tests.utils import DjangoModel
+
+
+class TestParsedQueryCache(TestCase):
+    def test_lru_eviction(self):
+        cache = ParsedQueryCache(maxsize=2)
+
+        cache.set("a", Q(a=1))
+        cache.set("b", Q(b=1))
+        cache.get("a")
+        cache.set("c", Q(c=1))
+
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertIn("c", cache)
+
+        info = cache.info()
+        self.assertEqual((info.hits, info.misses, info.evictions, info.maxsize, info.currsize), (1, 0, 1, 2, 2))
+
+    def test_peek_is_not_counted(self):
+        cache = ParsedQueryCache(maxsize=2)
+
+        cache.set("a", Q(a=1))
+        cache.set("b", Q(b=1))
+        self.assertEqual(cache.peek("a"), Q(a=1))
+        self.assertIsNone(cache.peek("c"))
+        cache.set("c", Q(c=1))
+
+        # peek doesn't make "a" recently used
+        self.assertNotIn("a", cache)
+
+        info = cache.info()
+        self.assertEqual((info.hits, info.misses), (0, 0))
+
+    def test_disabled_cache(self):
+        cache = ParsedQueryCache(maxsize=0)
+        cache.set("a", Q(a=1))
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.info().misses, 1)
+
+
+class TestSearchSetParsedQueryCache(TestCase):
+    def setUp(self):
+        class SearchSet(DjangoSearchSet):
+            char_field = DjangoCharField()
+            integer_field = DjangoIntegerField()
+
+            class Meta:
+                model = DjangoModel
+
+        self.searchset_class = SearchSet
+
+    def test_parse_uses_cache(self):
+        expression = "char_field: value AND integer_field: 1"
+
+        query = self.searchset_class.parse(expression)
+
+        with mock.patch.object(self.searchset_class, "_parse_tree") as parse_tree:
+            self.assertIs(self.searchset_class.parse(expression), query)
+            parse_tree.assert_not_called()
+
+        info = self.searchset_class.get_parsed_query_cache().info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (1, 1, 1))
+
+    def test_query_cost_is_not_counted(self):
+        expression = "char_field: value"
+        self.searchset_class.parse(expression)
+
+        self.searchset_class.get_query_cost(expression)
+
+        info = self.searchset_class.get_parsed_query_cache().info()
+        self.assertEqual((info.hits, info.misses), (0, 1))
+
+    def test_cache_is_kept_per_searchset(self):
+        class AnotherSearchSet(self.searchset_class):
+            class Meta:
+                model = DjangoModel
+
+        self.searchset_class.parse("char_field: value")
+
+        self.assertIsNot(self.searchset_class.get_parsed_query_cache(), AnotherSearchSet.get_parsed_query_cache())
+        self.assertEqual(len(AnotherSearchSet.get_parsed_query_cache()), 0)
+
+    def test_cache_is_cleared_on_storage_reset(self):
+        self.searchset_class.parse("char_field: value")
+        self.searchset_class.storage.reset()
+
+        self.assertEqual(len(self.searchset_class.get_parsed_query_cache()), 0)
+
+    def test_cache_is_cleared_on_settings_change(self):
+        self.searchset_class.parse("char_field: value")
+
+        with override_settings(LUCYFER_SETTINGS={"PARSED_QUERY_CACHE_SIZE": 10}):
+            self.assertEqual(len(self.searchset_class.get_parsed_query_cache()), 0)
+            self.assertEqual(self.searchset_class.get_parsed_query_cache().maxsize, 10)
@@ -0,0 +1,161 @@
+from types import SimpleNamespace
+from unittest import TestCase, mock
+
+from django.db.models import Q
+from django.test import override_settings
+from parameterized import parameterized
+from rest_framework.exceptions import ValidationError
+
+from lucyfer.backend import LuceneSearchFilter, DjangoLuceneSearchFilterMixin
+from lucyfer.parser.cost import QueryCostModel, LookupKind
+from lucyfer.searchset import DjangoSearchSet
+from lucyfer.searchset.fields import DjangoCharField, DjangoIntegerField
+from lucyfer.utils import LuceneSearchQueryTooExpensiveException
+from tests.utils import DjangoModel
+
+
+class SearchSet(DjangoSearchSet):
+    char_field = DjangoCharField()
+    integer_field = DjangoIntegerField()
+    multi_source_field = DjangoCharField(sources=["first", "second", "third"])
+
+    class Meta:
+        model = DjangoModel
+
+
+class TestQueryCost(TestCase):
+    model = QueryCostModel()
+
+    def setUp(self):
+        SearchSet.storage.reset()
+
+    def condition_cost(self, lookup_kind, sources_count=1):
+        return self.model.leaf_cost + sources_count * (self.model.source_cost +
+                                                       self.model.get_lookup_kind_cost(lookup_kind))
+
+    @parameterized.expand((
+            ("integer_field: 1", LookupKind.TERM),
+            ("integer_field > 1", LookupKind.RANGE),
+            ("char_field: value", LookupKind.LEADING_WILDCARD),
+            ("char_field: value*", LookupKind.WILDCARD),
+            ("char_field: *value", LookupKind.LEADING_WILDCARD),
+            ("char_field ~ value", LookupKind.REGEXP),
+    ))
+    def test_condition_cost(self, raw_expression, lookup_kind):
+        cost = SearchSet.get_query_cost(raw_expression)
+        self.assertEqual(cost.score, self.condition_cost(lookup_kind))
+        self.assertEqual((cost.leaves, cost.sources), (1, 1))
+
+    def test_sources_count(self):
+        cost = SearchSet.get_query_cost("multi_source_field ~ value")
+        self.assertEqual(cost.score, self.condition_cost(LookupKind.REGEXP, sources_count=3))
+        self.assertEqual((cost.leaves, cost.sources, cost.regexps), (1, 3, 1))
+
+    def test_expression_cost(self):
+        cost = SearchSet.get_query_cost("integer_field: 1 AND (char_field: *value OR NOT char_field ~ value)")
+        self.assertEqual(cost.score, sum(map(self.condition_cost, (
+            LookupKind.TERM, LookupKind.LEADING_WILDCARD, LookupKind.REGEXP,
+        ))))
+        self.assertEqual((cost.leaves, cost.leading_wildcards, cost.regexps), (3, 1, 1))
+
+    def test_cost_is_estimated_after_optimization(self):
+        cost = SearchSet.get_query_cost("integer_field: 1 OR integer_field: 1 OR (char_field: * AND integer_field: 1)")
+        self.assertEqual(cost.leaves, 1)
+
+    @override_settings(LUCYFER_SETTINGS={"QUERY_COST_LIMIT": 10})
+    def test_limit_from_settings(self):
+        self.assertEqual(SearchSet.parse("integer_field: 1"), Q(integer_field__exact=1))
+
+        with self.assertRaises(LuceneSearchQueryTooExpensiveException) as e:
+            SearchSet.parse("char_field ~ value")
+
+        self.assertEqual(e.exception.limit, 10)
+        self.assertEqual(e.exception.cost.regexps, 1)
+
+    def test_limit_from_meta(self):
+        class LimitedSearchSet(SearchSet):
+            class Meta:
+                model = DjangoModel
+                query_cost_limit = 10
+
+        self.assertEqual(SearchSet.parse("char_field ~ value"), Q(char_field__regex="value"))
+
+        with self.assertRaises(LuceneSearchQueryTooExpensiveException):
+            LimitedSearchSet.parse("char_field ~ value")
+
+    def test_limit_is_checked_for_cached_queries(self):
+        SearchSet.parse("char_field ~ value")
+
+        with override_settings(LUCYFER_SETTINGS={"QUERY_COST_LIMIT": 10}):
+            with self.assertRaises(LuceneSearchQueryTooExpensiveException):
+                SearchSet.parse("char_field ~ value")
+
+
+class TestTooExpensiveQueryFilter(TestCase):
+    class Filter(DjangoLuceneSearchFilterMixin, LuceneSearchFilter):
+        pass
+
+    @override_settings(LUCYFER_SETTINGS={"QUERY_COST_LIMIT": 10})
+    def test_validation_error(self):
+        request = SimpleNamespace(query_params={"search": "char_field ~ value"})
+        view = SimpleNamespace(search_class=SearchSet)
+
+        with self.assertRaises(ValidationError) as e:
+            self.Filter().filter_queryset(request=request, queryset=DjangoModel.objects, view=view)
+
+        self.assertIn("search", e.exception.detail)
+
+
+class TestQueryCostFilter(TestCase):
+    def setUp(self):
+        SearchSet.storage.reset()
+
+    def test_filter_with_cost(self):
+        queryset = mock.Mock()
+
+        filtered_queryset, cost = SearchSet.filter_with_cost(queryset, "char_field ~ value", timeout=0)
+
+        queryset.filter.assert_called_once_with(SearchSet.parse("char_field ~ value"))
+        self.assertIs(filtered_queryset, queryset.filter.return_value)
+        self.assertEqual(cost, SearchSet.get_query_cost("char_field ~ value"))
+
+    def test_cost_is_passed_to_backend(self):
+        class Filter(DjangoLuceneSearchFilterMixin, LuceneSearchFilter):
+            on_query_cost = mock.Mock()
+
+        request = SimpleNamespace(query_params={"search": "char_field ~ value"})
+        view = SimpleNamespace(search_class=SearchSet)
+
+        Filter().filter_queryset(request=request, queryset=mock.MagicMock(), view=view)
+
+        Filter.on_query_cost.assert_called_once_with(SearchSet.get_query_cost("char_field ~ value"), view)
+
+    def test_overridden_filter_is_used(self):
+        class FilteringSearchSet(SearchSet):
+            @classmethod
+            def filter(cls, queryset, search_terms, raise_exception=False, timeout=None):
+                return super().filter(queryset, search_terms, raise_exception=raise_exception,
+                                      timeout=timeout).filter(is_visible=True)
+
+            class Meta:
+                model = DjangoModel
+
+        queryset = mock.Mock()
+        view = SimpleNamespace(search_class=FilteringSearchSet)
+
+        filtered_queryset = TestTooExpensiveQueryFilter.Filter().lucene_filter_queyset(
+            searchset_class=FilteringSearchSet, search_terms="char_field: value", queryset=queryset, view=view,
+        )
+
+        self.assertIs(filtered_queryset, queryset.filter.return_value.filter.return_value)
+        queryset.filter.return_value.filter.assert_called_once_with(is_visible=True)
+
+    def test_cost_is_logged_by_default(self):
+        request = SimpleNamespace(query_params={"search": "char_field ~ value"})
+        view = SimpleNamespace(search_class=SearchSet)
+
+        with self.assertLogs("lucyfer", level="DEBUG") as logs:
+            TestTooExpensiveQueryFilter.Filter().filter_queryset(request=request, queryset=mock.MagicMock(),
+                                                                 view=view)
+
+        self.assertIn("cost", logs.output[0])
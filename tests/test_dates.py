@@ -0,0 +1,52 @@
+from datetime import datetime, timezone
+from unittest import TestCase
+
+from parameterized import parameterized
+
+from lucyfer.searchset.fields.dates import DateValue, parse_date, has_now
+from lucyfer.utils import LuceneSearchCastValueException
+
+
+NOW = datetime(2021, 3, 31, 15, 30, 10, 500, tzinfo=timezone.utc)
+
+
+class TestParseDate(TestCase):
+    @parameterized.expand((
+            ("2020", DateValue(start=datetime(2020, 1, 1), unit="y")),
+            ("2020-02", DateValue(start=datetime(2020, 2, 1), unit="M")),
+            ("2020-02-03", DateValue(start=datetime(2020, 2, 3), unit="d")),
+            ("2020-02-03T10:20:30", DateValue(start=datetime(2020, 2, 3, 10, 20, 30))),
+            ("2020-02-03T10:20:30Z", DateValue(start=datetime(2020, 2, 3, 10, 20, 30, tzinfo=timezone.utc))),
+            ("1600000000", DateValue(start=datetime(2020, 9, 13, 12, 26, 40, tzinfo=timezone.utc))),
+            ("1600000000000", DateValue(start=datetime(2020, 9, 13, 12, 26, 40, tzinfo=timezone.utc))),
+    ))
+    def test_absolute_dates(self, value, expected_date):
+        self.assertEqual(parse_date(value, now=NOW), expected_date)
+
+    @parameterized.expand((
+            ("now", DateValue(start=NOW)),
+            ("now-1h", DateValue(start=datetime(2021, 3, 31, 14, 30, 10, 500, tzinfo=timezone.utc))),
+            ("now-1M", DateValue(start=datetime(2021, 2, 28, 15, 30, 10, 500, tzinfo=timezone.utc))),
+            ("now+1y-2d", DateValue(start=datetime(2022, 3, 29, 15, 30, 10, 500, tzinfo=timezone.utc))),
+            ("now/d", DateValue(start=datetime(2021, 3, 31, tzinfo=timezone.utc), unit="d")),
+            ("now-1d/d", DateValue(start=datetime(2021, 3, 30, tzinfo=timezone.utc), unit="d")),
+            ("now/w", DateValue(start=datetime(2021, 3, 29, tzinfo=timezone.utc), unit="w")),
+            ("2020-01-31||+1M", DateValue(start=datetime(2020, 2, 29), unit="d")),
+            ("2020-01-31T10:00:00||/M", DateValue(start=datetime(2020, 1, 1), unit="M")),
+    ))
+    def test_date_math(self, value, expected_date):
+        self.assertEqual(parse_date(value, now=NOW), expected_date)
+
+    @parameterized.expand((("abc",), ("2020-13-01",), ("now+x",), ("now+1q",), ("2020-01-01||/q",), ("",)))
+    def test_invalid_values(self, value):
+        with self.assertRaises(LuceneSearchCastValueException):
+            parse_date(value, now=NOW)
+
+    def test_end_of_period(self):
+        self.assertEqual(parse_date("2020-12", now=NOW).end, datetime(2021, 1, 1))
+        self.assertEqual(parse_date("2020-12-01T10:00:00", now=NOW).end, datetime(2020, 12, 1, 10))
+
+    def test_has_now(self):
+        self.assertTrue(has_now("now-1d"))
+        self.assertTrue(has_now("NOW"))
+        self.assertFalse(has_now("2020-01-01||+1d"))
@@ -1,8 +1,14 @@
+from datetime import datetime, timezone
+from unittest import mock
+
 from django.db.models import Q
+from django.test import override_settings
 from parameterized import parameterized
 
 from lucyfer.searchset import DjangoSearchSet
-from lucyfer.searchset.fields import DjangoCharField, DjangoIntegerField, DjangoFloatField, DjangoBooleanField
+from lucyfer.searchset.fields import DjangoCharField, DjangoIntegerField, DjangoFloatField, DjangoBooleanField, \
+    DjangoDateTimeField
+from lucyfer.utils import LuceneSearchCastValueException
 from tests.base import TestParsing
 from tests.utils import DjangoModel
 
@@ -14,6 +20,8 @@ class UnicornSearchSet(DjangoSearchSet):
     boolean_field = DjangoBooleanField()
     field_with_source = DjangoCharField(sources=["ok_it_is_a_source"])
     field_with_several_sources = DjangoCharField(sources=["source1", "source2"], use_field_class_for_sources=True)
+    not_merged_integer_field = DjangoIntegerField(merge_conditions=False)
+    datetime_field = DjangoDateTimeField()
 
     @property
     def raw_mapping(self):
@@ -151,3 +159,154 @@ class TestLuceneToDjangoParsing(TestParsing):
     ))
     def test_regex_query(self, expected_query, raw_expressions):
         self._check_rules(rules=raw_expressions, expected_query=expected_query)
+
+    def test_long_expression(self):
+        values = list(range(5000))
+        expression = " OR ".join(f"integer_field: {value}" for value in values)
+        expected_query = Q(integer_field__in=values)
+
+        self._check_rule(rule=expression, expected_query=expected_query)
+
+        with override_settings(LUCYFER_SETTINGS={"OPTIMIZE_QUERY_TREE": False}):
+            self._check_rule(rule=expression, expected_query=expected_query)
+
+    @parameterized.expand((
+            (Q(integer_field__in=[1, 2]), ["integer_field: 1 OR integer_field: 2 OR integer_field: 1"]),
+            (Q(float_field__in=[1.5, 2.0]) | Q(char_field__icontains="a"),
+             ["float_field: 1.5 OR char_field: a OR float_field: 2"]),
+            (Q(boolean_field__in=[True, False]), ["boolean_field: true OR boolean_field: false"]),
+            (Q(undefined_field__in=["10.0.0.1", "10.0.0.2"]) | Q(undefined_field__iexact="abc"),
+             ["undefined_field: 10.0.0.1 OR undefined_field: 10.0.0.2 OR undefined_field: abc"]),
+            (Q(undefined_field__iexact="1") | Q(undefined_field__istartswith="2"),
+             ["undefined_field: 1 OR undefined_field: 2*"]),
+            (Q(integer_field__exact=1) & Q(integer_field__exact=2), ["integer_field: 1 AND integer_field: 2"]),
+            (Q(not_merged_integer_field__exact=1) | Q(not_merged_integer_field__exact=2),
+             ["not_merged_integer_field: 1 OR not_merged_integer_field: 2"]),
+    ))
+    def test_in_lookup(self, expected_query, raw_expressions):
+        self._check_rules(rules=raw_expressions, expected_query=expected_query)
+
+    @parameterized.expand((
+            (Q(integer_field__range=(100, 5000)), ["integer_field >= 100 AND integer_field <= 5000"]),
+            (Q(integer_field__gt=3, integer_field__lt=10),
+             ["integer_field > 1 AND integer_field > 3 AND integer_field < 10"]),
+            (Q(float_field__gte=1.5, float_field__lt=2, integer_field__gt=1),
+             ["float_field >= 1.5 AND integer_field > 1 AND float_field < 2"]),
+            (Q(integer_field__range=(5, 5)), ["integer_field >= 5 AND integer_field <= 5"]),
+            (Q(pk__in=[]), ["integer_field > 10 AND integer_field < 5", "integer_field >= 5 AND integer_field < 5",
+                            "integer_field > 10 AND integer_field < 5 AND char_field: a"]),
+            (Q(char_field__icontains="a"), ["(integer_field > 10 AND integer_field < 5) OR char_field: a"]),
+            (Q(integer_field__gt=10) | Q(integer_field__lt=5), ["integer_field > 10 OR integer_field < 5"]),
+    ))
+    def test_range_merge(self, expected_query, raw_expressions):
+        self._check_rules(rules=raw_expressions, expected_query=expected_query)
+
+    def test_empty_range_filter(self):
+        queryset = mock.Mock()
+
+        self.assertIs(self.searchset_class.filter(queryset, "integer_field > 10 AND integer_field < 5"),
+                      queryset.none.return_value)
+        queryset.filter.assert_not_called()
+
+
+class TestDjangoDateTimeField(TestParsing):
+    searchset_class = UnicornSearchSet
+
+    def setUp(self):
+        patcher = mock.patch.object(DjangoDateTimeField, "get_now", return_value=datetime(2021, 3, 31, 15, 30))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.searchset_class.storage.parsed_query_cache.clear()
+
+    def assertQueriesEqual(self, q1, q2):
+        self.assertEqual(q1, q2)
+
+    @parameterized.expand((
+            (Q(datetime_field__gte=datetime(2020, 1, 1), datetime_field__lt=datetime(2020, 1, 2)),
+             ["datetime_field: 2020-01-01"]),
+            (Q(datetime_field__exact=datetime(2020, 1, 1, 10)), ["datetime_field: '2020-01-01T10:00:00'"]),
+            (Q(datetime_field__gte=datetime(2020, 1, 2)), ["datetime_field > 2020-01-01"]),
+            (Q(datetime_field__gte=datetime(2020, 1, 1)), ["datetime_field >= 2020-01-01"]),
+            (Q(datetime_field__lt=datetime(2020, 1, 1)), ["datetime_field < 2020-01-01"]),
+            (Q(datetime_field__lt=datetime(2020, 1, 2)), ["datetime_field <= 2020-01-01"]),
+            (Q(datetime_field__gte=datetime(2020, 2, 1), datetime_field__lt=datetime(2020, 3, 1)),
+             ["datetime_field: 2020-02"]),
+            (Q(datetime_field__gt=datetime(2021, 3, 31, 14, 30)), ["datetime_field > now-1h"]),
+            (Q(datetime_field__lte=datetime(2021, 3, 31, 14, 30)), ["datetime_field <= now-1h"]),
+            (Q(datetime_field__gte=datetime(2021, 3, 30), datetime_field__lt=datetime(2021, 3, 31)),
+             ["datetime_field: 'now-1d/d'"]),
+            (~Q(Q(datetime_field__gte=datetime(2020, 1, 1), datetime_field__lt=datetime(2020, 1, 2))),
+             ["NOT datetime_field: 2020-01-01"]),
+            (Q(datetime_field__in=[datetime(2020, 1, 1, 10), datetime(2020, 1, 1, 11)]),
+             ["datetime_field: '2020-01-01T10:00:00' OR datetime_field: '2020-01-01T11:00:00'"]),
+    ))
+    def test_datetime_values(self, expected_query, raw_expressions):
+        self._check_rules(rules=raw_expressions, expected_query=expected_query)
+
+    @parameterized.expand((
+            (Q(datetime_field__gte=datetime(2020, 1, 1), datetime_field__lt=datetime(2020, 2, 1)),
+             ["datetime_field >= 2020-01-01 AND datetime_field <= 2020-01-31"]),
+            (Q(datetime_field__gt=datetime(2020, 1, 1, 12), datetime_field__lt=datetime(2020, 1, 2)),
+             ["datetime_field: 2020-01-01 AND datetime_field > '2020-01-01T12:00:00'"]),
+            (Q(pk__in=[]), ["datetime_field > 2020-01-01 AND datetime_field < 2020-01-02"]),
+    ))
+    def test_range_merge(self, expected_query, raw_expressions):
+        self._check_rules(rules=raw_expressions, expected_query=expected_query)
+
+    def test_time_zone(self):
+        with override_settings(USE_TZ=True, TIME_ZONE="Europe/Moscow"):
+            query = self.searchset_class.parse("datetime_field >= 2020-01-01")
+
+        moscow_midnight = datetime(2019, 12, 31, 21, tzinfo=timezone.utc)
+        self.assertEqual(query, Q(datetime_field__gte=moscow_midnight))
+
+    def test_epoch_values(self):
+        with override_settings(TIME_ZONE="UTC"):
+            self._check_rules(rules=["datetime_field > 1600000000", "datetime_field > 1600000000000"],
+                              expected_query=Q(datetime_field__gt=datetime(2020, 9, 13, 12, 26, 40)))
+
+        # time zone support isn't switched at runtime, so compiled queries are cached regardless of it
+        self.searchset_class.storage.parsed_query_cache.clear()
+
+        with override_settings(USE_TZ=True, TIME_ZONE="Europe/Moscow"):
+            self._check_rules(rules=["datetime_field > 1600000000"],
+                              expected_query=Q(datetime_field__gt=datetime(2020, 9, 13, 12, 26, 40,
+                                                                           tzinfo=timezone.utc)))
+
+    @parameterized.expand((
+            # the day of switch to summer time is 23 hours long
+            ("datetime_field: 2020-03-29", datetime(2020, 3, 28, 23), datetime(2020, 3, 29, 22)),
+            # the day of switch to winter time is 25 hours long
+            ("datetime_field: 2020-10-25", datetime(2020, 10, 24, 22), datetime(2020, 10, 25, 23)),
+            ("datetime_field: 'now/d'", datetime(2020, 3, 28, 23), datetime(2020, 3, 29, 22)),
+            ("datetime_field: '2020-03-29T12:00:00Z||/d'", datetime(2020, 3, 28, 23), datetime(2020, 3, 29, 22)),
+    ))
+    def test_dst_change(self, raw_expression, start, end):
+        with override_settings(USE_TZ=True, TIME_ZONE="Europe/Berlin"), \
+                mock.patch.object(DjangoDateTimeField, "get_now", return_value=datetime(2020, 3, 29, 15)):
+            query = self.searchset_class.parse(raw_expression)
+
+        self.assertEqual(query, Q(datetime_field__gte=start.replace(tzinfo=timezone.utc),
+                                  datetime_field__lt=end.replace(tzinfo=timezone.utc)))
+
+    def test_local_dates_are_not_cached_with_time_zone_support(self):
+        with override_settings(USE_TZ=True, TIME_ZONE="UTC"):
+            self.searchset_class.parse("datetime_field > 2020-01-01")
+            self.searchset_class.parse("datetime_field > '2020-01-01T10:00:00Z'")
+
+        self.assertNotIn("datetime_field > 2020-01-01", self.searchset_class.storage.parsed_query_cache)
+        self.assertIn("datetime_field > '2020-01-01T10:00:00Z'", self.searchset_class.storage.parsed_query_cache)
+
+    def test_invalid_value(self):
+        with self.assertRaises(LuceneSearchCastValueException):
+            self.searchset_class.parse("datetime_field > yesterday")
+
+    def test_relative_queries_are_not_cached(self):
+        self.searchset_class.storage.parsed_query_cache.clear()
+
+        self.searchset_class.parse("datetime_field > now-1h")
+        self.searchset_class.parse("datetime_field > 2020-01-01")
+
+        self.assertIsNone(self.searchset_class.storage.parsed_query_cache.get("datetime_field > now-1h"))
+        self.assertIsNotNone(self.searchset_class.storage.parsed_query_cache.get("datetime_field > 2020-01-01"))
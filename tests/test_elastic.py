@@ -1,9 +1,15 @@
-from elasticsearch_dsl import Q
+from unittest import TestCase, mock
+
+from django.test import override_settings
+from elasticsearch_dsl import Q, Search
+from elasticsearch_dsl.query import Range, MatchNone
 from parameterized import parameterized
 
 from lucyfer.searchset import ElasticSearchSet
 from lucyfer.searchset.fields import ElasticSearchField, ElasticIntegerField, ElasticFloatField, \
-    ElasticBooleanField, ElasticNullBooleanField
+    ElasticBooleanField, ElasticNullBooleanField, ElasticDateField
+from lucyfer.searchset.utils import FieldType
+from lucyfer.utils import LuceneSearchCastValueException, LuceneSearchInvalidValueException
 
 from tests.base import TestParsing
 from tests.utils import compare_dicts, Panic, EsClient, ElasticModel
@@ -14,10 +20,16 @@ class MyElasticSearchSet(ElasticSearchSet):
     field_with_source = ElasticSearchField(sources=["source"])
     field_with_several_sources = ElasticSearchField(sources=["source1", "source2"])
 
-    int_field = ElasticIntegerField()
-    float_field = ElasticFloatField()
+    int_field = ElasticIntegerField(merge_ranges=True)
+    float_field = ElasticFloatField(merge_ranges=True)
+    array_int_field = ElasticIntegerField()
+    ranged_field = ElasticSearchField(merge_ranges=True)
     boolean_field = ElasticBooleanField()
     null_boolean_field = ElasticNullBooleanField()
+    date_field = ElasticDateField(merge_ranges=True)
+    rounded_date_field = ElasticDateField(rounding="m", time_zone="+03:00", merge_ranges=True)
+    formatted_date_field = ElasticDateField(date_format="dd.MM.yyyy")
+    sourced_date_field = ElasticDateField(sources=["created"], use_field_class_for_sources=True, time_zone="+03:00")
 
     @staticmethod
     def get_es_client(**kwargs):
@@ -116,3 +128,180 @@ class TestLuceneToDjangoParsing(TestParsing):
     ))
     def test_regexp_query(self, expected_query, raw_expressions):
         self._check_rules(rules=raw_expressions, expected_query=expected_query)
+
+    def test_long_expression(self):
+        values = list(range(5000))
+        expression = " OR ".join(f"int_field: {value}" for value in values)
+
+        self._check_rule(rule=expression, expected_query=Q("terms", int_field=values))
+
+    @parameterized.expand((
+            (Q("terms", field=["a", "b"]), ["field: a OR field: b", "field: a OR field: b OR field: a"]),
+            (
+                    Q("terms", source1=["a", "b"]) | Q("terms", source2=["a", "b"]),
+                    ["field_with_several_sources: a OR field_with_several_sources: b"]
+            ),
+            (
+                    Q("terms", field=["a", "b"]) | Q("wildcard", field="c*") | Q("term", int_field=1),
+                    ["field: a OR field: c* OR int_field: 1 OR field: b"]
+            ),
+            (
+                    Q("terms", field=["a", "b"]) & Q("term", int_field=1),
+                    ["(field: a OR field: b) AND int_field: 1"]
+            ),
+            (
+                    Q("regexp", field="a.*") | Q("match", boolean_field=True) | Q("match", boolean_field=False),
+                    ["field ~ 'a.*' OR boolean_field: true OR boolean_field: false"]
+            ),
+    ))
+    def test_terms_query(self, expected_query, raw_expressions):
+        self._check_rules(rules=raw_expressions, expected_query=expected_query)
+
+    @parameterized.expand((
+            (Range(int_field={"gte": 100, "lte": 5000}), ["int_field >= 100 AND int_field <= 5000"]),
+            (Range(float_field={"gt": 3.0, "lt": 10.0}), ["float_field > 1 AND float_field > 3 AND float_field < 10"]),
+            (Range(int_field={"gt": 1}) & Q("term", field="a") & Range(int_field={"lt": 5}) | Q("term", field="b"),
+             ["(int_field > 1 AND field: a AND int_field < 5) OR field: b"]),
+            (Range(ranged_field={"gt": "a", "lte": "c"}), ["ranged_field > a AND ranged_field <= c"]),
+            (Range(ranged_field={"gt": "a"}) & Range(ranged_field={"gt": "b"}),
+             ["ranged_field > a AND ranged_field > b"]),
+            (MatchNone(), ["int_field > 10 AND int_field < 5", "int_field > 10 AND int_field < 5 AND field: a"]),
+            (Q("term", field="a"), ["(int_field > 10 AND int_field < 5) OR field: a"]),
+    ))
+    def test_range_merge(self, expected_query, raw_expressions):
+        self._check_rules(rules=raw_expressions, expected_query=expected_query)
+
+    @parameterized.expand((
+            (Range(array_int_field={"gte": 1}) & Range(array_int_field={"lte": 5}),
+             ["array_int_field >= 1 AND array_int_field <= 5"]),
+            # elements of array may match different bounds, for ex. [3, 20]
+            (Range(array_int_field={"gt": 10}) & Range(array_int_field={"lt": 5}),
+             ["array_int_field > 10 AND array_int_field < 5"]),
+            (Range(field={"gt": "a"}) & Range(field={"lte": "c"}), ["field > a AND field <= c"]),
+    ))
+    def test_ranges_are_not_merged_by_default(self, expected_query, raw_expressions):
+        # compare_dicts merges clauses of bool query, so merged range would be equal to expected query
+        for raw_expression in raw_expressions:
+            self.assertEqual(self.searchset_class.parse(raw_expression).to_dict(), expected_query.to_dict())
+
+    def test_range_of_several_sources_is_not_merged(self):
+        query = self.searchset_class.parse("field_with_several_sources > 1 AND field_with_several_sources < 5")
+        self.assertEqual([len(q.should) for q in query.must], [2, 2])
+
+    def test_terms_lookup(self):
+        terms_lookup = {"index": "lookup", "id": "1", "path": "values"}
+
+        with mock.patch.object(self.searchset_class, "get_terms_lookup", return_value=terms_lookup) as get_lookup, \
+                override_settings(LUCYFER_SETTINGS={"TERMS_LOOKUP_MIN_VALUES_COUNT": 3}):
+            self._check_rule(rule="field: a OR field: b", expected_query=Q("terms", field=["a", "b"]))
+            get_lookup.assert_not_called()
+
+            self._check_rule(rule="field: a OR field: b OR field: c", expected_query=Q("terms", field=terms_lookup))
+            get_lookup.assert_called_once_with(source="field", values=["a", "b", "c"])
+
+
+class TestElasticDateField(TestParsing):
+    searchset_class = MyElasticSearchSet
+
+    def assertQueriesEqual(self, q1, q2):
+        self.assertEqual(q1.to_dict(), q2.to_dict())
+
+    @parameterized.expand((
+            (Range(date_field={"gte": "2020-01-01||/d", "lte": "2020-01-01||/d"}), ["date_field: 2020-01-01"]),
+            (Range(date_field={"gt": "2020-01-01||/d"}), ["date_field > 2020-01-01"]),
+            (Range(date_field={"lt": "2020-02||/M"}), ["date_field < 2020-02"]),
+            (Range(date_field={"gte": "2020-01-31||+1M/d"}), ["date_field >= '2020-01-31||+1M'"]),
+            (Range(date_field={"lte": "2020-01-01T10:00:00Z"}), ["date_field <= '2020-01-01T10:00:00Z'"]),
+            (Range(date_field={"gte": "2020-09-13T12:26:40.000+00:00"}),
+             ["date_field >= 1600000000", "date_field >= 1600000000000"]),
+            (Range(date_field={"gt": "now-15m"}), ["date_field > now-15m"]),
+            (Range(date_field={"gte": "now/d", "lte": "now/d"}), ["date_field: 'now/d'"]),
+            (~Range(date_field={"gte": "2020-01-01||/d", "lte": "2020-01-01||/d"}), ["NOT date_field: 2020-01-01"]),
+            (Range(date_field={"gt": "now-15m"}) | Range(date_field={"lt": "2020||/y"}),
+             ["date_field > now-15m OR date_field < 2020"]),
+            (Q("exists", field="date_field"), ["date_field: *"]),
+            (~Q("exists", field="date_field"), ["NOT date_field: *"]),
+            (Q("exists", field="date_field") & Range(date_field={"gt": "now-15m"}),
+             ["date_field: * AND date_field > now-15m"]),
+    ))
+    def test_date_values(self, expected_query, raw_expressions):
+        self._check_rules(rules=raw_expressions, expected_query=expected_query)
+
+    @parameterized.expand((
+            (Range(date_field={"gte": "now-1d/d", "lt": "now/d"}),
+             ["date_field >= 'now-1d/d' AND date_field < 'now/d'"]),
+            (Range(date_field={"gte": "2020-01-01||/d", "lte": "2020-01-01||/d"}) & Range(date_field={"gt": "now-1h"}),
+             ["date_field: 2020-01-01 AND date_field > now-1h"]),
+            (Range(rounded_date_field={"gt": "now-1h/m", "lt": "now/m", "time_zone": "+03:00"}),
+             ["rounded_date_field > now-1h AND rounded_date_field < now"]),
+    ))
+    def test_date_range_merge(self, expected_query, raw_expressions):
+        self._check_rules(rules=raw_expressions, expected_query=expected_query)
+
+    @parameterized.expand((
+            (Range(rounded_date_field={"gt": "now-15m/m", "time_zone": "+03:00"}), ["rounded_date_field > now-15m"]),
+            (Range(rounded_date_field={"gt": "now-1d/d", "time_zone": "+03:00"}),
+             ["rounded_date_field > 'now-1d/d'"]),
+            (Range(formatted_date_field={"gte": "01.02.2020", "format": "dd.MM.yyyy"}),
+             ["formatted_date_field >= 01.02.2020"]),
+    ))
+    def test_date_params(self, expected_query, raw_expressions):
+        self._check_rules(rules=raw_expressions, expected_query=expected_query)
+
+    def test_params_of_sources(self):
+        expected_query = Range(created={"gte": "2020-01-01||/d", "lte": "2020-01-01||/d", "time_zone": "+03:00"})
+        self._check_rules(rules=["created: 2020-01-01", "sourced_date_field: 2020-01-01"],
+                          expected_query=expected_query)
+
+    def test_rounding_setting(self):
+        with override_settings(LUCYFER_SETTINGS={"DATE_MATH_ROUNDING": "h"}):
+            self._check_rule(rule="date_field > now-15m", expected_query=Range(date_field={"gt": "now-15m/h"}))
+            self._check_rule(rule="rounded_date_field > now-15m",
+                             expected_query=Range(rounded_date_field={"gt": "now-15m/m", "time_zone": "+03:00"}))
+
+    def test_invalid_values(self):
+        with self.assertRaises(LuceneSearchCastValueException):
+            self.searchset_class.parse("date_field > yesterday")
+
+        with self.assertRaises(LuceneSearchCastValueException):
+            self.searchset_class.parse("date_field > now-1q")
+
+        with self.assertRaises(LuceneSearchInvalidValueException):
+            self.searchset_class.parse("date_field ~ '2020.*'")
+
+    def test_mapping_field_class(self):
+        self.assertIs(self.searchset_class._field_type_to_field_class[FieldType.TIMESTAMP], ElasticDateField)
+
+
+class TestElasticSearchSetFilter(TestCase):
+    searchset_class = MyElasticSearchSet
+
+    def _check_filter(self, search_terms, expected_query, **kwargs):
+        search = self.searchset_class.filter(Search(), search_terms, **kwargs)
+        self.assertEqual(search.to_dict(), Search().query(expected_query).to_dict())
+
+    def test_scoring_context(self):
+        self._check_filter("field: a AND NOT field: b", Q("term", field="a") & ~Q("term", field="b"))
+
+    @parameterized.expand((
+            ("field: a", Q("bool", filter=[Q("term", field="a")])),
+            ("NOT field: a", Q("bool", must_not=[Q("term", field="a")])),
+            ("field: a AND NOT field: b AND int_field: 1",
+             Q("bool", filter=[Q("term", field="a"), Q("term", int_field=1)], must_not=[Q("term", field="b")])),
+            ("field: a OR NOT field: b",
+             Q("bool", filter=[Q("bool", should=[Q("term", field="a"), ~Q("term", field="b")])])),
+    ))
+    def test_filter_context(self, search_terms, expected_query):
+        self._check_filter(search_terms, expected_query, filter_context=True)
+
+    def test_filter_context_meta_option(self):
+        class SearchSet(MyElasticSearchSet):
+            class Meta:
+                model = ElasticModel
+                use_filter_context = True
+
+        search = SearchSet.filter(Search(), "field: a")
+        self.assertEqual(search.to_dict(), {"query": {"bool": {"filter": [{"term": {"field": "a"}}]}}})
+
+        search = SearchSet.filter(Search(), "field: a", filter_context=False)
+        self.assertEqual(search.to_dict(), {"query": {"term": {"field": "a"}}})
@@ -0,0 +1,125 @@
+from unittest import TestCase
+
+from lucyfer.searchset import ElasticSearchSet
+from lucyfer.searchset.mapping_loader import LatestIndexMappingLoader, AliasMappingLoader, IndicesMappingLoader, \
+    FieldCapsMappingLoader, merge_raw_mappings
+from lucyfer.searchset.utils import FieldType
+
+
+def get_mapping(**properties):
+    return {"mappings": {"doc": {"properties": properties}}}
+
+
+INDEX_TO_MAPPING = {
+    "events-2020.01.01": get_mapping(a={"type": "long"}),
+    "events-2020.01.02": get_mapping(a={"type": "long"}, b={"type": "boolean"},
+                                     host={"properties": {"name": {"type": "keyword"}}}),
+    "events-2020.01.03": get_mapping(a={"type": "keyword"}),
+}
+
+
+class FakeIndices:
+    def __init__(self, client):
+        self.client = client
+
+    def get_mapping(self, index, **kwargs):
+        self.client.calls.append(("get_mapping", index, kwargs))
+        return {name: INDEX_TO_MAPPING[name] for name in index.split(",")}
+
+    def get_alias(self, name, **kwargs):
+        self.client.calls.append(("get_alias", name, kwargs))
+        return {
+            "events-2020.01.01": {"aliases": {name: {}}},
+            "events-2020.01.02": {"aliases": {name: {"is_write_index": True}}},
+            "events-2020.01.03": {"aliases": {name: {"is_write_index": False}}},
+        }
+
+
+class FakeCat:
+    def __init__(self, client):
+        self.client = client
+
+    def indices(self, index, **kwargs):
+        self.client.calls.append(("cat.indices", index, kwargs))
+        return [{"index": name} for name in ("events-2020.01.02", "events-2020.01.01")]
+
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+        self.indices = FakeIndices(self)
+        self.cat = FakeCat(self)
+
+    def field_caps(self, index, fields, **kwargs):
+        self.calls.append(("field_caps", index, kwargs))
+        return {"fields": {
+            "_id": {"_id": {"type": "_id"}},
+            "a": {"long": {"type": "long"}, "keyword": {"type": "keyword"}},
+            "b": {"boolean": {"type": "boolean"}},
+            "c": {"integer": {"type": "integer"}, "long": {"type": "long"}},
+            "host": {"object": {"type": "object"}},
+            "host.name": {"keyword": {"type": "keyword"}},
+        }}
+
+
+class EventModel:
+    class _doc_type:
+        name = "doc"
+
+    @staticmethod
+    def _get_index(*args, **kwargs):
+        return "events-*"
+
+
+class TestElasticMappingLoader(TestCase):
+    def setUp(self):
+        self.client = FakeClient()
+
+        class SearchSet(ElasticSearchSet):
+            @classmethod
+            def get_es_client(cls, **kwargs):
+                return self.client
+
+            class Meta:
+                model = EventModel
+
+        self.searchset_class = SearchSet
+
+    def test_latest_index(self):
+        raw_mapping = LatestIndexMappingLoader().load(self.searchset_class)
+
+        self.assertEqual(raw_mapping, {"a": FieldType.INTEGER, "b": FieldType.BOOLEAN, "host.name": None})
+        self.assertEqual(self.client.calls, [
+            ("cat.indices", "events-*", {"h": "index", "format": "json"}),
+            ("get_mapping", "events-2020.01.02", {"filter_path": "*.mappings.*.properties.**.type"}),
+        ])
+
+    def test_latest_index_is_default(self):
+        self.searchset_class.storage.reset()
+
+        self.assertEqual(self.searchset_class.storage.raw_mapping.keys(), {"a", "b", "host.name"})
+
+    def test_alias(self):
+        raw_mapping = AliasMappingLoader("events", use_filter_path=False).load(self.searchset_class)
+
+        self.assertEqual(raw_mapping, {"a": FieldType.INTEGER, "b": FieldType.BOOLEAN, "host.name": None})
+        self.assertEqual(self.client.calls[-1], ("get_mapping", "events-2020.01.02", {}))
+
+    def test_indices(self):
+        raw_mapping = IndicesMappingLoader(["events-2020.01.01", "events-2020.01.03"]).load(self.searchset_class)
+
+        # types are different in indices
+        self.assertEqual(raw_mapping, {"a": None})
+        self.assertEqual(len(self.client.calls), 1)
+
+    def test_field_caps(self):
+        raw_mapping = FieldCapsMappingLoader().load(self.searchset_class)
+
+        self.assertEqual(raw_mapping, {"a": None, "b": FieldType.BOOLEAN, "c": FieldType.INTEGER, "host.name": None})
+        self.assertEqual(self.client.calls, [("field_caps", "events-*", {"filter_path": "fields.*.*.type"})])
+
+    def test_merge_raw_mappings(self):
+        self.assertEqual(
+            merge_raw_mappings([{"a": FieldType.INTEGER, "b": None}, {"a": FieldType.INTEGER, "b": FieldType.FLOAT}]),
+            {"a": FieldType.INTEGER, "b": None},
+        )
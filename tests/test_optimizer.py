@@ -0,0 +1,86 @@
+from unittest import TestCase
+
+from django.db.models import Q
+from lucyparser import parse
+from lucyparser.tree import AndNode, OrNode, NotNode, ExpressionNode, Operator
+from parameterized import parameterized
+
+from lucyfer.parser.optimizer import optimize_tree
+from lucyfer.searchset import DjangoSearchSet
+from lucyfer.searchset.fields import DjangoCharField, DjangoIntegerField
+from tests.utils import DjangoModel
+
+
+def expr(name, value, operator=Operator.EQ):
+    return ExpressionNode(name=name, value=value, operator=operator)
+
+
+class TestOptimizeTree(TestCase):
+    def optimize(self, raw_expression):
+        return optimize_tree(tree=parse(raw_expression), is_match_all=lambda condition: condition.value == "*")
+
+    @parameterized.expand((
+            ("a: 1 AND (b: 2 AND (c: 3 AND d: 4))",
+             AndNode(children=[expr("a", "1"), expr("b", "2"), expr("c", "3"), expr("d", "4")])),
+            ("a: 1 OR (b: 2 OR (c: 3 OR d: 4))",
+             OrNode(children=[expr("a", "1"), expr("b", "2"), expr("c", "3"), expr("d", "4")])),
+            ("a: 1 OR (NOT NOT (b: 2 OR c: 3))",
+             OrNode(children=[expr("a", "1"), expr("b", "2"), expr("c", "3")])),
+    ))
+    def test_flatten(self, raw_expression, expected_tree):
+        self.assertEqual(self.optimize(raw_expression), expected_tree)
+
+    @parameterized.expand((
+            ("a: 1 AND b: 2 AND a: 1", AndNode(children=[expr("a", "1"), expr("b", "2")])),
+            ("a: 1 OR a: 1", expr("a", "1")),
+            ("(a: 1 OR b: 2) AND (a: 1 OR b: 2)", OrNode(children=[expr("a", "1"), expr("b", "2")])),
+            ("NOT a: 1 AND NOT a: 1", NotNode(children=[expr("a", "1")])),
+    ))
+    def test_duplicates(self, raw_expression, expected_tree):
+        self.assertEqual(self.optimize(raw_expression), expected_tree)
+
+    @parameterized.expand((
+            ("a: * AND b: 2", expr("b", "2")),
+            ("a: * OR b: 2", AndNode(children=[])),
+            ("(a: * OR b: 2) AND c: 3", expr("c", "3")),
+            ("a: * AND b: *", AndNode(children=[])),
+            ("a: *", expr("a", "*")),
+            ("NOT a: * AND b: 2", AndNode(children=[NotNode(children=[expr("a", "*")]), expr("b", "2")])),
+    ))
+    def test_match_all(self, raw_expression, expected_tree):
+        self.assertEqual(self.optimize(raw_expression), expected_tree)
+
+    @parameterized.expand((
+            ("NOT NOT a: 1", expr("a", "1")),
+            ("NOT NOT NOT a: 1", NotNode(children=[expr("a", "1")])),
+            ("NOT (NOT a: 1 AND NOT a: 1)", expr("a", "1")),
+    ))
+    def test_double_negation(self, raw_expression, expected_tree):
+        self.assertEqual(self.optimize(raw_expression), expected_tree)
+
+    def test_deep_tree(self):
+        tree = expr("a", "0")
+        for i in range(1, 10000):
+            tree = OrNode(children=[tree, expr("a", str(i))])
+
+        optimized = optimize_tree(tree=tree, is_match_all=lambda condition: False)
+
+        self.assertIsInstance(optimized, OrNode)
+        self.assertEqual(len(optimized.children), 10000)
+
+
+class TestSearchSetOptimization(TestCase):
+    class SearchSet(DjangoSearchSet):
+        char_field = DjangoCharField()
+        integer_field = DjangoIntegerField()
+
+        class Meta:
+            model = DjangoModel
+
+    def test_match_all_is_folded(self):
+        query = self.SearchSet.parse("(char_field: * OR integer_field: 1) AND integer_field: 2")
+        self.assertEqual(query, Q(integer_field__exact=2))
+
+    def test_duplicates_are_removed(self):
+        query = self.SearchSet.parse("char_field: x OR NOT NOT char_field: x OR integer_field: 1")
+        self.assertEqual(query, Q(char_field__icontains="x") | Q(integer_field__exact=1))
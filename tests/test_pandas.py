@@ -0,0 +1,88 @@
+from unittest import TestCase, SkipTest
+
+from parameterized import parameterized
+
+try:
+    import pandas as pd
+except ImportError:
+    raise SkipTest("pandas is not installed")
+
+from lucyfer.searchset.fields.pandas import PandasCharField, PandasIntegerField, PandasFloatField, \
+    PandasBooleanField
+from lucyfer.searchset.pandas import PandasSearchSet
+from lucyfer.searchset.utils import FieldType
+from lucyfer.utils import LuceneSearchCastValueException, LuceneSearchInvalidValueException
+
+
+DF = pd.DataFrame({
+    "id": [1, 2, 3, 4],
+    "score": [0.5, 1.5, None, 3.0],
+    "name": ["alpha", "Beta", "gamma", None],
+    "host": ["web-01", "web-02", "db-01", "db-02"],
+    "is_blocked": [True, False, False, True],
+})
+
+
+class EventSearchSet(PandasSearchSet):
+    name = PandasCharField()
+    text = PandasCharField(sources=["name", "host"])
+
+    class Meta:
+        model = DF.iloc[:0]
+
+
+class TestPandasSearchSet(TestCase):
+    def test_mapping(self):
+        self.assertEqual(EventSearchSet.storage.raw_mapping, {
+            "id": FieldType.INTEGER,
+            "score": FieldType.FLOAT,
+            "name": FieldType.STRING,
+            "host": FieldType.STRING,
+            "is_blocked": FieldType.BOOLEAN,
+        })
+
+        field_source_to_field = EventSearchSet.storage.field_source_to_field
+        self.assertIsInstance(field_source_to_field["id"], PandasIntegerField)
+        self.assertIsInstance(field_source_to_field["score"], PandasFloatField)
+        self.assertIsInstance(field_source_to_field["is_blocked"], PandasBooleanField)
+
+    @parameterized.expand((
+            ("id: 2", [2]),
+            ("id > 2", [3, 4]),
+            ("id >= 2 AND id < 4", [2, 3]),
+            ("NOT id: 2", [1, 3, 4]),
+            ("score > 1", [2, 4]),
+            ("name: a", [1, 2, 3]),
+            ("name: BETA", [2]),
+            ("name ~ \"^[ab]\"", [1]),
+            ("host: web*", [1, 2]),
+            ("host: *01", [1, 3]),
+            ("host: *eb*", [1, 2]),
+            ("host: db-01", [3]),
+            ("host: *", [1, 2, 3, 4]),
+            ("text: web-01", [1]),
+            ("text: gamma", [3]),
+            ("is_blocked: true", [1, 4]),
+            ("unknown: value", []),
+            ("id: 1 OR id: 3 OR name: beta", [1, 2, 3]),
+            ("(host: web* OR host: db-02) AND NOT is_blocked: true", [2]),
+    ))
+    def test_filter(self, raw_expression, expected_ids):
+        self.assertEqual(EventSearchSet.filter(DF, raw_expression)["id"].tolist(), expected_ids)
+
+    def test_mask(self):
+        mask = EventSearchSet.get_mask(DF, "id: 1 OR id: 4")
+
+        self.assertEqual(mask.dtype, bool)
+        self.assertEqual(mask.tolist(), [True, False, False, True])
+
+    def test_invalid_values(self):
+        with self.assertRaises(LuceneSearchCastValueException):
+            EventSearchSet.parse("id: abc")
+
+        with self.assertRaises(LuceneSearchInvalidValueException):
+            EventSearchSet.parse("name ~ \"(\"")
+
+    def test_suggestions(self):
+        values = EventSearchSet.get_fields_values(DF, "host", prefix="web")
+        self.assertEqual(values, ["web-01", "web-02"])
@@ -0,0 +1,101 @@
+import threading
+from unittest import TestCase
+
+from parameterized import parameterized
+
+from lucyfer.searchset import PythonSearchSet
+from lucyfer.searchset.fields import PythonSearchField
+from lucyfer.searchset.percolator import PercolatorIndex
+from lucyfer.utils import LuceneSearchException
+from tests.test_python import Event, EVENT, EVENT_DICT
+
+
+class CaseInsensitiveField(PythonSearchField):
+    case_sensitive = False
+
+
+class EventSearchSet(PythonSearchSet):
+    text = CaseInsensitiveField(sources=["message", "host.name"])
+
+    class Meta:
+        model = Event
+
+
+class TestPercolatorIndex(TestCase):
+    def setUp(self):
+        self.index = PercolatorIndex(EventSearchSet)
+
+    @parameterized.expand((
+            ("id: 10", True, True),
+            ("id: 11", False, True),
+            ("id: 1 OR id: 10", True, True),
+            ("id: 10 AND score > 1", False, True),
+            ("(host.name: web-01 OR host.name: web-02) AND tags: alert", True, True),
+            ("tags: alert", True, True),
+            ("tags: debug", False, True),
+            ("text: \"CONNECTION REFUSED\"", True, True),
+            ("is_reviewed: null", True, True),
+            ("id > 5", True, False),
+            ("NOT id: 11", True, False),
+            ("id: 10 OR message: Conn*", True, False),
+            ("message: Conn* AND id: 10", True, True),
+    ))
+    def test_match(self, raw_expression, is_matched, is_indexed):
+        self.index.add("id", raw_expression)
+
+        for document in (EVENT, EVENT_DICT):
+            self.assertEqual(self.index.match(document), {"id"} if is_matched else set())
+
+        self.assertEqual(self.index._expressions["id"][1] is not None, is_indexed)
+
+    def test_only_candidates_are_evaluated(self):
+        for i in range(100):
+            self.index.add(i, f"id: {i} AND message: Conn*")
+        self.index.add("not indexed", "score > 0")
+
+        self.assertEqual(self.index.get_candidates_count(EVENT), 2)
+        self.assertEqual(self.index.match(EVENT), {10, "not indexed"})
+
+    def test_add_and_remove(self):
+        self.index.add(1, "id: 10")
+        self.index.add(2, "id: 10 OR id: 20")
+        self.index.add(3, "score > 0")
+        self.assertEqual(self.index.match(EVENT), {1, 2, 3})
+
+        self.index.remove(2)
+        self.index.remove(3)
+        self.index.remove("unknown")
+        self.assertEqual(self.index.match(EVENT), {1})
+        self.assertEqual(len(self.index), 1)
+
+        self.index.add(1, "id: 20")
+        self.assertEqual(self.index.match(EVENT), set())
+
+        self.index.remove(1)
+        self.assertEqual((self.index._postings, self.index._unindexed), ({}, set()))
+
+    def test_invalid_expression(self):
+        with self.assertRaises(LuceneSearchException):
+            self.index.add(1, "id: abc")
+
+        self.assertNotIn(1, self.index)
+
+    def test_expressions_are_not_cached(self):
+        self.index.add(1, "id: 10")
+
+        self.assertNotIn("id: 10", EventSearchSet.storage.parsed_query_cache)
+
+    def test_predicates_are_evaluated_without_lock(self):
+        self.index.add(1, "id: 10")
+        predicate, terms = self.index._expressions[1]
+
+        def predicate_adding_expression(document):
+            thread = threading.Thread(target=self.index.add, args=(2, "id: 20"))
+            thread.start()
+            thread.join(timeout=5)
+            return not thread.is_alive() and predicate(document)
+
+        self.index._expressions[1] = (predicate_adding_expression, terms)
+
+        self.assertEqual(self.index.match(EVENT), {1})
+        self.assertIn(2, self.index)
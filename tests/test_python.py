@@ -0,0 +1,136 @@
+from dataclasses import dataclass
+from typing import List, Optional
+from unittest import TestCase
+
+from parameterized import parameterized
+
+from lucyfer.searchset import PythonSearchSet
+from lucyfer.searchset.fields import PythonSearchField, PythonIntegerField, PythonBooleanField, \
+    PythonNullBooleanField, PythonFloatField
+from lucyfer.searchset.utils import FieldType
+from lucyfer.utils import LuceneSearchCastValueException, LuceneSearchInvalidValueException
+
+
+@dataclass
+class Host:
+    name: str
+    ip: str
+
+
+@dataclass
+class Event:
+    id: int
+    score: float
+    message: str
+    tags: List[str]
+    is_blocked: bool
+    is_reviewed: Optional[bool]
+    host: Host
+
+
+class EventSearchSet(PythonSearchSet):
+    text = PythonSearchField(sources=["message", "host.name"])
+
+    class Meta:
+        model = Event
+
+
+class CaseInsensitiveField(PythonSearchField):
+    case_sensitive = False
+
+
+class CaseInsensitiveSearchSet(PythonSearchSet):
+    message = CaseInsensitiveField()
+
+    class Meta:
+        model = Event
+
+
+EVENT = Event(id=10, score=0.5, message="Connection refused", tags=["network", "alert"], is_blocked=False,
+              is_reviewed=None, host=Host(name="web-01", ip="10.0.0.1"))
+
+EVENT_DICT = {"id": 10, "score": 0.5, "message": "Connection refused", "tags": ["network", "alert"],
+              "is_blocked": False, "is_reviewed": None, "host": {"name": "web-01", "ip": "10.0.0.1"}}
+
+
+class TestPythonSearchSet(TestCase):
+    def test_mapping(self):
+        self.assertEqual(EventSearchSet.storage.raw_mapping, {
+            "id": FieldType.INTEGER,
+            "score": FieldType.FLOAT,
+            "message": FieldType.STRING,
+            "tags": None,
+            "is_blocked": FieldType.BOOLEAN,
+            "is_reviewed": FieldType.NULL_BOOLEAN,
+            "host.name": FieldType.STRING,
+            "host.ip": FieldType.STRING,
+        })
+
+        field_source_to_field = EventSearchSet.storage.field_source_to_field
+        self.assertIsInstance(field_source_to_field["id"], PythonIntegerField)
+        self.assertIsInstance(field_source_to_field["score"], PythonFloatField)
+        self.assertIsInstance(field_source_to_field["is_blocked"], PythonBooleanField)
+        self.assertIsInstance(field_source_to_field["is_reviewed"], PythonNullBooleanField)
+
+    @parameterized.expand((
+            ("id: 10", True),
+            ("id: 11", False),
+            ("id > 5 AND id <= 10", True),
+            ("id < 10", False),
+            ("score >= 0.5", True),
+            ("message: \"Connection refused\"", True),
+            ("message: Connection*", True),
+            ("message: *refused", True),
+            ("message: Conn?ction*", True),
+            ("message: connection*", False),
+            ("message ~ \"Conn.*\"", True),
+            ("message ~ conn", False),
+            ("NOT message: Connection*", False),
+            ("tags: alert", True),
+            ("tags: debug", False),
+            ("tags: al*", True),
+            ("host.name: web-01", True),
+            ("host.ip: 10.0.0.*", True),
+            ("text: web*", True),
+            ("text: Connection*", True),
+            ("is_blocked: false", True),
+            ("is_blocked: true", False),
+            ("is_reviewed: null", True),
+            ("unknown_field: *", False),
+            ("id: 1 OR id: 10 OR id: 100", True),
+            ("id: 1 OR id: 2 OR id: 3", False),
+            ("tags: debug OR tags: alert", True),
+            ("(id: 1 OR message: Conn*) AND NOT is_blocked: true", True),
+    ))
+    def test_predicate(self, raw_expression, expected):
+        predicate = EventSearchSet.parse(raw_expression)
+
+        self.assertIs(predicate(EVENT), expected)
+        self.assertIs(predicate(EVENT_DICT), expected)
+
+    @parameterized.expand((
+            ("message: \"connection REFUSED\"", True),
+            ("message: CONN*", True),
+            ("message ~ \"conn.*\"", True),
+            ("message: connection OR message: \"connection refused\"", True),
+    ))
+    def test_case_insensitive_field(self, raw_expression, expected):
+        self.assertIs(CaseInsensitiveSearchSet.parse(raw_expression)(EVENT), expected)
+
+    def test_filter(self):
+        events = [{"id": i, "tags": ["even" if i % 2 == 0 else "odd"]} for i in range(10)]
+
+        self.assertEqual([event["id"] for event in EventSearchSet.filter(events, "tags: even AND id > 4")], [6, 8])
+
+    def test_invalid_values(self):
+        with self.assertRaises(LuceneSearchCastValueException):
+            EventSearchSet.parse("id: abc")
+
+        with self.assertRaises(LuceneSearchInvalidValueException):
+            EventSearchSet.parse("message ~ \"(\"")
+
+    def test_suggestions(self):
+        values = EventSearchSet.storage.field_source_to_field["tags"].get_values(
+            qs=[EVENT_DICT, EVENT], prefix="al", model_name="Event", escape_quotes_in_suggestions=False,
+        )
+        self.assertEqual(values, ["alert"])
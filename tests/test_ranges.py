@@ -0,0 +1,36 @@
+from datetime import datetime, timezone
+from unittest import TestCase
+
+from parameterized import parameterized
+
+from lucyfer.parser.ranges import RangeBounds, merge_bounds
+
+
+class TestMergeBounds(TestCase):
+    @parameterized.expand((
+            ([("gte", 100), ("lte", 5000)], RangeBounds(lower=("gte", 100), upper=("lte", 5000))),
+            ([("gt", 1), ("gte", 5), ("gte", 3)], RangeBounds(lower=("gte", 5), upper=None)),
+            ([("gte", 5), ("gt", 5)], RangeBounds(lower=("gt", 5), upper=None)),
+            ([("lte", 5), ("lt", 5), ("lt", 7.5)], RangeBounds(lower=None, upper=("lt", 5))),
+            ([("gte", 5), ("lte", 5)], RangeBounds(lower=("gte", 5), upper=("lte", 5))),
+            ([("gt", 10), ("lt", 5)], RangeBounds(lower=("gt", 10), upper=("lt", 5), is_empty=True)),
+            ([("gte", 5), ("lt", 5)], RangeBounds(lower=("gte", 5), upper=("lt", 5), is_empty=True)),
+            ([("gte", datetime(2020, 1, 2)), ("lt", datetime(2020, 1, 1))],
+             RangeBounds(lower=("gte", datetime(2020, 1, 2)), upper=("lt", datetime(2020, 1, 1)), is_empty=True)),
+            ([("gt", "now-1d"), ("lt", "now")], RangeBounds(lower=("gt", "now-1d"), upper=("lt", "now"))),
+            ([("gt", "9.0.0.1"), ("lt", "10.0.0.1")], RangeBounds(lower=("gt", "9.0.0.1"), upper=("lt", "10.0.0.1"))),
+    ))
+    def test_merge_bounds(self, bounds, expected_bounds):
+        self.assertEqual(merge_bounds(bounds), expected_bounds)
+
+    @parameterized.expand((
+            ([("gt", "a"), ("gt", "b")],),
+            ([("gt", datetime(2020, 1, 1)), ("gt", datetime(2020, 1, 1, tzinfo=timezone.utc))],),
+            ([("lt", True), ("lt", False)],),
+    ))
+    def test_not_comparable_bounds(self, bounds):
+        self.assertIsNone(merge_bounds(bounds))
+
+    def test_to_dict(self):
+        self.assertEqual(RangeBounds(lower=("gte", 1), upper=("lt", 2)).to_dict(), {"gte": 1, "lt": 2})
+        self.assertEqual(RangeBounds(lower=None, upper=("lt", 2)).to_dict(), {"lt": 2})
@@ -0,0 +1,79 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from io import StringIO
+from unittest import TestCase, mock
+
+from django.core.management import call_command, CommandError
+from django.test import override_settings
+
+from lucyfer.management.commands.lucyfer_warm_up import Command
+from lucyfer.searchset import PythonSearchSet, DjangoSearchSet, searchset_registry, warm_up
+
+
+@dataclass
+class Record:
+    id: int
+    name: str
+
+
+class RecordSearchSet(PythonSearchSet):
+    class Meta:
+        model = Record
+
+
+class BrokenSearchSet(PythonSearchSet):
+    class Meta:
+        model = Record
+
+    @classmethod
+    def _get_raw_mapping(cls):
+        raise ConnectionError("mapping is unavailable")
+
+
+class TestSearchSetRegistry(TestCase):
+    def setUp(self):
+        for searchset_class in (RecordSearchSet, BrokenSearchSet):
+            searchset_class.storage.reset()
+
+    def test_searchsets_are_registered(self):
+        searchsets = searchset_registry.get_searchsets()
+
+        self.assertIn(RecordSearchSet, searchsets)
+        self.assertIn(BrokenSearchSet, searchsets)
+
+        # base searchsets have no model
+        self.assertNotIn(PythonSearchSet, searchsets)
+        self.assertNotIn(DjangoSearchSet, searchsets)
+
+    def test_warm_up(self):
+        self.assertFalse(RecordSearchSet.storage.is_built)
+
+        results = warm_up([RecordSearchSet, BrokenSearchSet], max_workers=2)
+
+        self.assertIsNone(results[RecordSearchSet])
+        self.assertIsInstance(results[BrokenSearchSet], ConnectionError)
+
+        self.assertTrue(RecordSearchSet.storage.is_built)
+        self.assertFalse(BrokenSearchSet.storage.is_built)
+
+        with self.assertRaises(ConnectionError):
+            warm_up([BrokenSearchSet], raise_exception=True)
+
+    @override_settings(LUCYFER_SETTINGS={"WARM_UP_MAX_WORKERS": 3})
+    def test_warm_up_workers_from_settings(self):
+        with mock.patch("lucyfer.searchset.registry.ThreadPoolExecutor", wraps=ThreadPoolExecutor) as executor:
+            warm_up([RecordSearchSet])
+
+        self.assertEqual(executor.call_args.kwargs["max_workers"], 3)
+
+    def test_warm_up_command(self):
+        stdout, stderr = StringIO(), StringIO()
+        call_command(Command(stdout=stdout, stderr=stderr), f"{__name__}.RecordSearchSet")
+
+        self.assertEqual(stdout.getvalue().strip(), f"{__name__}.RecordSearchSet: 2 fields")
+
+        with self.assertRaises(CommandError):
+            call_command(Command(stdout=stdout, stderr=stderr),
+                         f"{__name__}.RecordSearchSet", f"{__name__}.BrokenSearchSet")
+
+        self.assertIn("mapping is unavailable", stderr.getvalue())
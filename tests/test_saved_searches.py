@@ -0,0 +1,154 @@
+from datetime import datetime
+from unittest import TestCase, mock
+
+from django.db.models import Q
+from django.test import override_settings
+
+from lucyfer.parser import SavedSearchResolver
+from lucyfer.searchset import DjangoSearchSet
+from lucyfer.searchset.fields import DjangoCharField, DjangoIntegerField, DjangoDateTimeField
+from lucyfer.utils import LuceneSearchSavedSearchCycleException, LuceneSearchInvalidValueException, \
+    LuceneSearchQueryTooExpensiveException
+from tests.utils import DjangoModel
+
+
+class TestSavedSearchResolver(TestCase):
+    def setUp(self):
+        settings = override_settings(LUCYFER_SETTINGS={"SAVED_SEARCHES_ENABLE": True, "SAVED_SEARCHES_KEY": "saved"})
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.saved_searches = {
+            "first": ("integer_field: 1", 1),
+            "second": ("char_field: value OR saved: first", 1),
+            "cycle_a": ("integer_field: 1 AND saved: cycle_b", 1),
+            "cycle_b": ("saved: cycle_a", 1),
+            "recent": ("datetime_field > now-1h", 1),
+            "recent_or_first": ("saved: recent OR saved: first", 1),
+            "expensive": ("char_field ~ value", 1),
+            "nested_expensive": ("integer_field: 1 OR saved: expensive", 1),
+        }
+        self.loader = mock.Mock(side_effect=self.saved_searches.get)
+
+        class SearchSet(DjangoSearchSet):
+            char_field = DjangoCharField()
+            integer_field = DjangoIntegerField()
+            datetime_field = DjangoDateTimeField()
+
+            saved_search_resolver = SavedSearchResolver(loader=self.loader)
+
+            class Meta:
+                model = DjangoModel
+
+        self.searchset_class = SearchSet
+        self.resolver = SearchSet.saved_search_resolver
+
+    def test_saved_search(self):
+        self.assertEqual(self.searchset_class.parse("saved: first AND char_field: x"),
+                         Q(integer_field__exact=1) & Q(char_field__icontains="x"))
+        self.assertEqual(self.searchset_class.parse("NOT saved: first"), self.searchset_class.parse("NOT integer_field: 1"))
+
+    def test_nested_saved_search(self):
+        self.assertEqual(self.searchset_class.parse("saved: second"),
+                         Q(char_field__icontains="value") | Q(integer_field__exact=1))
+
+    def test_saved_searches_are_memoized(self):
+        self.searchset_class.parse("saved: second")
+        self.searchset_class.parse("saved: first AND char_field: x")
+
+        with mock.patch.object(self.searchset_class, "_parse_tree", wraps=self.searchset_class._parse_tree) as parse:
+            self.searchset_class.parse("saved: second AND char_field: y")
+            self.assertEqual(parse.call_count, 1)
+
+        self.assertEqual(self.loader.call_count, 2)
+
+    def test_relative_saved_searches_are_not_memoized(self):
+        self.searchset_class.parse("saved: recent_or_first")
+
+        self.assertFalse(self.resolver.is_cacheable("recent"))
+        self.assertFalse(self.resolver.is_cacheable("recent_or_first"))
+        self.assertTrue(self.resolver.is_cacheable("first"))
+        self.assertNotIn("saved: recent_or_first", self.searchset_class.storage.parsed_query_cache)
+
+        with mock.patch.object(DjangoDateTimeField, "get_now", return_value=datetime(2021, 3, 31, 15)):
+            self.assertEqual(self.searchset_class.parse("saved: recent_or_first"),
+                             Q(datetime_field__gt=datetime(2021, 3, 31, 14)) | Q(integer_field__exact=1))
+
+    def test_saved_search_cost(self):
+        self.assertEqual(self.searchset_class.get_query_cost("saved: nested_expensive AND char_field: x"),
+                         self.searchset_class.get_query_cost("(integer_field: 1 OR char_field ~ value) AND char_field: x"))
+
+    @override_settings(LUCYFER_SETTINGS={"SAVED_SEARCHES_ENABLE": True, "SAVED_SEARCHES_KEY": "saved",
+                                         "QUERY_COST_LIMIT": 10})
+    def test_saved_search_exceeds_cost_limit(self):
+        self.assertEqual(self.searchset_class.parse("saved: first"), Q(integer_field__exact=1))
+
+        for raw_expression in ("saved: expensive", "saved: nested_expensive AND char_field: x"):
+            with self.assertRaises(LuceneSearchQueryTooExpensiveException):
+                self.searchset_class.parse(raw_expression)
+
+    def test_resolved_saved_searches_are_cached(self):
+        query = self.searchset_class.parse("saved: second")
+
+        self.assertTrue(self.resolver.is_cacheable("second"))
+        self.assertIn("saved: second", self.searchset_class.storage.parsed_query_cache)
+        self.assertIs(self.searchset_class.parse("saved: second"), query)
+
+    def test_cycle(self):
+        with self.assertRaises(LuceneSearchSavedSearchCycleException) as e:
+            self.searchset_class.parse("saved: cycle_a")
+
+        self.assertEqual(e.exception.ids, ["cycle_a", "cycle_b", "cycle_a"])
+
+    def test_unknown_saved_search(self):
+        with self.assertRaises(LuceneSearchInvalidValueException):
+            self.searchset_class.parse("saved: unknown")
+
+    def test_invalidate(self):
+        self.searchset_class.parse("saved: second")
+
+        self.saved_searches["first"] = ("integer_field: 2", 2)
+        self.resolver.invalidate("first")
+
+        self.assertEqual(self.searchset_class.parse("saved: second"),
+                         Q(char_field__icontains="value") | Q(integer_field__exact=2))
+        self.assertEqual(self.loader.call_count, 4)
+
+
+class TestOverriddenGetSavedSearch(TestCase):
+    def setUp(self):
+        settings = override_settings(LUCYFER_SETTINGS={"SAVED_SEARCHES_ENABLE": True, "SAVED_SEARCHES_KEY": "saved"})
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.saved_queries = {"first": Q(integer_field=1)}
+        saved_queries = self.saved_queries
+
+        class SearchSet(DjangoSearchSet):
+            integer_field = DjangoIntegerField()
+
+            @classmethod
+            def get_saved_search(cls, tree):
+                # for ex. saved search is read from database
+                return saved_queries[tree.value]
+
+            class Meta:
+                model = DjangoModel
+
+        self.searchset_class = SearchSet
+
+    def test_changed_saved_search_is_used(self):
+        self.assertEqual(self.searchset_class.parse("saved: first"), Q(integer_field=1))
+
+        self.saved_queries["first"] = Q(integer_field=2)
+
+        self.assertEqual(self.searchset_class.parse("saved: first"), Q(integer_field=2))
+        self.assertNotIn("saved: first", self.searchset_class.storage.parsed_query_cache)
+
+    def test_only_queries_without_saved_searches_are_cached(self):
+        self.searchset_class.parse("saved: first OR integer_field: 3")
+        self.searchset_class.parse("integer_field: 3")
+
+        cache = self.searchset_class.storage.parsed_query_cache
+        self.assertNotIn("saved: first OR integer_field: 3", cache)
+        self.assertIn("integer_field: 3", cache)
@@ -0,0 +1,119 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import TestCase, mock
+
+from django.core.management import call_command
+from django.test import override_settings
+from parameterized import parameterized
+
+from lucyfer.management.commands.lucyfer_dump_snapshot import Command
+from lucyfer.searchset import DjangoSearchSet
+from lucyfer.searchset.fields import DjangoCharField, DjangoIntegerField
+from lucyfer.searchset.snapshot import dump_snapshot, load_snapshot
+from lucyfer.searchset.utils import FieldType
+from tests.utils import DjangoModel
+
+
+RAW_MAPPING = {"a": FieldType.INTEGER, "b": FieldType.STRING, "c": None}
+
+
+class SnapshotSearchSet(DjangoSearchSet):
+    d = DjangoCharField(sources=["b"])
+
+    @classmethod
+    def _get_raw_mapping(cls):
+        return RAW_MAPPING
+
+    class Meta:
+        model = DjangoModel
+        fields_to_exclude_from_suggestions = ["c"]
+
+
+class TestMappingSnapshot(TestCase):
+    searchset_class = SnapshotSearchSet
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "snapshot.json")
+
+        settings_override = override_settings(LUCYFER_SETTINGS={"MAPPING_SNAPSHOT_PATH": self.path})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.searchset_class.storage.reset()
+        self.addCleanup(self.searchset_class.storage.reset)
+
+    def get_storage_without_mapping_requests(self):
+        self.searchset_class.storage.reset()
+
+        with mock.patch.object(self.searchset_class, "_get_raw_mapping", return_value=RAW_MAPPING) as get_raw_mapping:
+            field_source_to_field = self.searchset_class.storage.field_source_to_field
+
+        return field_source_to_field, get_raw_mapping.call_count
+
+    def test_snapshot_is_used_instead_of_mapping_request(self):
+        dump_snapshot(self.path, [self.searchset_class])
+
+        field_source_to_field, requests_count = self.get_storage_without_mapping_requests()
+
+        self.assertEqual(requests_count, 0)
+        self.assertEqual(self.searchset_class.storage.raw_mapping, RAW_MAPPING)
+        self.assertIsInstance(field_source_to_field["a"], DjangoIntegerField)
+        self.assertIsInstance(field_source_to_field["d"], DjangoCharField)
+        self.assertFalse(field_source_to_field["c"].show_suggestions)
+
+    def test_corrupted_snapshot_is_ignored(self):
+        snapshot = dump_snapshot(self.path, [self.searchset_class])
+        snapshot["searchsets"][f"{__name__}.SnapshotSearchSet"]["raw_mapping"]["a"] = "FLOAT"
+
+        with open(self.path, "w") as fp:
+            json.dump(snapshot, fp)
+
+        self.assertIsNone(load_snapshot(self.path))
+
+        with override_settings(LUCYFER_SETTINGS={"MAPPING_SNAPSHOT_PATH": self.path}):
+            _, requests_count = self.get_storage_without_mapping_requests()
+
+        self.assertEqual(requests_count, 1)
+
+    @parameterized.expand((
+            ("missed_created_at", lambda snapshot: snapshot.pop("created_at")),
+            ("refreshed_created_at", lambda snapshot: snapshot.update(created_at=snapshot["created_at"] + 3600)),
+    ))
+    def test_edited_snapshot_metadata_is_ignored(self, _, edit):
+        snapshot = dump_snapshot(self.path, [self.searchset_class])
+        edit(snapshot)
+
+        with open(self.path, "w") as fp:
+            json.dump(snapshot, fp)
+
+        self.assertIsNone(load_snapshot(self.path))
+
+        with override_settings(LUCYFER_SETTINGS={"MAPPING_SNAPSHOT_PATH": self.path, "MAPPING_SNAPSHOT_MAX_AGE": 60}):
+            _, requests_count = self.get_storage_without_mapping_requests()
+
+        self.assertEqual(requests_count, 1)
+
+    def test_stale_snapshot_is_ignored(self):
+        dump_snapshot(self.path, [self.searchset_class])
+
+        # field class of source is changed after snapshot was dumped
+        with mock.patch.dict(self.searchset_class.storage.field_name_to_field, {"a": DjangoCharField()}):
+            _, requests_count = self.get_storage_without_mapping_requests()
+
+        self.assertEqual(requests_count, 1)
+
+        with override_settings(LUCYFER_SETTINGS={"MAPPING_SNAPSHOT_PATH": self.path, "MAPPING_SNAPSHOT_MAX_AGE": -1}):
+            _, requests_count = self.get_storage_without_mapping_requests()
+
+        self.assertEqual(requests_count, 1)
+
+    def test_dump_snapshot_command(self):
+        stdout = StringIO()
+        call_command(Command(stdout=stdout), f"{__name__}.SnapshotSearchSet")
+
+        self.assertEqual(stdout.getvalue().strip(), f"{__name__}.SnapshotSearchSet: 3 mapping fields")
+        self.assertIsNotNone(load_snapshot(self.path))
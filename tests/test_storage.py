@@ -1,7 +1,12 @@
+import threading
+import time
 from unittest import TestCase, mock
 
-from lucyfer.searchset import DjangoSearchSet
-from lucyfer.searchset.fields import DjangoCharField, DjangoIntegerField, DjangoFloatField, DjangoBooleanField, \
+from django.core.cache import cache
+from django.test import override_settings
+
+from lucyfer.searchset import DjangoSearchSet, ElasticSearchSet
+from lucyfer.searchset.fields import ElasticIntegerField, DjangoCharField, DjangoIntegerField, DjangoFloatField, DjangoBooleanField, \
     FieldType
 from tests.utils import EmptyDjangoModel, ElasticModel, DjangoModel
 
@@ -318,3 +323,290 @@ class TestSearchHelpers(TestCase):
 
         self.assertEqual(not_escaped_available_a_values,
                          MySearchSet.get_fields_values(qs=DjangoModel.objects, field_name="a", prefix=""))
+
+
+class RefreshedSearchSet(ElasticSearchSet):
+    class Meta:
+        model = ElasticModel
+
+
+class TestStorageRefresh(TestCase):
+    searchset_class = RefreshedSearchSet
+
+    def setUp(self):
+        settings_override = override_settings(LUCYFER_SETTINGS={"MAPPING_CACHE_TIME": 60})
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        cache.clear()
+        self.searchset_class.storage.reset()
+        self.addCleanup(self.searchset_class.storage.reset)
+
+        self.raw_mapping = {"a": FieldType.INTEGER}
+        patcher = mock.patch.object(self.searchset_class, "_get_raw_mapping", side_effect=lambda: self.raw_mapping)
+        self.get_raw_mapping = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_mapping_is_shared_by_django_cache(self):
+        self.assertEqual(self.searchset_class.storage.raw_mapping, {"a": FieldType.INTEGER})
+
+        # another process starts with the same cache
+        self.searchset_class.storage.reset()
+        self.assertEqual(self.searchset_class.storage.raw_mapping, {"a": FieldType.INTEGER})
+
+        self.assertEqual(self.get_raw_mapping.call_count, 1)
+
+    def test_refresh(self):
+        storage = self.searchset_class.storage
+        state = storage.state
+        self.searchset_class.parse("a: 1")
+
+        # the same mapping doesn't rebuild fields and keeps compiled queries
+        self.assertFalse(storage.refresh(use_cache=False))
+        self.assertIs(storage.state, state)
+        self.assertEqual(len(self.searchset_class.get_parsed_query_cache()), 1)
+
+        self.raw_mapping = {"a": FieldType.INTEGER, "b": FieldType.INTEGER}
+        self.assertTrue(storage.refresh(use_cache=False))
+
+        self.assertEqual(storage.version, 2)
+        self.assertIsInstance(storage.field_source_to_field["b"], ElasticIntegerField)
+        self.assertEqual(len(self.searchset_class.get_parsed_query_cache()), 0)
+
+        # previous state is kept untouched for requests which use it
+        self.assertNotIn("b", state.field_source_to_field)
+        self.assertEqual(len(state.parsed_query_cache), 1)
+
+    def test_expired_state_is_refreshed_in_background(self):
+        storage = self.searchset_class.storage
+        state = storage.state
+
+        self.raw_mapping = {"b": FieldType.INTEGER}
+        cache.clear()
+        storage._expires_at = 0
+
+        self.assertIs(storage.state, state)
+
+        for thread in threading.enumerate():
+            if thread.name == "lucyfer-mapping-refresh":
+                thread.join()
+
+        self.assertEqual(storage.version, 2)
+        self.assertEqual(storage.raw_mapping, {"b": FieldType.INTEGER})
+
+    def test_mapping_never_expires_without_cache_time(self):
+        with override_settings(LUCYFER_SETTINGS={}):
+            self.searchset_class.storage.state
+            self.assertIsNone(self.searchset_class.storage._expires_at)
+
+
+class ConcurrentSearchSet(DjangoSearchSet):
+    class Meta:
+        model = DjangoModel
+
+
+class TestStorageConcurrency(TestCase):
+    searchset_class = ConcurrentSearchSet
+    threads_count = 32
+
+    def setUp(self):
+        self.searchset_class.storage.reset()
+        self.addCleanup(self.searchset_class.storage.reset)
+
+    def run_concurrently(self, function):
+        barrier = threading.Barrier(self.threads_count)
+        results = [None] * self.threads_count
+
+        def run(i):
+            barrier.wait()
+            results[i] = function()
+
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(self.threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return results
+
+    def test_storage_is_built_once(self):
+        calls = []
+
+        def get_raw_mapping():
+            calls.append(threading.get_ident())
+            # slow mapping request, so all threads come while it is in progress
+            time.sleep(0.05)
+            return {"a": FieldType.INTEGER}
+
+        with mock.patch.object(self.searchset_class, "_get_raw_mapping", side_effect=get_raw_mapping):
+            for _ in range(5):
+                self.searchset_class.storage.reset()
+                states = self.run_concurrently(lambda: self.searchset_class.storage.state)
+
+                self.assertEqual(len({id(state) for state in states}), 1)
+
+        self.assertEqual(len(calls), 5)
+
+    def test_parse_while_storage_is_built(self):
+        with mock.patch.object(self.searchset_class, "_get_raw_mapping", return_value={"a": FieldType.INTEGER}) \
+                as get_raw_mapping:
+            queries = self.run_concurrently(lambda: self.searchset_class.parse("a: 1"))
+
+        self.assertEqual(get_raw_mapping.call_count, 1)
+        self.assertTrue(all(query == queries[0] for query in queries))
+
+
+class TestDefaultField(TestCase):
+    def setUp(self):
+        class SearchSet(DjangoSearchSet):
+            @classmethod
+            def _get_raw_mapping(cls):
+                return {"a": FieldType.INTEGER}
+
+            class Meta:
+                model = DjangoModel
+
+        self.searchset_class = SearchSet
+
+    def test_default_field_is_shared(self):
+        field = self.searchset_class.get_field("unknown")
+
+        self.assertIs(self.searchset_class.get_field("another_unknown"), field)
+        self.assertEqual(field.get_sources("another_unknown"), ["another_unknown"])
+        self.assertIsInstance(self.searchset_class.get_field("a"), DjangoIntegerField)
+
+        with mock.patch.object(self.searchset_class, "_default_field") as default_field:
+            self.searchset_class.get_field("a")
+            self.searchset_class.get_field("unknown")
+            default_field.assert_not_called()
+
+    def test_default_field_is_recreated(self):
+        field = self.searchset_class.get_field("unknown")
+
+        with override_settings(LUCYFER_SETTINGS={"CACHE_SEARCH_VALUES": False}):
+            self.assertIsNot(self.searchset_class.get_field("unknown"), field)
+            self.assertFalse(self.searchset_class.get_field("unknown").use_cache_for_suggestions)
+
+        field = self.searchset_class.get_field("unknown")
+        self.searchset_class.storage.reset()
+        self.assertIsNot(self.searchset_class.get_field("unknown"), field)
+
+
+class TestFieldTable(TestCase):
+    def setUp(self):
+        class SearchSet(DjangoSearchSet):
+            a = DjangoCharField()
+            e = DjangoCharField(sources=["f"], use_field_class_for_sources=True)
+
+            @classmethod
+            def _get_raw_mapping(cls):
+                return {"a": FieldType.INTEGER, "b": FieldType.INTEGER, "c": None}
+
+            class Meta:
+                model = DjangoModel
+
+        self.searchset_class = SearchSet
+
+    def test_fields_are_created_on_first_usage(self):
+        table = self.searchset_class.storage.field_source_to_field
+
+        # only explicit fields are created
+        self.assertEqual(table.get_created_fields_count(), 3)
+        self.assertEqual(list(table), ["a", "b", "c", "f", "e"])
+        self.assertEqual(len(table), 5)
+        self.assertIn("b", table)
+        self.assertNotIn("d", table)
+
+        self.assertIs(table.get_field_class("b"), DjangoIntegerField)
+        self.assertEqual(table.get_created_fields_count(), 3)
+
+        field = table["b"]
+        self.assertIsInstance(field, DjangoIntegerField)
+        self.assertEqual(field.sources, ["b"])
+        self.assertIs(table.get("b"), field)
+        self.assertEqual(table.get_created_fields_count(), 4)
+
+        # explicit field has priority over raw mapping
+        self.assertIsInstance(table["a"], DjangoCharField)
+        self.assertIsNone(table.get("d"))
+
+        with self.assertRaises(KeyError):
+            table["d"]
+
+    def test_table_is_read_only(self):
+        table = self.searchset_class.storage.field_source_to_field
+
+        with self.assertRaises(TypeError):
+            table["d"] = DjangoCharField()
+
+        with self.assertRaises(TypeError):
+            del table["a"]
+
+    def test_mapping_doesnt_create_fields(self):
+        mapping = self.searchset_class.storage.mapping
+        table = self.searchset_class.storage.field_source_to_field
+        # raw mapping fields table is shared with searchsets of other tests
+        created_fields_count = table.get_created_fields_count()
+
+        self.assertEqual(list(mapping), ["a", "b", "c", "f", "e"])
+        self.assertEqual(mapping.get_field_classes(), {"a": DjangoCharField, "b": DjangoIntegerField,
+                                                       "c": self.searchset_class._default_field,
+                                                       "e": DjangoCharField, "f": DjangoCharField})
+        self.assertEqual(table.get_created_fields_count(), created_fields_count)
+
+        self.assertIsInstance(mapping["c"], self.searchset_class._default_field)
+        self.assertEqual(table.get_created_fields_count(), created_fields_count + 1)
+
+    def test_deep_mapping_is_formatted(self):
+        properties = {"leaf": {"type": "long"}}
+        for i in range(5000):
+            properties = {f"level{i}": {"properties": properties}}
+
+        raw_mapping = ElasticSearchSet._format_mapping_values(properties)
+
+        self.assertEqual(len(raw_mapping), 1)
+        self.assertEqual(list(raw_mapping.values()), [FieldType.INTEGER])
+        self.assertTrue(next(iter(raw_mapping)).startswith("level4999.level4998."))
+
+
+class TestSharedMappingFieldTable(TestCase):
+    def get_searchset_class(self, fields_to_exclude_from_suggestions=None, **fields):
+        raw_mapping = {"a": FieldType.INTEGER, "b": FieldType.STRING, "c": None}
+
+        class Meta:
+            model = DjangoModel
+
+        Meta.fields_to_exclude_from_suggestions = fields_to_exclude_from_suggestions
+
+        @classmethod
+        def _get_raw_mapping(cls):
+            # each searchset loads its own copy of mapping
+            return dict(raw_mapping)
+
+        return type(DjangoSearchSet)("TenantSearchSet", (DjangoSearchSet,),
+                                     {"Meta": Meta, "_get_raw_mapping": _get_raw_mapping, **fields})
+
+    def test_mapping_fields_are_shared(self):
+        first = self.get_searchset_class()
+        second = self.get_searchset_class(c=DjangoIntegerField())
+
+        first_table = first.storage.field_source_to_field
+        second_table = second.storage.field_source_to_field
+
+        self.assertIs(first_table.mapping_field_table, second_table.mapping_field_table)
+        self.assertIs(first.storage.raw_mapping, second.storage.raw_mapping)
+        self.assertIs(first.get_field("a"), second.get_field("a"))
+
+        # searchset fields are layered on top of shared table
+        self.assertIsInstance(second.get_field("c"), DjangoIntegerField)
+        self.assertIsNot(first.get_field("c"), second.get_field("c"))
+        self.assertEqual(list(second_table), ["a", "b", "c"])
+
+    def test_different_configuration_is_not_shared(self):
+        first = self.get_searchset_class()
+        second = self.get_searchset_class(fields_to_exclude_from_suggestions=["a"])
+
+        self.assertIsNot(first.storage.field_source_to_field.mapping_field_table,
+                         second.storage.field_source_to_field.mapping_field_table)
+        self.assertTrue(first.get_field("a").show_suggestions)
+        self.assertFalse(second.get_field("a").show_suggestions)
@@ -0,0 +1,103 @@
+import io
+import json
+import os
+import tempfile
+from dataclasses import dataclass
+from unittest import TestCase, mock
+
+from parameterized import parameterized
+
+from lucyfer.searchset import PythonSearchSet
+from lucyfer.stream import filter_file, read_lines, main, JSONL, CSV
+
+
+@dataclass
+class Record:
+    id: int
+    name: str
+    is_active: bool
+
+
+class RecordSearchSet(PythonSearchSet):
+    class Meta:
+        model = Record
+
+
+RECORDS = [{"id": i, "name": f"name{i}", "is_active": i % 3 == 0} for i in range(100)]
+
+JSONL_DATA = b"".join(json.dumps(record).encode() + b"\n" for record in RECORDS) + b"not a json\n\n"
+
+CSV_DATA = b"id,name,is_active\r\n" + b"".join(
+    f"{record['id']},{record['name']},{str(record['is_active']).lower()}\r\n".encode() for record in RECORDS
+)
+
+
+class TestStreamFilter(TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+
+    def filter(self, data, search_terms, input_format, **kwargs):
+        with open(self.path, "wb") as fp:
+            fp.write(data)
+
+        with open(self.path, "rb") as fp:
+            return list(filter_file(fp, RecordSearchSet, search_terms, input_format=input_format, **kwargs))
+
+    @parameterized.expand((
+            ("id > 90 AND is_active: true", [93, 96, 99]),
+            ("name: name1*", [1] + list(range(10, 20))),
+            ("id: 5 OR id: 50", [5, 50]),
+            ("id > 1000", []),
+    ))
+    def test_jsonl(self, search_terms, expected_ids):
+        lines = self.filter(JSONL_DATA, search_terms, JSONL)
+        self.assertEqual([json.loads(line)["id"] for line in lines], expected_ids)
+
+        lines = self.filter(JSONL_DATA, search_terms, JSONL, processes=2, range_size=300)
+        self.assertEqual([json.loads(line)["id"] for line in lines], expected_ids)
+
+    def test_csv(self):
+        lines = self.filter(CSV_DATA, "id >= 95 AND is_active: true", CSV)
+        self.assertEqual(lines, [b"id,name,is_active\r\n", b"96,name96,true\r\n", b"99,name99,true\r\n"])
+
+        self.assertEqual(self.filter(CSV_DATA, "id >= 95 AND is_active: true", CSV, processes=3, range_size=100),
+                         lines)
+
+    def test_invalid_lines_are_skipped(self):
+        data = b"id,name,is_active\n96,name\xff96,true\n99,name99,true\n"
+        self.assertEqual(self.filter(data, "is_active: true", CSV), [b"id,name,is_active\n", b"99,name99,true\n"])
+
+        data = b'{"id": 1, "name": "\xff"}\n{"id": 2}\n'
+        self.assertEqual(self.filter(data, "id > 0", JSONL), [b'{"id": 2}\n'])
+
+    def test_csv_line_breaks_in_quoted_values(self):
+        data = (b'id,name,is_active\n'
+                b'1,"name\n2,name2,true",false\n'
+                b'3,"first\r\nsecond",true\n'
+                b'4,name4,true\n')
+
+        self.assertEqual(self.filter(data, "is_active: true", CSV),
+                         [b"id,name,is_active\n", b'3,"first\r\nsecond",true\n', b"4,name4,true\n"])
+        self.assertEqual(self.filter(data, "id: 2", CSV), [b"id,name,is_active\n"])
+
+    def test_read_lines_by_ranges(self):
+        data = b"a\nbb\nccc\n\ndddd"
+
+        for range_size in range(1, len(data) + 1):
+            lines = []
+            for start in range(0, len(data), range_size):
+                lines.extend(read_lines(io.BytesIO(data), start=start, end=start + range_size))
+
+            self.assertEqual(b"".join(lines), data)
+
+    def test_cli(self):
+        with open(self.path, "wb") as fp:
+            fp.write(JSONL_DATA)
+
+        stdout = mock.Mock(buffer=io.BytesIO())
+        with mock.patch("sys.stdout", stdout):
+            main(["--searchset", "tests.test_stream.RecordSearchSet", "id: 42", self.path])
+
+        self.assertEqual(json.loads(stdout.buffer.getvalue())["id"], 42)
@@ -0,0 +1,128 @@
+from unittest import TestCase, mock
+
+from django.db import DatabaseError, OperationalError
+from django.db.models import QuerySet
+from django.db.utils import ConnectionHandler
+from django.test import override_settings
+from elasticsearch_dsl import Search
+from rest_framework.exceptions import APIException
+
+from lucyfer.searchset.timeout import statement_timeout, with_statement_timeout, StatementTimeoutQuerySet, \
+    POSTGRESQL_QUERY_CANCELED
+from lucyfer.utils import LuceneSearchTimeoutException
+from tests.test_elastic import MyElasticSearchSet
+
+
+INFINITE_QUERY = "WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c) SELECT count(*) FROM c"
+
+
+class TestSqliteStatementTimeout(TestCase):
+    def setUp(self):
+        self.connection = ConnectionHandler({"default": {"ENGINE": "django.db.backends.sqlite3",
+                                                         "NAME": ":memory:"}})["default"]
+
+    def tearDown(self):
+        self.connection.close()
+
+    def test_timeout(self):
+        with self.assertRaises(LuceneSearchTimeoutException) as e:
+            with statement_timeout(self.connection, timeout=0.1):
+                with self.connection.cursor() as cursor:
+                    cursor.execute(INFINITE_QUERY)
+
+        self.assertEqual(e.exception.timeout, 0.1)
+
+    def test_fast_query(self):
+        with statement_timeout(self.connection, timeout=10):
+            with self.connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                self.assertEqual(cursor.fetchone(), (1,))
+
+    def test_handler_is_removed(self):
+        with statement_timeout(self.connection, timeout=0.001):
+            pass
+
+        with self.connection.cursor() as cursor:
+            cursor.execute("WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 FROM c WHERE x < 100000) "
+                           "SELECT count(*) FROM c")
+            self.assertEqual(cursor.fetchone(), (100000,))
+
+
+class TestPostgresqlStatementTimeout(TestCase):
+    def setUp(self):
+        self.cursor = mock.MagicMock()
+        self.cursor.fetchone.return_value = ("30s", "100")
+
+        self.connection = mock.MagicMock(vendor="postgresql", alias="default")
+        self.connection.cursor.return_value.__enter__.return_value = self.cursor
+
+        patcher = mock.patch("lucyfer.searchset.timeout.transaction.atomic")
+        self.atomic = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_timeout_is_set_and_restored(self):
+        with statement_timeout(self.connection, timeout=0.1):
+            self.assertEqual(self.cursor.execute.call_args_list[0][0][1], ["100"])
+
+        self.atomic.assert_called_once_with(using="default")
+        self.assertEqual(self.cursor.execute.call_args_list[-1],
+                         mock.call("SELECT set_config('statement_timeout', %s, true)", ["30s"]))
+
+    def test_canceled_query(self):
+        error = OperationalError("canceling statement due to statement timeout")
+        error.__cause__ = DatabaseError()
+        error.__cause__.pgcode = POSTGRESQL_QUERY_CANCELED
+
+        with self.assertRaises(LuceneSearchTimeoutException) as e:
+            with statement_timeout(self.connection, timeout=0.1):
+                raise error
+
+        self.assertEqual(e.exception.timeout, 0.1)
+
+    def test_other_errors(self):
+        error = OperationalError("server closed the connection unexpectedly")
+        error.__cause__ = DatabaseError()
+        error.__cause__.pgcode = "08006"
+
+        with self.assertRaises(OperationalError):
+            with statement_timeout(self.connection, timeout=0.1):
+                raise error
+
+
+class TestStatementTimeoutQuerySet(TestCase):
+    def test_timeout_is_kept_in_clones(self):
+        queryset = with_statement_timeout(StatementTimeoutQuerySet(), timeout=5).all().order_by().distinct()
+
+        self.assertIs(type(queryset), StatementTimeoutQuerySet)
+        self.assertEqual(queryset.statement_timeout, 5)
+
+    def test_without_timeout(self):
+        queryset = StatementTimeoutQuerySet()
+        self.assertIs(with_statement_timeout(queryset, timeout=None), queryset)
+
+    def test_queryset_without_mixin(self):
+        queryset = QuerySet()
+
+        with self.assertWarns(UserWarning):
+            self.assertIs(with_statement_timeout(queryset, timeout=5), queryset)
+
+    def test_timeout_is_api_exception(self):
+        exception = LuceneSearchTimeoutException(timeout=5)
+
+        self.assertIsInstance(exception, APIException)
+        self.assertEqual(exception.status_code, 503)
+
+
+class TestElasticSearchTimeout(TestCase):
+    def test_timeout(self):
+        search = MyElasticSearchSet.filter(Search(), "field: a", timeout=1.5)
+        self.assertEqual(search.to_dict()["timeout"], "1500ms")
+
+    @override_settings(LUCYFER_SETTINGS={"QUERY_TIMEOUT": 2, "QUERY_TERMINATE_AFTER": 1000})
+    def test_timeout_from_settings(self):
+        search = MyElasticSearchSet.filter(Search(), "field: a").to_dict()
+        self.assertEqual((search["timeout"], search["terminate_after"]), ("2000ms", 1000))
+
+    @override_settings(LUCYFER_SETTINGS={"QUERY_TIMEOUT": 2})
+    def test_disabled_timeout(self):
+        self.assertNotIn("timeout", MyElasticSearchSet.filter(Search(), "field: a", timeout=0).to_dict())